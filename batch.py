@@ -0,0 +1,166 @@
+import io
+import os
+import re
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+import mainfinal
+import metrics
+import parsecache
+import pipeline
+
+# ---------------------------------------------------------------------
+# Traitement par lot : plusieurs documents ESMA (PDF ou texte collé)
+# ---------------------------------------------------------------------
+MONTHS = {
+    "jan": 1, "janv": 1, "fev": 2, "feb": 2, "mar": 3, "mars": 3, "avr": 4, "apr": 4,
+    "mai": 5, "may": 5, "juin": 6, "jun": 6, "juil": 7, "jul": 7, "aou": 8, "aug": 8,
+    "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+def vintage_of(fname):
+    """
+    Date MM/YYYY déduite du nom de fichier :
+    - "022025.txt", "mffesma022025.pdf" (MMYYYY) ;
+    - "mffesma2025fev.pdf" (année + mois abrégé) ;
+    - "mffesma2025.pdf" (année seule : publication de janvier).
+    Retourne None si rien ne correspond.
+    """
+    base = os.path.splitext(os.path.basename(fname))[0].lower()
+    m = re.search(r'(?<!\d)(0[1-9]|1[0-2])(\d{4})(?!\d)', base)
+    if m:
+        return f"{m.group(1)}/{m.group(2)}"
+    m = re.search(r'(?<!\d)(\d{4})([a-z]+)', base)
+    if m and m.group(2) in MONTHS:
+        return f"{MONTHS[m.group(2)]:02d}/{m.group(1)}"
+    m = re.search(r'(?<!\d)(\d{4})(?!\d)', base)
+    if m:
+        return f"01/{m.group(1)}"
+    return None
+
+def iter_dump(path):
+    """
+    Lit un texte collé au fil de l'eau : les blocs des 12 groupes de
+    tableaux, dans l'ordre de la console, chacun terminé par 'END' (ou une
+    ligne 'SKIP' / 'REUSE'). Produit (nom du parseur, texte brut, None si
+    SKIP ou "REUSE").
+    """
+    funcs = iter(g["func"] for g in mainfinal.TABLES)
+    current = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not current and line.strip().upper() == "SKIP":
+                block = None
+            elif not current and line.strip().upper() == "REUSE":
+                block = "REUSE"
+            elif line.strip() == "END":
+                block, current = "\n".join(current), []
+            else:
+                current.append(line)
+                continue
+            func = next(funcs, None)
+            if func is None:
+                return
+            yield func, block
+
+def uses_reuse(path):
+    """Vrai si le texte collé contient un bloc REUSE (jamais pour un PDF)."""
+    if path.lower().endswith(".pdf"):
+        return False
+    return any(block == "REUSE" for _, block in iter_dump(path))
+
+def read_dump(path):
+    """{nom du parseur: texte brut, None si SKIP ou "REUSE"} d'un texte collé."""
+    return dict(iter_dump(path))
+
+def iter_source(path):
+    """Flux (nom du parseur, texte brut) d'un PDF ESMA ou d'un texte collé."""
+    if path.lower().endswith(".pdf"):
+        from pdfextract import iter_table_texts
+        return iter_table_texts(path)
+    return iter_dump(path)
+
+def process_vintage(path, date_doc):
+    """
+    Extraction, parsing et génération SQL d'un document. Les messages sont
+    capturés pour être affichés d'un bloc, dans l'ordre des documents.
+    """
+    log = io.StringIO()
+    errors = []
+    with contextlib.redirect_stdout(log):
+        try:
+            errors += pipeline.run_pipeline(iter_source(path), date_doc, path)
+        except Exception as e:
+            errors.append(f"{path} : {e!r}")
+    return {"source": path, "vintage": date_doc, "errors": errors, "log": log.getvalue()}
+
+def run_batch(src_dir, workers=None):
+    """
+    Traite tous les PDF / textes collés de `src_dir`, un document par
+    processus, dans l'ordre des dates. workers=1 : exécution séquentielle
+    dans le processus courant. Un REUSE prend le CSV de la date antérieure
+    la plus récente : les documents qui en contiennent passent après les
+    autres, un à un dans l'ordre des dates, pour que les dates précédentes
+    soient écrites (même résultat qu'en séquentiel).
+    """
+    jobs = []
+    for fname in sorted(os.listdir(src_dir)):
+        if not fname.lower().endswith((".pdf", ".txt")):
+            continue
+        date_doc = vintage_of(fname)
+        if date_doc is None:
+            print(f"⚠️ Date introuvable dans le nom {fname}, ignoré")
+            continue
+        jobs.append((os.path.join(src_dir, fname), date_doc))
+    jobs.sort(key=lambda j: parsecache.yyyymm(j[1].replace("/", "")))
+
+    # deux documents de la même date écriraient les mêmes CSV, manifeste et sqltxt
+    by_date = {}
+    for p, d in jobs:
+        by_date.setdefault(d, []).append(p)
+    rejected = []
+    for d, paths in by_date.items():
+        if len(paths) > 1:
+            names = ", ".join(os.path.basename(p) for p in paths)
+            print(f"⚠️ Date {d} en double ({names}), documents ignorés")
+            rejected += [{"source": p, "vintage": d, "errors": [f"date {d} en double : {names}"], "log": ""}
+                         for p in paths]
+    jobs = [(p, d) for p, d in jobs if len(by_date[d]) == 1]
+
+    if workers == 1:
+        results = [process_vintage(p, d) for p, d in jobs]
+    else:
+        reuse = {p for p, _ in jobs if uses_reuse(p)}
+        done = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            first = [(p, d) for p, d in jobs if p not in reuse]
+            for (p, _), r in zip(first, pool.map(process_vintage, *zip(*first)) if first else []):
+                done[p] = r
+            for p, d in jobs:
+                if p in reuse:
+                    done[p] = pool.submit(process_vintage, p, d).result()
+        results = [done[p] for p, _ in jobs]
+    results += rejected
+
+    for r in results:
+        print(f"\n=== {r['source']} ({r['vintage']}) ===")
+        print(r["log"], end="")
+    print("\n=== Bilan ===")
+    for r in results:
+        status = "OK" if not r["errors"] else f"{len(r['errors'])} erreur(s)"
+        print(f"{r['vintage']} {os.path.basename(r['source'])} : {status}")
+        for e in r["errors"]:
+            print(f"    - {e}")
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Traitement par lot de documents MMF de l'ESMA")
+    ap.add_argument("src_dir", help="dossier contenant les PDF ESMA ou textes collés")
+    ap.add_argument("--workers", type=int, default=os.cpu_count(),
+                    help="nombre de processus (1 = séquentiel)")
+    metrics.add_arguments(ap)
+    args = ap.parse_args()
+    metrics.from_args(args)
+    run_batch(args.src_dir, args.workers)
@@ -0,0 +1,89 @@
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqltxt import TABLES_META, read_rows, rows_sql
+
+# ---------------------------------------------------------------------
+# Comparaison : chemin d'intotxt (read_rows + rows_sql, sans pandas) vs
+# chemin historique (read_csv + boucle iterrows), lecture des CSV comprise
+# python benchmarks/bench_sqltxt.py [csv_dir] [prefix]
+# ---------------------------------------------------------------------
+def legacy_table_sql(i, df):
+    """Ancienne implémentation de intotxt (iterrows + if/elif), pour référence."""
+    meta = TABLES_META[i]
+    sel = meta["select_num"]
+    lines = []
+    if "mats" in meta or "cats" in meta:
+        cols = meta.get("mats") or meta.get("cats")
+        for _, r in df.iterrows():
+            key = r[meta["key"]]
+            for c in cols:
+                lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{key}','{c}',{r.get(c, '')}\n")
+    elif i == 4:
+        for _, r in df.iterrows():
+            lab, val = r["Label"], r["Value"].strip()
+            if val == "-":
+                continue
+            m_ = re.match(r"^(-?\d+(?:\.\d+)?)[Ee]-(\d+)$", val)
+            expr = f"{m_.group(1)} * POWER(CAST(0.1 AS FLOAT), {m_.group(2)}.0)" if m_ else val
+            lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{lab}','All',{expr}\n")
+    else:
+        for _, r in df.iterrows():
+            key, v = r[meta["key"]], r[meta["val"]]
+            if meta.get("numeric"):
+                try:
+                    float(v)
+                except ValueError:
+                    continue
+            lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{key}','{meta['col']}',{v}\n")
+    return "".join(lines)
+
+def legacy_sql(csv_dir, prefix, i):
+    df = pd.read_csv(os.path.join(csv_dir, f"{prefix}table{i}.csv"), dtype=str).fillna("")
+    return legacy_table_sql(i, df)
+
+def current_sql(csv_dir, prefix, i):
+    return rows_sql(i, *read_rows(csv_dir, prefix, i))
+
+def write_scaled(csv_dir, prefix, scale, work):
+    """CSV du dossier, lignes répétées `scale` fois, dans `work` : n° des tableaux présents."""
+    nums = []
+    for i in range(1, 15):
+        path = os.path.join(csv_dir, f"{prefix}table{i}.csv")
+        if os.path.exists(path):
+            df = pd.read_csv(path, dtype=str, keep_default_na=False)
+            pd.concat([df] * scale, ignore_index=True).to_csv(os.path.join(work, f"{prefix}table{i}.csv"),
+                                                              index=False, encoding="utf-8")
+            nums.append(i)
+    return nums
+
+def best_of(func, csv_dir, prefix, nums, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = "".join(func(csv_dir, prefix, i) for i in nums)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, out
+
+if __name__ == "__main__":
+    csv_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "output")
+    prefix = sys.argv[2] if len(sys.argv) > 2 else "022025"
+    print(f"{'échelle':>8} {'lignes':>8} {'iterrows (ms)':>14} {'read_rows (ms)':>15} {'gain':>6}")
+    for scale in (1, 10, 100):
+        work = tempfile.mkdtemp(prefix="bench_sqltxt_")
+        try:
+            nums = write_scaled(csv_dir, prefix, scale, work)
+            t_old, out_old = best_of(legacy_sql, work, prefix, nums)
+            t_new, out_new = best_of(current_sql, work, prefix, nums)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        assert out_old == out_new, "sorties différentes"
+        print(f"{scale:>7}x {out_new.count(chr(10)):>8} {t_old*1e3:>14.1f} {t_new*1e3:>15.1f} {t_old/t_new:>5.1f}x")
@@ -0,0 +1,237 @@
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"))
+import mainfinal
+import sqltxt
+import sweep
+from fixtures import document_text, fixture_text, portfolio, read_csv
+from liquiditystress import liquidity_params, stress_liquidity
+from marketstress import fund_summary, market_params, stress_market
+from portfoliostream import stream_portfolio
+from tablespec import clean_pdf_text
+
+# ---------------------------------------------------------------------
+# Banc de mesure reproductible : parseurs, nettoyage, REUSE, SQL, stress
+# python benchmarks/bench_suite.py [--out res.json] [--baseline ref.json]
+# ---------------------------------------------------------------------
+# Jeux d'essai (tests/fixtures.py) reconstruits depuis les CSV de
+# data/output : texte du tableau tel que le colle l'utilisateur (lignes
+# d'en-tête + une ligne par enregistrement), lignes de données répétées
+# 10x/100x/1000x. À l'échelle
+# 1, le texte reparsé doit redonner le CSV (garde-fou du jeu d'essai).
+# Stress (marketstress, liquiditystress, sweep, portfoliostream) : positions
+# synthétiques à graine fixe, POSITIONS lignes par unité d'échelle, avec
+# les paramètres ESMA de --date.
+# Chaque cas : meilleur temps et médiane sur plusieurs passages, sorties
+# console des fonctions mesurées masquées. Résultats en JSON ; avec
+# --baseline, les médianes sont comparées ; un cas qui ralentit au-delà du
+# seuil est remesuré et n'est une régression (code retour 1) que si le
+# ralentissement se confirme.
+SCALES = [1, 10, 100, 1000]
+REPEAT = 7
+MIN_RUNS = 3
+BUDGET = 2.0
+THRESHOLD = 0.25
+# écart absolu (médianes) en dessous duquel un ralentissement est du bruit
+MIN_DELTA = 0.005
+# positions synthétiques par unité d'échelle
+POSITIONS = 1000
+SWEEP_DRAWS = 256
+
+def build_fixtures(csv_dir, prefix):
+    """CSV de la date (n° -> DataFrame), après vérification de l'aller-retour texte -> CSV."""
+    tables = {i: read_csv(csv_dir, prefix, i) for i in range(1, 15)}
+    for func, (group, start) in mainfinal.group_starts().items():
+        text = fixture_text(func, tables, 1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = getattr(mainfinal, func)(text)
+        frames = result if isinstance(result, tuple) else (result,)
+        for i, df in zip(range(start, start + group["count"]), frames):
+            if not df.reset_index(drop=True).astype(str).equals(tables[i]):
+                raise ValueError(f"Jeu d'essai incohérent pour la table {i} ({func})")
+    return tables
+
+def measure(fn, repeat=REPEAT, budget=BUDGET, min_runs=MIN_RUNS):
+    """Temps (s) des passages de `fn` : au moins `min_runs`, puis jusqu'à `repeat` dans `budget`."""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()  # chauffe (regex compilées, mémos, cache disque)
+        while len(times) < repeat and (len(times) < min_runs or sum(times) < budget):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    return {"best_s": min(times), "median_s": statistics.median(times), "runs": len(times)}
+
+# ---------------------------------------------------------------------
+# Cas mesurés
+# ---------------------------------------------------------------------
+def bench_parsers(tables, scale):
+    out = {}
+    for func in mainfinal.group_starts():
+        text = fixture_text(func, tables, scale)
+        fn = getattr(mainfinal, func)
+        out[f"{func}@{scale}x"] = dict(measure(lambda: fn(text)), lines=text.count("\n") + 1)
+    return out
+
+def bench_clean(tables, scale):
+    text = document_text(tables, scale)
+    return {f"clean_pdf_text@{scale}x": dict(measure(lambda: clean_pdf_text(text)), bytes=len(text))}
+
+def vintage_prefixes(n):
+    """n dates MMYYYY distinctes, à partir de 01/2000."""
+    return [f"{k % 12 + 1:02d}{2000 + k // 12}" for k in range(n)]
+
+def bench_reuse(tables, scale, work):
+    """REUSE des 14 tableaux dans un dossier contenant `scale` dates antérieures (manifestes)."""
+    d = os.path.join(work, f"reuse{scale}")
+    os.makedirs(d)
+    old = vintage_prefixes(scale)
+    for prefix in old:
+        for i, df in tables.items():
+            fname = f"{prefix}table{i}.csv"
+            df.to_csv(os.path.join(d, fname), index=False, encoding="utf-8")
+            mainfinal.parsecache.record(d, prefix, i, fname, None)
+    target = vintage_prefixes(scale + 1)[-1]
+    saved = mainfinal.OUTPUT_DIR
+    mainfinal.OUTPUT_DIR = d
+    try:
+        res = measure(lambda: [mainfinal.reuse_latest(i, target) for i in tables])
+    finally:
+        mainfinal.OUTPUT_DIR = saved
+    return {f"reuse_latest@{scale}x": dict(res, vintages=scale)}
+
+def bench_intotxt(tables, scale, work):
+    """intotxt sur des CSV dont les lignes sont répétées `scale` fois."""
+    d = os.path.join(work, f"sql{scale}")
+    os.makedirs(d)
+    rows = 0
+    for i, df in tables.items():
+        big = pd.concat([df] * scale, ignore_index=True)
+        big.to_csv(os.path.join(d, f"012000table{i}.csv"), index=False, encoding="utf-8")
+        rows += len(big)
+    res = measure(lambda: sqltxt.intotxt(d, "01/2000"))
+    return {f"intotxt@{scale}x": dict(res, rows=rows,
+                                     bytes=os.path.getsize(os.path.join(d, "012000sqltxt.txt")))}
+
+def bench_stress(csv_dir, date, scale, work):
+    """Stress de marché, de liquidité, Monte Carlo (sweep) et lecture par blocs sur `scale` x POSITIONS positions."""
+    market, liquidity = market_params(csv_dir, date), liquidity_params(csv_dir, date)
+    holdings, funds = portfolio(scale * POSITIONS)
+    path = os.path.join(work, f"positions{scale}.csv")
+    holdings.to_csv(path, index=False, encoding="utf-8")
+    sigma = {name: 0.25 for name in sweep.FACTORS}
+    extra = dict(rows=len(holdings), funds=len(funds))
+    return {
+        f"stress_market@{scale}x": dict(measure(lambda: fund_summary(stress_market(holdings, market))), **extra),
+        f"stress_liquidity@{scale}x": dict(measure(lambda: stress_liquidity(holdings, funds, liquidity)), **extra),
+        f"sweep@{scale}x": dict(measure(lambda: sweep.run_sweep(sweep.build_book(holdings, funds, market, liquidity),
+                                                                draws=SWEEP_DRAWS, sigma=sigma, idio=0.1)),
+                                draws=SWEEP_DRAWS, **extra),
+        f"stream_portfolio@{scale}x": dict(measure(lambda: stream_portfolio(path, market, liquidity)),
+                                           bytes=os.path.getsize(path), **extra),
+    }
+
+def run(csv_dir, prefix, scales, date):
+    tables = build_fixtures(csv_dir, prefix)
+    cases = {}
+    work = tempfile.mkdtemp(prefix="bench_")
+    try:
+        for scale in scales:
+            cases.update(bench_parsers(tables, scale))
+            cases.update(bench_clean(tables, scale))
+            cases.update(bench_reuse(tables, scale, work))
+            cases.update(bench_intotxt(tables, scale, work))
+            cases.update(bench_stress(csv_dir, date, scale, work))
+            print(f"=> échelle {scale}x mesurée")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "fixtures": f"{csv_dir} ({prefix})",
+            "stress_date": date,
+            "scales": scales,
+        },
+        "cases": cases,
+    }
+
+def regressions(results, baseline, threshold=THRESHOLD, min_delta=MIN_DELTA):
+    """Cas communs dont la médiane dépasse celle de la référence de plus de `threshold` (et de `min_delta` s)."""
+    slow = []
+    for name, new in results["cases"].items():
+        old = baseline["cases"].get(name)
+        if old is None:
+            continue
+        ratio = new["median_s"] / old["median_s"] if old["median_s"] > 0 else float("inf")
+        if ratio > 1 + threshold and new["median_s"] - old["median_s"] > min_delta:
+            slow.append((name, old["median_s"], new["median_s"], ratio))
+    return slow
+
+def confirm(slow, rerun, baseline, threshold=THRESHOLD, min_delta=MIN_DELTA):
+    """Ralentissements de `slow` retrouvés dans `rerun` (second passage) : le plus faible des deux est retenu."""
+    again = {name: (old, new, ratio) for name, old, new, ratio in regressions(rerun, baseline, threshold, min_delta)}
+    return [(name, old, min(new, again[name][1]), min(ratio, again[name][2]))
+            for name, old, new, ratio in slow if name in again]
+
+def case_scale(name):
+    """"clean_pdf_text@10x" -> 10"""
+    return int(name.rsplit("@", 1)[1][:-1])
+
+def report(results, baseline=None):
+    lines = [f"{'cas':<34} {'meilleur (ms)':>14} {'médiane (ms)':>13} {'réf. méd. (ms)':>15}"]
+    for name, c in results["cases"].items():
+        ref = baseline["cases"].get(name) if baseline else None
+        ref = f"{ref['median_s'] * 1e3:>15.2f}" if ref else f"{'':>15}"
+        lines.append(f"{name:<34} {c['best_s'] * 1e3:>14.2f} {c['median_s'] * 1e3:>13.2f} {ref}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Banc de mesure des parseurs, de REUSE, de la génération SQL et des stress")
+    ap.add_argument("--csv-dir", default=os.path.join("data", "output"), help="CSV servant de jeu d'essai")
+    ap.add_argument("--prefix", default="022025", help="date MMYYYY des CSV du jeu d'essai")
+    ap.add_argument("--date", default="02/2025", help="date MM/YYYY des paramètres ESMA des cas de stress")
+    ap.add_argument("--scales", default=",".join(map(str, SCALES)), help="facteurs de répétition des données")
+    ap.add_argument("--out", help="fichier JSON des résultats")
+    ap.add_argument("--baseline", help="JSON d'un passage précédent à comparer")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD, help="ralentissement toléré (0.25 = +25 %%)")
+    args = ap.parse_args()
+
+    results = run(args.csv_dir, args.prefix, [int(s) for s in args.scales.split(",")], args.date)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(report(results, baseline))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+        print(f"=> {args.out}")
+    if baseline:
+        slow = regressions(results, baseline, args.threshold)
+        if slow:
+            # second passage des échelles concernées : un ralentissement isolé est du bruit
+            print(f"=> {len(slow)} cas plus lents, nouvelle mesure")
+            rerun = run(args.csv_dir, args.prefix, sorted({case_scale(name) for name, *_ in slow}), args.date)
+            slow = confirm(slow, rerun, baseline, args.threshold)
+        for name, old, new, ratio in slow:
+            print(f"⚠️ Régression {name} : {old * 1e3:.2f} ms -> {new * 1e3:.2f} ms (x{ratio:.2f})")
+        if slow:
+            sys.exit(1)
+        print(f"=> Aucune régression au-delà de +{args.threshold:.0%}")
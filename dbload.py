@@ -0,0 +1,233 @@
+import os
+import re
+import sqlite3
+
+import pandas as pd
+
+from sqltxt import TABLES_META, load_tables, to_long
+
+# ---------------------------------------------------------------------
+# Chargement direct dans ST_MMF_Parameters (au lieu du texte UNION)
+# ---------------------------------------------------------------------
+TABLE_NAME = "ST_MMF_Parameters"
+KEY_COLS = ["Vintage", "Table_ID", "Line_Description", "Column_Description"]
+ALL_COLS = ["Vintage", "Table_ID", "Table_Description", "Line_Description",
+            "Column_Description", "Value"]
+BATCH_SIZE = 1000
+
+def sqlite_connect(target):
+    return sqlite3.connect(target)
+
+def mssql_connect(target):
+    # pyodbc n'est requis que pour SQL Server
+    import pyodbc
+    return pyodbc.connect(target, autocommit=False)
+
+# Dialectes : DDL, upsert, et options du curseur. Paramètres positionnels "?"
+# (sqlite3 et pyodbc).
+DIALECTS = {
+    "sqlite": {
+        "connect": sqlite_connect,
+        "default_target": os.path.join("data", "output", "mmf_parameters.sqlite"),
+        "create": [
+            f"""CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+                Vintage INTEGER NOT NULL,
+                Table_ID INTEGER NOT NULL,
+                Table_Description TEXT,
+                Line_Description TEXT NOT NULL,
+                Column_Description TEXT NOT NULL,
+                Value REAL)""",
+            f"""CREATE UNIQUE INDEX IF NOT EXISTS IX_{TABLE_NAME}_Key
+                ON {TABLE_NAME} ({", ".join(KEY_COLS)})""",
+        ],
+        "upsert": f"""INSERT INTO {TABLE_NAME} ({", ".join(ALL_COLS)})
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT ({", ".join(KEY_COLS)}) DO UPDATE SET
+                Table_Description = excluded.Table_Description,
+                Value = excluded.Value""",
+        "fast_executemany": False,
+    },
+    "mssql": {
+        "connect": mssql_connect,
+        "default_target": None,
+        "create": [
+            f"""IF OBJECT_ID(N'dbo.{TABLE_NAME}', N'U') IS NULL
+                CREATE TABLE dbo.{TABLE_NAME} (
+                    Vintage INT NOT NULL,
+                    Table_ID INT NOT NULL,
+                    Table_Description NVARCHAR(255) NULL,
+                    Line_Description NVARCHAR(255) NOT NULL,
+                    Column_Description NVARCHAR(100) NOT NULL,
+                    Value FLOAT NULL)""",
+            f"""IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_{TABLE_NAME}_Key')
+                CREATE UNIQUE INDEX IX_{TABLE_NAME}_Key
+                ON dbo.{TABLE_NAME} ({", ".join(KEY_COLS)})""",
+        ],
+        "upsert": f"""MERGE dbo.{TABLE_NAME} WITH (HOLDLOCK) AS t
+            USING (VALUES (?, ?, ?, ?, ?, ?)) AS s ({", ".join(ALL_COLS)})
+            ON {" AND ".join(f"t.{c} = s.{c}" for c in KEY_COLS)}
+            WHEN MATCHED THEN UPDATE SET
+                Table_Description = s.Table_Description, Value = s.Value
+            WHEN NOT MATCHED THEN INSERT ({", ".join(ALL_COLS)})
+                VALUES ({", ".join(f"s.{c}" for c in ALL_COLS)});""",
+        "fast_executemany": True,
+    },
+}
+
+def parameter_rows(tables, yyyymm):
+    """
+    Lignes (Vintage, Table_ID, Table_Description, Line_Description,
+    Column_Description, Value) : les mêmes que le texte de sqltxt.intotxt,
+    valeurs converties en nombres (4.3E-13 conservé tel quel, vide = NULL).
+    """
+    vintage = int(yyyymm)
+    rows = [(vintage, 0, "Etalonnages", "YYYY/MM étalonnages", "YYYY/MM étalonnages", float(yyyymm))]
+    for i, df in tables.items():
+        meta = TABLES_META[i]
+        long = to_long(i, df)
+        values = pd.to_numeric(long["value"], errors="coerce").astype(object)
+        values = values.where(values.notna(), None)
+        rows += zip([vintage] * len(long), [meta["select_num"]] * len(long),
+                    [meta["desc"]] * len(long), long["line"], long["column"], values)
+    rows.append((vintage, 13, "Choc de marché", "Choc de marché", "Choc de marché (%)", 95.0))
+    # une seule ligne par clé (la dernière l'emporte, comme l'upsert)
+    return list({r[:2] + r[3:5]: r for r in rows}.values())
+
+def load_vintage(conn, dialect, tables, yyyymm):
+    """
+    Upsert des paramètres d'une date dans une seule transaction, par lots
+    executemany, puis suppression des clés de cette date absentes du
+    chargement : relancer le chargement donne toujours le même état.
+    """
+    d = DIALECTS[dialect]
+    rows = parameter_rows(tables, yyyymm)
+    vintage = int(yyyymm)
+    cur = conn.cursor()
+    if d["fast_executemany"]:
+        cur.fast_executemany = True
+    try:
+        for stmt in d["create"]:
+            cur.execute(stmt)
+        for k in range(0, len(rows), BATCH_SIZE):
+            cur.executemany(d["upsert"], rows[k:k+BATCH_SIZE])
+
+        cur.execute(f"SELECT {', '.join(KEY_COLS)} FROM {TABLE_NAME} WHERE Vintage = ?", (vintage,))
+        loaded = {r[:2] + r[3:5] for r in rows}
+        stale = [tuple(r) for r in cur.fetchall() if tuple(r) not in loaded]
+        if stale:
+            cur.executemany(
+                f"DELETE FROM {TABLE_NAME} WHERE {' AND '.join(f'{c} = ?' for c in KEY_COLS)}",
+                stale)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows), len(stale)
+
+def expected_old(diff):
+    """{(Table_ID, Line_Description, Column_Description): valeur} de l'ancienne date d'après le diff."""
+    old = diff[diff["status"] != "inserted"]
+    values = old["old_Value"].astype(object).where(old["old_Value"].notna(), None)
+    return dict(zip(zip(old["Table_ID"].astype(int).tolist(), old["Line_Description"],
+                        old["Column_Description"]), values))
+
+def old_vintage_matches(cur, diff, old_yyyymm):
+    """L'ancienne date est-elle chargée, avec exactement les valeurs de ses CSV ?"""
+    cur.execute(f"SELECT Table_ID, Line_Description, Column_Description, Value FROM {TABLE_NAME} "
+                "WHERE Vintage = ?", (int(old_yyyymm),))
+    loaded = {(int(r[0]), r[1], r[2]): (None if r[3] is None else float(r[3])) for r in cur.fetchall()}
+    return loaded == expected_old(diff)
+
+def load_delta(conn, dialect, diff, old_yyyymm, new_yyyymm):
+    """
+    Chargement différentiel (diff de vintagediff.diff_params) : la nouvelle
+    date est reconstruite côté serveur depuis l'ancienne, puis upsert des
+    seules lignes insérées/modifiées et suppression des lignes disparues,
+    dans une seule transaction. Retourne None, sans rien écrire, si
+    l'ancienne date n'est pas chargée à l'identique de ses CSV.
+    """
+    d = DIALECTS[dialect]
+    new = int(new_yyyymm)
+    up = diff[diff["status"].isin(["inserted", "updated"])]
+    values = up["new_Value"].astype(object).where(up["new_Value"].notna(), None)
+    rows = list(zip([new] * len(up), up["Table_ID"].astype(int).tolist(), up["Table_Description"],
+                    up["Line_Description"], up["Column_Description"], values))
+    gone = diff[diff["status"] == "deleted"]
+    stale = list(zip([new] * len(gone), gone["Table_ID"].astype(int).tolist(),
+                     gone["Line_Description"], gone["Column_Description"]))
+    cur = conn.cursor()
+    if d["fast_executemany"]:
+        cur.fast_executemany = True
+    try:
+        for stmt in d["create"]:
+            cur.execute(stmt)
+        if not old_vintage_matches(cur, diff, old_yyyymm):
+            conn.rollback()
+            return None
+        cur.execute(f"DELETE FROM {TABLE_NAME} WHERE Vintage = ?", (new,))
+        cur.execute(f"""INSERT INTO {TABLE_NAME} ({", ".join(ALL_COLS)})
+            SELECT ?, {", ".join(ALL_COLS[1:])} FROM {TABLE_NAME} WHERE Vintage = ?""",
+                    (new, int(old_yyyymm)))
+        for k in range(0, len(rows), BATCH_SIZE):
+            cur.executemany(d["upsert"], rows[k:k+BATCH_SIZE])
+        if stale:
+            cur.executemany(
+                f"DELETE FROM {TABLE_NAME} WHERE {' AND '.join(f'{c} = ?' for c in KEY_COLS)}",
+                stale)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows), len(stale)
+
+def intodb(csv_dir, date_input, dialect="sqlite", target=None, since=None, old_prefix=None, prefix=None):
+    """
+    Charge une date ; avec `since` (date déjà chargée), chargement
+    différentiel, ou complet si cette date n'est pas chargée à l'identique.
+    `prefix` / `old_prefix` : préfixe des CSV de la date / de `since` si
+    différent de MMYYYY ("" pour les anciens table{i}.csv).
+    """
+    if not re.match(r'^(0[1-9]|1[0-2])/[0-9]{4}$', date_input):
+        raise ValueError("Format invalide, utilisez MM/YYYY")
+    prefix = date_input.replace("/", "") if prefix is None else prefix
+    yyyymm = date_input[3:] + date_input[:2]
+
+    d = DIALECTS[dialect]
+    target = target or d["default_target"]
+    if target is None:
+        raise ValueError(f"Chaîne de connexion requise pour {dialect}")
+    tables = load_tables(csv_dir, prefix)
+    if not tables:
+        raise FileNotFoundError(f"Aucun CSV de paramètres pour {date_input} dans {csv_dir}")
+    if since:
+        from vintagediff import diff_params, param_frame
+        if not re.match(r'^(0[1-9]|1[0-2])/[0-9]{4}$', since):
+            raise ValueError("Format invalide pour --since, utilisez MM/YYYY")
+        old_yyyymm = since[3:] + since[:2]
+        old_tables = load_tables(csv_dir, since.replace("/", "") if old_prefix is None else old_prefix)
+        if not old_tables:
+            raise FileNotFoundError(f"Aucun CSV de paramètres pour {since} dans {csv_dir}")
+        diff = diff_params(param_frame(old_tables, old_yyyymm), param_frame(tables, yyyymm))
+    conn = d["connect"](target)
+    try:
+        result = load_delta(conn, dialect, diff, old_yyyymm, yyyymm) if since else None
+        if since and result is None:
+            print(f"⚠️ {since} absente ou différente de ses CSV dans {TABLE_NAME} : chargement complet")
+        n, removed = result or load_vintage(conn, dialect, tables, yyyymm)
+    finally:
+        conn.close()
+    print(f"=> {n} paramètres chargés dans {TABLE_NAME} ({yyyymm}), {removed} supprimés")
+    return n
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description=f"Chargement des paramètres ESMA dans {TABLE_NAME}")
+    ap.add_argument("date", help="date du document (MM/YYYY)")
+    ap.add_argument("--csv-dir", default=os.path.join("data", "output"))
+    ap.add_argument("--dialect", choices=sorted(DIALECTS), default="sqlite")
+    ap.add_argument("--target", help="fichier SQLite ou chaîne ODBC SQL Server")
+    ap.add_argument("--since", help="date déjà chargée (MM/YYYY) : chargement différentiel")
+    ap.add_argument("--prefix", help='préfixe des CSV de la date ("" pour table{i}.csv)')
+    ap.add_argument("--old-prefix", help='préfixe des CSV de --since ("" pour table{i}.csv)')
+    args = ap.parse_args()
+    intodb(args.csv_dir, args.date, args.dialect, args.target, args.since, args.old_prefix, args.prefix)
@@ -0,0 +1,91 @@
+import numpy as np
+
+# ---------------------------------------------------------------------
+# Sommes exactes par fonds, indépendantes de l'ordre des lignes
+# ---------------------------------------------------------------------
+# Tout double fini est un multiple entier de 2**-SCALE (mantisse de 53 bits
+# du plus petit sous-normal) : une somme de doubles est donc une somme
+# d'entiers, exacte et associative. Les mantisses sont cumulées par
+# (fonds, exposant), en deux moitiés de 26/27 bits dont les sommes restent
+# exactes dans np.bincount, puis recombinées en entier Python par fonds.
+# Le résultat, arrondi une seule fois (division entière -> flottant
+# correctement arrondie, comme math.fsum), ne dépend ni de l'ordre des
+# lignes ni du découpage en blocs : un calcul par blocs redonne exactement
+# le calcul en mémoire.
+# Valeurs non finies (NaN, ±inf) : cumulées à part en flottant, le
+# résultat (NaN, ±inf) ne dépend pas non plus de l'ordre.
+SCALE = 1126
+HALF = 26
+SHIFTS = 2100
+# lignes par passage de np.bincount (somme des moitiés < 2**53)
+MAX_ROWS = 1 << 26
+
+def partial_sums(codes, values, n):
+    """
+    Sommes de `values` par code (0..n-1, codes < 0 ignorés) : (liste de n
+    entiers en unités de 2**-SCALE, tableau des sommes des valeurs non finies).
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    v = np.asarray(values, dtype=float)
+    keep = codes >= 0
+    codes, v = codes[keep], v[keep]
+    special = np.zeros(n)
+    finite = np.isfinite(v)
+    if not finite.all():
+        np.add.at(special, codes[~finite], v[~finite])
+        codes, v = codes[finite], v[finite]
+    nz = v != 0
+    codes, v = codes[nz], v[nz]
+    totals = [0] * n
+    if not len(v):
+        return totals, special
+
+    m, e = np.frexp(v)
+    mant = (m * 2.0 ** 53).astype(np.int64)
+    shift = e.astype(np.int64) + (SCALE - 53)
+    # exposants présents -> indices denses : une case par (fonds, exposant)
+    used = np.flatnonzero(np.bincount(shift, minlength=SHIFTS))
+    dense = np.zeros(SHIFTS, dtype=np.int64)
+    dense[used] = np.arange(len(used))
+    key = codes * len(used) + dense[shift]
+    bins = n * len(used)
+    if bins <= max(4 * len(v), 1 << 16):
+        # moitiés < 2**27, au plus MAX_ROWS lignes par case : sommes exactes en float64
+        hi = np.zeros(bins, dtype=np.int64)
+        lo = np.zeros(bins, dtype=np.int64)
+        for k in range(0, len(v), MAX_ROWS):
+            part = slice(k, k + MAX_ROWS)
+            hi += np.bincount(key[part], weights=mant[part] >> HALF, minlength=bins).astype(np.int64)
+            lo += np.bincount(key[part], weights=mant[part] & ((1 << HALF) - 1), minlength=bins).astype(np.int64)
+        cells = np.flatnonzero((hi != 0) | (lo != 0))
+        hi, lo = hi[cells], lo[cells]
+    else:
+        # beaucoup de fonds : tri des clés, cumul int64 par plage
+        order = np.argsort(key, kind="stable")
+        key = key[order]
+        mant = mant[order]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        hi = np.add.reduceat(mant >> HALF, starts)
+        lo = np.add.reduceat(mant & ((1 << HALF) - 1), starts)
+        cells = key[starts]
+    for k, h, l in zip(cells.tolist(), hi.tolist(), lo.tolist()):
+        fund, s = divmod(k, len(used))
+        totals[fund] += ((h << HALF) + l) << int(used[s])
+    return totals, special
+
+def merge(acc, part):
+    """Ajoute en place les sommes partielles `part` à `acc` (mêmes codes)."""
+    totals, special = part
+    for k, t in enumerate(totals):
+        acc[0][k] += t
+    np.add(acc[1], special, out=acc[1])
+
+def to_float(part):
+    """Sommes partielles -> tableau de flottants (arrondi unique)."""
+    totals, special = part
+    unit = 1 << SCALE
+    return np.array([t / unit for t in totals], dtype=float) + special
+
+def fund_sums(codes, values, n):
+    """Équivalent exact de np.bincount(codes, weights=values, minlength=n)."""
+    return to_float(partial_sums(codes, values, n))
@@ -1,22 +1,174 @@
+import os
+
+import numpy as np
 import pandas as pd
 
-tests = {
-    'ET':   {'d2024': 1, 's2024': 2},
-    'EEM':  {'d2024': 4, 's2024': 3},
-    'CM':   {'d2024': 5, 's2024': 5},
-    'ECRM': {'d2024': 5, 's2024': 10},
-}
-
-# Construction du dataFrame
-rows = []
-for name, vals in tests.items():
-    d = vals['d2024']
-    s = vals['s2024']
-    rows.append({
-        'Test': name,
-        'd2024': d,
-        's2024': s,
-        'delta2024': d - s
-    })
-df = pd.DataFrame(rows)
-print(df)
+import parsecache
+from sqltxt import check_date, load_tables
+from vintagediff import DIFF_KEY, param_frame
+
+# ---------------------------------------------------------------------
+# Comparaison de N dates : écarts, variations relatives et classements
+# ---------------------------------------------------------------------
+# Matrice paramètres x dates (clé Table_ID, Line_Description,
+# Column_Description), puis toutes les paires (ancienne, nouvelle) en une
+# opération NumPy : écart, variation en %, rang de l'écart absolu dans son
+# tableau (1 = plus forte variation). Une date sans CSV est une erreur ;
+# les anciens table{i}.csv se lisent avec un préfixe vide (01/2025=).
+# Résultat d'une paire : paramètres présents à l'une des deux dates, dans
+# l'ordre de leurs CSV ; il ne dépend que de la paire et est mis en cache
+# sur disque (parsecache, data/cache/) sous une clé dossier + dates +
+# préfixes + empreinte des CSV (csv_stamp) : seules les paires absentes du
+# cache sont recalculées.
+PAIR_VERSION = 1
+PAIR_COLUMNS = DIFF_KEY + ["Table_Description", "From", "To", "Value_from", "Value_to",
+                           "Delta", "Relative_change_pct", "Rank"]
+
+def yyyymm(date):
+    return date[3:] + date[:2]
+
+def param_matrix(csv_dir, dates, prefixes=None):
+    """
+    (matrice float paramètres x dates, clés + descriptions, matrice des
+    rangs de chaque paramètre dans le CSV de chaque date) ; absent = NaN.
+    `prefixes` : {date: préfixe des CSV} si différent de MMYYYY.
+    """
+    prefixes = prefixes or {}
+    series, descs, ranks = [], [], []
+    for d in dates:
+        tables = load_tables(csv_dir, prefixes.get(d, d.replace("/", "")))
+        if not tables:
+            raise FileNotFoundError(f"Aucun CSV de paramètres pour {d} dans {csv_dir}")
+        f = param_frame(tables, yyyymm(d))
+        f = f[f["Table_ID"] != 0].set_index(DIFF_KEY)
+        series.append(f["Value"].astype(float))
+        descs.append(f["Table_Description"])
+        ranks.append(pd.Series(np.arange(len(f), dtype=float), index=f.index))
+    m = pd.concat(series, axis=1, keys=dates, sort=False)
+    desc = pd.concat(descs).groupby(level=list(range(len(DIFF_KEY)))).first().reindex(m.index)
+    keys = m.index.to_frame(index=False).assign(Table_Description=desc.to_numpy())
+    order = pd.concat(ranks, axis=1, keys=dates, sort=False).reindex(m.index)
+    return m.to_numpy(dtype=float), keys, order.to_numpy(dtype=float)
+
+def compare_matrix(values, keys, dates, pairs=None):
+    """
+    Paires de colonnes de `values` (`pairs` = (i, j), par défaut toutes les
+    paires i < j) en une diffusion : un DataFrame long (PAIR_COLUMNS),
+    paire par paire.
+    """
+    n_params = len(keys)
+    i, j = pairs if pairs is not None else np.triu_indices(len(dates), 1)
+    a, b = values[:, i], values[:, j]
+    delta = b - a
+    rel = np.divide(delta, np.abs(a), out=np.full_like(delta, np.nan), where=a != 0) * 100
+
+    n_pairs = len(i)
+    dates = np.asarray(dates, dtype=object)
+    out = pd.concat([keys] * n_pairs, ignore_index=True) if n_pairs else keys.iloc[:0]
+    # ordre paire par paire : transposée (paires x paramètres) aplatie
+    out["From"] = np.repeat(dates[i], n_params)
+    out["To"] = np.repeat(dates[j], n_params)
+    out["Value_from"] = a.T.ravel()
+    out["Value_to"] = b.T.ravel()
+    out["Delta"] = delta.T.ravel()
+    out["Relative_change_pct"] = rel.T.ravel()
+    out["Rank"] = (out["Delta"].abs()
+                   .groupby([out["From"], out["To"], out["Table_ID"]])
+                   .rank(ascending=False, method="min"))
+    return out[PAIR_COLUMNS]
+
+def pair_frames(values, keys, order, dates, pairs):
+    """
+    {(ancienne, nouvelle): DataFrame} des paires `pairs` (i, j), calculées
+    en une diffusion : paramètres présents à l'une des deux dates, ceux de
+    l'ancienne dans l'ordre de son CSV puis les nouveaux.
+    """
+    i, j = pairs
+    out = compare_matrix(values, keys, dates, pairs)
+    n_params = len(keys)
+    pos_from, pos_to = order[:, i].T.ravel(), order[:, j].T.ravel()
+    n_from = np.repeat((~np.isnan(order[:, i])).sum(axis=0), n_params)
+    pair = np.repeat(np.arange(len(i)), n_params)
+    rank = np.where(np.isnan(pos_from), n_from + pos_to, pos_from)
+    rows = np.flatnonzero(~(np.isnan(pos_from) & np.isnan(pos_to)))
+    rows = rows[np.lexsort((rank[rows], pair[rows]))]
+    out, pair = out.iloc[rows], pair[rows]
+    bounds = np.searchsorted(pair, np.arange(len(i) + 1))
+    return {(dates[a], dates[b]): out.iloc[bounds[k]:bounds[k + 1]].reset_index(drop=True)
+            for k, (a, b) in enumerate(zip(i, j))}
+
+def pair_key(csv_dir, a, b, prefixes):
+    """Clé de cache d'une paire : dossier, dates, préfixes et empreinte de leurs CSV."""
+    parts = [os.path.abspath(csv_dir)]
+    for d in (a, b):
+        prefix = prefixes.get(d, d.replace("/", ""))
+        parts.append(f"{d}={prefix}:{parsecache.csv_stamp(csv_dir, prefix, range(1, 15))}")
+    return parsecache.cache_key("compare_vintages", "\n".join(parts), PAIR_VERSION)
+
+def compare_vintages(csv_dir, dates, prefixes=None):
+    """
+    Comparaison de toutes les paires de `dates` (MM/YYYY, triées par date).
+    Paires lues dans le cache disque ; les autres sont calculées en une
+    diffusion puis mises en cache. `prefixes` : {date: préfixe des CSV} si
+    différent de MMYYYY ("" pour les anciens table{i}.csv).
+    """
+    for d in dates:
+        check_date(d)
+    prefixes = prefixes or {}
+    dates = sorted(set(dates), key=yyyymm)
+    if len(dates) < 2:
+        return pd.DataFrame(columns=PAIR_COLUMNS)
+    pairs = [(a, b) for k, a in enumerate(dates) for b in dates[k + 1:]]
+    cache_keys = {p: pair_key(csv_dir, *p, prefixes) for p in pairs}
+    done = {p: parsecache.cache_get(k) for p, k in cache_keys.items()}
+    missing = [p for p in pairs if done[p] is None]
+    if missing:
+        need = sorted({d for p in missing for d in p}, key=yyyymm)
+        col = {d: k for k, d in enumerate(need)}
+        values, keys, order = param_matrix(csv_dir, need, prefixes)
+        idx = (np.array([col[a] for a, _ in missing]), np.array([col[b] for _, b in missing]))
+        for p, frame in pair_frames(values, keys, order, need, idx).items():
+            parsecache.cache_put(cache_keys[p], frame)
+            done[p] = frame
+    return pd.concat([done[p] for p in pairs], ignore_index=True)
+
+def parse_prefixes(items):
+    """["01/2025="] -> {"01/2025": ""}"""
+    prefixes = {}
+    for item in items or []:
+        date, sep, prefix = item.partition("=")
+        if not sep:
+            raise ValueError(f"Préfixe attendu sous la forme MM/YYYY=PREFIXE : {item}")
+        check_date(date)
+        prefixes[date] = prefix
+    return prefixes
+
+def summary(comparison, top=5):
+    """Par paire : nombre de paramètres modifiés et plus fortes variations relatives."""
+    lines = []
+    for (a, b), part in comparison.groupby(["From", "To"], sort=False):
+        changed = part[part["Delta"].fillna(0) != 0]
+        lines.append(f"=== {a} -> {b} : {len(changed)} paramètres modifiés sur {len(part)}")
+        biggest = changed.reindex(changed["Relative_change_pct"].abs().sort_values(ascending=False).index)
+        for r in biggest.head(top).itertuples(index=False):
+            lines.append(f"    table {r.Table_ID:>2} {r.Line_Description} / {r.Column_Description} : "
+                         f"{r.Value_from:g} -> {r.Value_to:g} ({r.Relative_change_pct:+.1f} %)")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Comparaison des paramètres ESMA entre plusieurs dates")
+    ap.add_argument("dates", nargs="+", help="dates à comparer (MM/YYYY), au moins deux")
+    ap.add_argument("--csv-dir", default=os.path.join("data", "output"))
+    ap.add_argument("--top", type=int, default=5, help="variations affichées par paire")
+    ap.add_argument("--prefix", action="append",
+                    help='MM/YYYY=PREFIXE des CSV d\'une date si différent de MMYYYY ("01/2025=" pour table{i}.csv)')
+    args = ap.parse_args()
+    if len(set(args.dates)) < 2:
+        ap.error("au moins deux dates distinctes")
+    comparison = compare_vintages(args.csv_dir, args.dates, parse_prefixes(args.prefix))
+    ordered = sorted(args.dates, key=yyyymm)
+    name = f"comparison_{ordered[0].replace('/', '')}_{ordered[-1].replace('/', '')}.csv"
+    comparison.to_csv(os.path.join(args.csv_dir, name), index=False, encoding="utf-8")
+    print(summary(comparison, args.top))
+    print(f"=> {name}")
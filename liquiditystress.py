@@ -0,0 +1,145 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from exactsum import fund_sums
+from marketstress import CORPORATE_TYPES
+from maturitygrid import maturity_grids
+from sqltxt import load_tables, typed
+
+# ---------------------------------------------------------------------
+# Stress de liquidité et de rachats ESMA (tables 1-3, 12, 13, 14)
+# ---------------------------------------------------------------------
+# Positions : colonnes de marketstress (Fund, AssetType, Country, Rating,
+# Maturity, MarketValue) + WLABucket (1, 2 ou vide) : classement de la
+# position dans les actifs liquides hebdomadaires de la table 12.
+# Fonds : Fund, ProfessionalShare, RetailShare (parts du passif, 0 à 1)
+# et, en option, NAV (par défaut, somme des valeurs de marché).
+#
+# Par fonds :
+# - sorties nettes : part professionnelle x table 13/14 + part retail x table 13/14 ;
+# - coût de liquidité : vente au prorata du portefeuille pour honorer les
+#   sorties (table 13), décote par position des tables 1 à 3 ;
+# - couverture WLA : (bucket 1 x 100 % + bucket 2 x 85 %) / sorties (table 13).
+
+# Pays de référence de la table 1
+REFERENCE_COUNTRIES = {"Germany": "DE", "Spain": "ES", "France": "FR", "Italy": "IT", "Netherlands": "NL"}
+LDF_RATINGS = ["AAA", "AA", "A", "BBB"]
+BELOW_BBB = "Below BBB or unrated"
+
+def liquidity_params(csv_dir, date_input, reload=False):
+    """Paramètres numériques des tables 1, 2, 3, 12, 13, 14 pour une date (reload=True : grilles de maturité relues)."""
+    prefix = date_input.replace("/", "")
+    t = {i: typed(i, df) for i, df in load_tables(csv_dir, prefix).items() if i in (12, 13, 14)}
+    grids = maturity_grids(csv_dir, date_input, reload)
+    buckets = t[12]["Pourcentage"].to_numpy(dtype=float) / 100.0
+    return {
+        "ldf_country": grids[1],
+        "ldf_sov": grids[2],
+        "ldf_corp": grids[3],
+        "wla_factors": np.pad(buckets, (0, max(0, 2 - len(buckets))))[:2],
+        "outflow": dict(zip(t[13]["Investor"], t[13]["NetOutflows(%)"] / 100.0)),
+        "outflow_macro": dict(zip(t[14]["Label"], t[14]["Value"] / 100.0)),
+    }
+
+def ldf_rating(rating):
+    r = rating.fillna("").astype(str).str.strip().str.upper().str.rstrip("+-")
+    return r.where(r.isin(LDF_RATINGS), BELOW_BBB)
+
+def discount_factors(holdings, params):
+    """Décote de liquidité (fraction) par position, tables 1 à 3."""
+    mat = holdings["Maturity"].to_numpy(dtype=float)
+    atype = holdings["AssetType"].astype(str)
+    rating = ldf_rating(holdings["Rating"])
+    code = holdings["Country"].astype(str).replace(REFERENCE_COUNTRIES)
+
+    by_country = params["ldf_country"](code, mat)
+    by_rating = params["ldf_sov"](rating, mat, fallback=BELOW_BBB)
+    corp = params["ldf_corp"](rating, mat, fallback=BELOW_BBB)
+
+    sov = np.where(np.isnan(by_country), by_rating, by_country)
+    ldf = np.select([atype == "Sovereign", atype.isin(CORPORATE_TYPES)], [sov, corp], 0.0)
+    return ldf / 100.0
+
+def wla_values(holdings, params):
+    """Valeur de marché de chaque position dans les buckets WLA 1, 2 de la table 12 ([] sans WLABucket)."""
+    if "WLABucket" not in holdings.columns:
+        return []
+    mv = holdings["MarketValue"].to_numpy(dtype=float)
+    b = pd.to_numeric(holdings["WLABucket"], errors="coerce").to_numpy(dtype=float)
+    return [np.where(b == k, mv, 0.0) for k in range(1, len(params["wla_factors"]) + 1)]
+
+def weighted_wla(bucket_sums, n, params):
+    """WLA pondérés par fonds à partir des valeurs de marché par bucket."""
+    wla = np.zeros(n)
+    for factor, values in zip(params["wla_factors"], bucket_sums):
+        wla += factor * values
+    return wla
+
+def wla_amounts(holdings, codes, n, params):
+    """Actifs liquides hebdomadaires pondérés (table 12) par fonds (codes 0..n-1)."""
+    return weighted_wla([fund_sums(codes, v, n) for v in wla_values(holdings, params)], n, params)
+
+def stress_liquidity(holdings, funds, params):
+    """
+    Résultats par fonds, pour toute une gamme de fonds en un appel :
+    NAV, sorties (table 13 et macro table 14), coût de liquidité, WLA et
+    ratio de couverture.
+    """
+    codes, names = pd.factorize(holdings["Fund"])
+    n = len(names)
+    mv = holdings["MarketValue"].to_numpy(dtype=float)
+    ldf = discount_factors(holdings, params)
+    return fund_liquidity(names, fund_sums(codes, mv, n), fund_sums(codes, mv * ldf, n),
+                          wla_amounts(holdings, codes, n, params), funds, params)
+
+def fund_outflows(nav, pro, ret, rates):
+    """Sorties par fonds : NAV x (part professionnelle x taux + part retail x taux)."""
+    return nav * (pro * rates.get("Professional investor", 0.0)
+                  + ret * rates.get("Retail investor", 0.0))
+
+def sale_fraction(outflow, nav):
+    """
+    Vente au prorata : même fraction de chaque position du fonds, sorties /
+    NAV plafonnées à 100 % (0 si NAV nulle). `outflow` peut être une matrice
+    (scénarios x fonds).
+    """
+    return np.minimum(np.divide(outflow, nav, out=np.zeros(np.shape(outflow)), where=nav > 0), 1.0)
+
+def fund_liquidity(names, market_value, ldf_value, wla, funds, params):
+    """
+    Résultats par fonds à partir des agrégats par fonds : valeur de marché,
+    valeur x décote de liquidité et WLA pondérés.
+    """
+    n = len(names)
+    f = funds.set_index("Fund").reindex(names)
+    nav = market_value
+    if "NAV" in f.columns:
+        nav = np.where(f["NAV"].notna(), f["NAV"].to_numpy(dtype=float), nav)
+    pro = f["ProfessionalShare"].fillna(0.0).to_numpy(dtype=float)
+    ret = f["RetailShare"].fillna(0.0).to_numpy(dtype=float)
+    out = fund_outflows(nav, pro, ret, params["outflow"])
+    out_macro = fund_outflows(nav, pro, ret, params["outflow_macro"])
+    cost = ldf_value * sale_fraction(out, nav)
+
+    return pd.DataFrame({
+        "NAV": nav,
+        "outflow": out,
+        "outflow_macro": out_macro,
+        "liquidity_cost": cost,
+        "liquidity_cost_pct": np.divide(cost, nav, out=np.zeros(n), where=nav > 0) * 100,
+        "wla": wla,
+        "wla_coverage_pct": np.divide(wla, out, out=np.full(n, np.inf), where=out > 0) * 100,
+    }, index=pd.Index(names, name="Fund"))
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Stress de liquidité et de rachats ESMA")
+    ap.add_argument("holdings", help="CSV des positions (Fund, AssetType, Country, Rating, Maturity, MarketValue, WLABucket)")
+    ap.add_argument("funds", help="CSV des fonds (Fund, ProfessionalShare, RetailShare[, NAV])")
+    ap.add_argument("date", help="date des paramètres ESMA (MM/YYYY)")
+    ap.add_argument("--csv-dir", default=os.path.join("data", "output"))
+    args = ap.parse_args()
+    params = liquidity_params(args.csv_dir, args.date)
+    print(stress_liquidity(pd.read_csv(args.holdings), pd.read_csv(args.funds), params).to_string())
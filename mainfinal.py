@@ -1,7 +1,11 @@
+import csv
 import os
 import re
-import pandas as pd
-from datetime import datetime
+
+import metrics
+import parsecache
+import tablespec
+from tablespec import clean_pdf_text
 
 # ---------------------------------------------------------------------
 # Configuration : dossier de sortie et texte parasite à supprimer
@@ -9,10 +13,8 @@ from datetime import datetime
 OUTPUT_DIR = os.path.join('data', 'output')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-UNWANTED_REGEX = r"ESMA - 201-203.*?www\.esma\.europa\.eu \d+"
-
-def clean_pdf_text(raw_text):
-    return re.sub(UNWANTED_REGEX, "", raw_text)
+# À incrémenter à chaque modification d'un parseur (invalide le cache)
+PARSER_VERSION = 3
 
 # ---------------------------------------------------------------------
 # Lecture multi-lignes depuis la console
@@ -21,7 +23,7 @@ def read_multiline_input(prompt):
     """
     - Collez votre tableau, terminez par 'END'.
     - Tapez 'SKIP' pour passer ce tableau.
-    - Tapez 'REUSE' pour réutiliser le dernier CSV existant.
+    - Tapez 'REUSE' pour réutiliser le CSV de la date antérieure la plus récente.
     """
     print(prompt)
     print("(Terminez l'entrée par 'END'. Tapez 'SKIP' pour passer, 'REUSE' pour réutiliser.)")
@@ -37,271 +39,128 @@ def read_multiline_input(prompt):
     return "\n".join(lines)
 
 # ---------------------------------------------------------------------
-# Réutilisation du CSV le plus récent
+# Réutilisation du CSV le plus récent (pointeur dans le manifeste)
 # ---------------------------------------------------------------------
 def reuse_latest(table_num, prefix):
-    pattern = re.compile(r'^(\d{6})table' + str(table_num) + r'\.csv$')
-    candidates = []
-    for fname in os.listdir(OUTPUT_DIR):
-        m = pattern.match(fname)
-        if m:
-            dt = datetime.strptime(m.group(1), "%m%Y")
-            candidates.append((dt, fname))
-    if not candidates:
-        print(f"⚠️ Aucun CSV existant pour table{table_num} à réutiliser.")
+    found = parsecache.latest_entry(OUTPUT_DIR, table_num, prefix)
+    if not found:
+        print(f"⚠️ Aucun CSV antérieur à {prefix} pour table{table_num} à réutiliser.")
         return None
-    latest = max(candidates, key=lambda x: x[0])[1]
-    df = pd.read_csv(os.path.join(OUTPUT_DIR, latest), dtype=str)
-    new_name = f"{prefix}table{table_num}.csv"
-    df.to_csv(os.path.join(OUTPUT_DIR, new_name), index=False, encoding="utf-8")
-    print(f"=> Réutilisé {latest} → {new_name}")
-    return df
+    latest, key = found[1]["file"], found[1].get("key")
+    parsecache.record(OUTPUT_DIR, prefix, table_num, latest, key, reused=True)
+    print(f"=> Réutilisé {latest} → {prefix}table{table_num} (pointeur, sans copie)")
+    return latest
 
 # ---------------------------------------------------------------------
-# Parseurs pour les tableaux (1 à 14)
+# Parseurs pour les tableaux (1 à 14) : specs compilées de tablespec.py
 # ---------------------------------------------------------------------
+# API DataFrame (pandas importé à la demande) ; la chaîne de traitement
+# passe par tablespec.parse_rows et le module csv.
 def parse_table_1_and_2(raw_text):
-    # ... ton code existant pour parser 1 & 2 ...
-    # (inchangé)
-    text = clean_pdf_text(raw_text)
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    if len(lines) < 3:
-        return pd.DataFrame(), pd.DataFrame()
-    table1_data = []
-    table2_data = []
-    for line in lines[2:]:
-        tokens = line.split()
-        new_tokens = []
-        skip = 0
-        for i, t in enumerate(tokens):
-            if skip:
-                skip -= 1
-                continue
-            if i + 3 < len(tokens) and tokens[i] == "Below" and tokens[i+1] == "BBB" and tokens[i+2] == "or" and tokens[i+3] == "unrated":
-                new_tokens.append("Below BBB or unrated")
-                skip = 3
-            else:
-                new_tokens.append(t)
-        if len(new_tokens) != 12:
-            print(f"Format inattendu dans Tableaux 1&2 : {line}")
-            continue
-        table1_data.append(new_tokens[:6])
-        table2_data.append(new_tokens[6:])
-    columns1 = ["Country", "3M", "6M", "1Y", "1.5Y", "2Y"]
-    columns2 = ["Rating", "3M", "6M", "1Y", "1.5Y", "2Y"]
-    df1 = pd.DataFrame(table1_data, columns=columns1)
-    df2 = pd.DataFrame(table2_data, columns=columns2)
-    return df1, df2
+    return tablespec.parse("parse_table_1_and_2", raw_text)
 
 def parse_table_3(raw_text):
-    # ... ton code existant pour parser 3 ...
-    text = clean_pdf_text(raw_text)
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    if len(lines) < 2:
-        return pd.DataFrame()
-    header_tokens = lines[1].split()
-    if len(header_tokens) != 5:
-        print("Attention (Table 3) : ligne d'en-tête inattendue.")
-        return pd.DataFrame()
-    columns = ["Rating"] + header_tokens
-    table_data = []
-    for line in lines[2:]:
-        tokens = line.split()
-        new_tokens = []
-        skip = 0
-        for i, t in enumerate(tokens):
-            if skip:
-                skip -= 1
-                continue
-            if i + 3 < len(tokens) and tokens[i] == "Below" and tokens[i+1] == "BBB" and tokens[i+2] == "or" and tokens[i+3] == "unrated":
-                new_tokens.append("Below BBB or unrated")
-                skip = 3
-            else:
-                new_tokens.append(t)
-        if len(new_tokens) != 6:
-            print(f"Format inattendu dans Table 3: {line}")
-            continue
-        table_data.append(new_tokens)
-    return pd.DataFrame(table_data, columns=columns)
+    return tablespec.parse("parse_table_3", raw_text)
 
 def parse_table_4(raw_text):
-    # ... ton code existant pour parser 4 ...
-    text = clean_pdf_text(raw_text)
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    data_rows = []
-    for i, line in enumerate(lines):
-        if i == 0:
-            continue
-        tokens = line.split()
-        if len(tokens) < 2:
-            continue
-        label = " ".join(tokens[:-1])
-        value = tokens[-1]
-        data_rows.append([label, value])
-    return pd.DataFrame(data_rows, columns=["Label", "Value"])
+    return tablespec.parse("parse_table_4", raw_text)
 
 def parse_table_5(raw_text):
-    # ... idem pour 5 ...
-    import re
-    text = clean_pdf_text(raw_text)
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    data_lines = lines[2:]
-    table_data = []
-    num_pattern = re.compile(r'^-?\d+(?:\.\d+)?(?:E-?\d+)?$')
-    known_geos = ["Advanced economies","Emerging markets","EA (weighted averages)","EU (weighted averages)"]
-    for line in data_lines:
-        parts = line.rsplit(maxsplit=4)
-        if len(parts) < 5:
-            continue
-        text_part, *nums = parts
-        if not all(num_pattern.match(x) for x in nums):
-            continue
-        geo = None; country = ""
-        for kg in known_geos:
-            if text_part.startswith(kg):
-                geo = kg
-                country = text_part[len(kg):].strip()
-                break
-        if geo is None:
-            toks = text_part.split()
-            geo = toks[0]
-            country = " ".join(toks[1:])
-        if country == "":
-            country = geo
-        table_data.append([geo, country] + nums)
-    cols = ["Geographic Area","Country","3M","6M","1Y","2Y"]
-    return pd.DataFrame(table_data, columns=cols)
+    return tablespec.parse("parse_table_5", raw_text)
 
 def parse_table_6(raw_text):
-    # ... idem pour 6 ...
-    text = clean_pdf_text(raw_text)
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    data_lines = lines[2:]
-    table_data = []
-    for line in data_lines:
-        tokens = line.split()
-        if len(tokens) != 5:
-            print(f"Format inattendu dans Table 6 : {line}")
-            continue
-        table_data.append(tokens)
-    cols = ["Rating","Non-financial","Financial covered","Financial","ABS"]
-    return pd.DataFrame(table_data, columns=cols)
+    return tablespec.parse("parse_table_6", raw_text)
 
 def parse_table_7(raw_text):
-    # ... idem pour 7 ...
-    text = clean_pdf_text(raw_text)
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    data_rows = []
-    for i, line in enumerate(lines):
-        if i == 0: continue
-        tokens = line.split()
-        if len(tokens) < 2: continue
-        data_rows.append([" ".join(tokens[:-1]), tokens[-1]])
-    return pd.DataFrame(data_rows, columns=["Label","Value"])
+    return tablespec.parse("parse_table_7", raw_text)
 
 def parse_table_8(raw_text):
-    # ... idem pour 8 ...
-    import re
-    text = clean_pdf_text(raw_text)
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    data_lines = lines[3:]
-    fixed = []
-    for line in data_lines:
-        if fixed and line and line[0].islower():
-            fixed[-1] += " " + line
-        else:
-            fixed.append(line)
-    known_areas = ["EU","Rest of Europe","North America","Australia and Pacific","South and Central America","Asia","Africa"]
-    rows = []
-    for line in fixed:
-        parts = line.rsplit(maxsplit=5)
-        if len(parts) < 6: continue
-        text_part, v1, v2, v3, v4, v5 = parts
-        for area in known_areas:
-            if text_part.startswith(area + " "):
-                text_part = text_part[len(area):].strip()
-                break
-        m = re.search(r"Interest rate swap", text_part)
-        country = text_part[:m.start()].strip() if m else text_part
-        rows.append([country, v1, v2, v3, v4, v5])
-    return pd.DataFrame(rows, columns=["Country","1M","3M","6M","1Y","2Y"])
+    return tablespec.parse("parse_table_8", raw_text)
 
 def parse_table_9(raw_text):
-    # ... idem pour 9 ...
-    import re
-    text = clean_pdf_text(raw_text)
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    data_lines = lines[3:]
-    table_data = []
-    i = 0
-    while i < len(data_lines):
-        line = data_lines[i]
-        nums = re.findall(r'\d+', line)
-        if len(nums) >= 5:
-            geo = re.split(r'\s+Default value', line)[0].strip()
-            table_data.append([geo] + nums[-5:])
-            i += 1
-        else:
-            if i+1 < len(data_lines):
-                next_nums = re.findall(r'\d+', data_lines[i+1])
-                if len(next_nums) == 5:
-                    geo = re.split(r'\s+Default value', line)[0].strip()
-                    table_data.append([geo] + next_nums)
-                    i += 2
-                else:
-                    i += 1
-            else:
-                i += 1
-    return pd.DataFrame(table_data, columns=["Geographic Area","1M","3M","6M","1Y","2Y"])
+    return tablespec.parse("parse_table_9", raw_text)
 
 def parse_table_10(raw_text):
-    # ... idem pour 10 ...
-    text = clean_pdf_text(raw_text)
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    data_lines = lines[3:]
-    fixed = []
-    for line in data_lines:
-        if fixed and line and line[0].islower():
-            fixed[-1] += " " + line
-        else:
-            fixed.append(line)
-    rows = []
-    for line in fixed:
-        parts = line.rsplit(maxsplit=2)
-        if len(parts) == 3 and re.match(r'^-?\d+(\.\d+)?$', parts[2]):
-            rows.append([parts[1], parts[2]])
-    return pd.DataFrame(rows, columns=["ExchangeRateName","Shock"])
+    return tablespec.parse("parse_table_10", raw_text)
 
 def parse_table_11(raw_text):
-    # ... idem pour 11 ...
-    return parse_table_10(raw_text)  # même logique que 10
+    return tablespec.parse("parse_table_11", raw_text)
 
 def parse_table_12_and_13(raw_text):
-    import re
-    text = clean_pdf_text(raw_text)
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    # Table 13
-    inv_pat = re.compile(r'(Professional investor|Retail investor)\s+(\d+)')
-    rows13 = [[m.group(1), m.group(2)] for l in lines if (m:=inv_pat.search(l))]
-    df13 = pd.DataFrame(rows13, columns=["Investor","NetOutflows(%)"])
-    # Table 12
-    buckets = []
-    for l in lines:
-        if "x100%" in l: buckets.append(["Weekly liquid assets (bucket 1)",100])
-        if "x85%" in l:  buckets.append(["Weekly liquid assets (bucket 2)",85])
-    df12 = pd.DataFrame(buckets, columns=["BucketInfo","Pourcentage"])
-    return df12, df13
+    return tablespec.parse("parse_table_12_and_13", raw_text)
 
 def parse_table_14(raw_text):
-    text = clean_pdf_text(raw_text)
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    rows = []
-    for i, line in enumerate(lines):
-        if i == 0: continue
-        toks = line.split()
-        if len(toks) < 2: continue
-        rows.append([" ".join(toks[:-1]), toks[-1]])
-    return pd.DataFrame(rows, columns=["Label","Value"])
+    return tablespec.parse("parse_table_14", raw_text)
+
+# ---------------------------------------------------------------------
+# Groupes de tableaux (ordre du document ESMA)
+# ---------------------------------------------------------------------
+TABLES = [
+    {"desc": "Tableaux 1 & 2",  "func": "parse_table_1_and_2",  "count": 2},
+    {"desc": "Tableau 3",       "func": "parse_table_3",        "count": 1},
+    {"desc": "Tableau 4",       "func": "parse_table_4",        "count": 1},
+    {"desc": "Tableau 5",       "func": "parse_table_5",        "count": 1},
+    {"desc": "Tableau 6",       "func": "parse_table_6",        "count": 1},
+    {"desc": "Tableau 7",       "func": "parse_table_7",        "count": 1},
+    {"desc": "Tableau 8",       "func": "parse_table_8",        "count": 1},
+    {"desc": "Tableau 9",       "func": "parse_table_9",        "count": 1},
+    {"desc": "Tableau 10",      "func": "parse_table_10",       "count": 1},
+    {"desc": "Tableau 11",      "func": "parse_table_11",       "count": 1},
+    {"desc": "Tableaux 12 & 13","func": "parse_table_12_and_13","count": 2},
+    {"desc": "Tableau 14",      "func": "parse_table_14",       "count": 1},
+]
+
+DATE_REGEX = r'^(0[1-9]|1[0-2])\/\d{4}$'
+
+def write_csv(path, columns, rows):
+    """CSV identique à DataFrame.to_csv(index=False) : guillemets minimaux, fins de ligne \\n."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, lineterminator="\n")
+        w.writerow(columns)
+        w.writerows(rows)
+
+def save_result(result, prefix, table_num, count):
+    """Écrit les tableaux [(colonnes, lignes)] d'un groupe à partir de table_num."""
+    with metrics.stage("csv", table=table_num) as st:
+        names = [f"{prefix}table{n}.csv" for n in range(table_num, table_num + count)]
+        for fn, (columns, rows) in zip(names, result):
+            write_csv(os.path.join(OUTPUT_DIR, fn), columns, rows)
+        if count == 2:
+            print(f"=> Sauvegardés : {names[0]} et {names[1]}")
+        else:
+            print(f"=> Sauvegardé : {names[0]}")
+        if st:
+            st.add(rows=sum(len(rows) for _, rows in result),
+                   bytes=sum(os.path.getsize(os.path.join(OUTPUT_DIR, fn)) for fn in names))
+
+def parse_and_save(func_key, raw, prefix, table_num, count):
+    """
+    Parse un groupe de tableaux via le cache : texte inchangé => ni parsing
+    ni réécriture des CSV déjà produits pour cette date.
+    """
+    with metrics.stage("parse", group=func_key, table=table_num) as st:
+        _parse_and_save(func_key, raw, prefix, table_num, count, st)
+
+def _parse_and_save(func_key, raw, prefix, table_num, count, st):
+    key = parsecache.cache_key(func_key, clean_pdf_text(raw), PARSER_VERSION)
+    nums = range(table_num, table_num + count)
+    manifest = parsecache.read_manifest(OUTPUT_DIR, prefix)
+    own = {n: f"{prefix}table{n}.csv" for n in nums}
+    if all(manifest.get(str(n), {}).get("key") == key and manifest[str(n)]["file"] == own[n]
+           and os.path.exists(os.path.join(OUTPUT_DIR, own[n])) for n in nums):
+        print(f"=> Inchangé : {', '.join(own.values())}")
+        st.set(cache="unchanged")
+        return
+    result = parsecache.cache_get(key)
+    if result is None:
+        result = tablespec.parse_rows(func_key, raw)
+        parsecache.cache_put(key, result)
+        st.set(cache="miss")
+    else:
+        st.set(cache="hit")
+    save_result(result, prefix, table_num, count)
+    for n in nums:
+        parsecache.record(OUTPUT_DIR, prefix, n, own[n], key)
 
 # ---------------------------------------------------------------------
 # MAIN : Itérer sur les tableaux et sauvegarder les CSV
@@ -310,30 +169,14 @@ def main():
     # 1) Saisie de la date
     while True:
         date_doc = input("Entrez la date du document MMF de l'ESMA (MM/YYYY) : ").strip()
-        if re.match(r'^(0[1-9]|1[0-2])\/\d{4}$', date_doc):
+        if re.match(DATE_REGEX, date_doc):
             break
         print("Format invalide, réessayez (ex. 02/2025).")
     prefix = date_doc.replace("/", "")
 
-    tables = [
-        {"desc": "Tableaux 1 & 2",  "func": "parse_table_1_and_2",  "count": 2},
-        {"desc": "Tableau 3",       "func": "parse_table_3",        "count": 1},
-        {"desc": "Tableau 4",       "func": "parse_table_4",        "count": 1},
-        {"desc": "Tableau 5",       "func": "parse_table_5",        "count": 1},
-        {"desc": "Tableau 6",       "func": "parse_table_6",        "count": 1},
-        {"desc": "Tableau 7",       "func": "parse_table_7",        "count": 1},
-        {"desc": "Tableau 8",       "func": "parse_table_8",        "count": 1},
-        {"desc": "Tableau 9",       "func": "parse_table_9",        "count": 1},
-        {"desc": "Tableau 10",      "func": "parse_table_10",       "count": 1},
-        {"desc": "Tableau 11",      "func": "parse_table_11",       "count": 1},
-        {"desc": "Tableaux 12 & 13","func": "parse_table_12_and_13","count": 2},
-        {"desc": "Tableau 14",      "func": "parse_table_14",       "count": 1},
-    ]
-
-    parse_functions = {g["func"]: globals()[g["func"]] for g in tables}
     table_num = 1
 
-    for group in tables:
+    for group in TABLES:
         desc, func_key, count = group["desc"], group["func"], group["count"]
         user_input = read_multiline_input(f"\nVeuillez coller le contenu pour {desc} :")
 
@@ -351,23 +194,76 @@ def main():
             continue
 
         # PARSING NORMAL
-        parser = parse_functions[func_key]
-        result = parser(user_input)
-
-        if count == 2:
-            dfA, dfB = result
-            fnA = f"{prefix}table{table_num}.csv"
-            fnB = f"{prefix}table{table_num+1}.csv"
-            dfA.to_csv(os.path.join(OUTPUT_DIR, fnA), index=False, encoding="utf-8")
-            dfB.to_csv(os.path.join(OUTPUT_DIR, fnB), index=False, encoding="utf-8")
-            print(f"=> Sauvegardés : {fnA} et {fnB}")
-        else:
-            df = result
-            fn = f"{prefix}table{table_num}.csv"
-            df.to_csv(os.path.join(OUTPUT_DIR, fn), index=False, encoding="utf-8")
-            print(f"=> Sauvegardé : {fn}")
+        parse_and_save(func_key, user_input, prefix, table_num, count)
 
         table_num += count
 
+# ---------------------------------------------------------------------
+# MODE PDF : extraction directe des tableaux, sans saisie console
+# ---------------------------------------------------------------------
+def group_starts():
+    """{nom du parseur: (groupe, n° du premier tableau)}, dans l'ordre du document."""
+    starts, table_num = {}, 1
+    for group in TABLES:
+        starts[group["func"]] = (group, table_num)
+        table_num += group["count"]
+    return starts
+
+def run_group(group, table_num, raw, prefix, errors):
+    """Parse et sauvegarde un groupe de tableaux (raw None = SKIP, "REUSE" = REUSE)."""
+    desc, func_key, count = group["desc"], group["func"], group["count"]
+    if raw is None:
+        print(f"=> {desc} SKIPPED")
+        return
+    if raw == "REUSE":
+        for tn in range(table_num, table_num + count):
+            if reuse_latest(tn, prefix) is None:
+                errors.append(f"{desc} : aucun CSV table{tn} à réutiliser")
+        return
+    try:
+        parse_and_save(func_key, raw, prefix, table_num, count)
+    except Exception as e:
+        print(f"⚠️ {desc} : erreur {e!r}")
+        errors.append(f"{desc} : {e!r}")
+
+def missing_group(group, source, errors):
+    print(f"⚠️ {group['desc']} introuvable dans {source}, ignoré")
+    errors.append(f"{group['desc']} : introuvable")
+
+def run_texts(texts, prefix, source):
+    """
+    Parse et sauvegarde chaque groupe de tableaux à partir de
+    {nom du parseur: texte brut} (None = SKIP). Retourne la liste des erreurs.
+    """
+    errors = []
+    for func_key, (group, table_num) in group_starts().items():
+        raw = texts.get(func_key)
+        if raw is None and func_key not in texts or raw == "":
+            missing_group(group, source, errors)
+            continue
+        run_group(group, table_num, raw, prefix, errors)
+    return errors
+
+def main_pdf(pdf_path, date_doc):
+    if not re.match(DATE_REGEX, date_doc):
+        raise ValueError("Format invalide, utilisez MM/YYYY")
+    prefix = date_doc.replace("/", "")
+
+    from pdfextract import extract_table_texts
+    texts = extract_table_texts(pdf_path)
+    return run_texts(texts, prefix, pdf_path)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    ap = argparse.ArgumentParser(description="Extraction des tableaux du stress test MMF de l'ESMA")
+    ap.add_argument("--pdf", help="PDF ESMA à traiter sans saisie console")
+    ap.add_argument("--date", help="date du document (MM/YYYY), requise avec --pdf")
+    metrics.add_arguments(ap)
+    args = ap.parse_args()
+    metrics.from_args(args)
+    if args.pdf:
+        if not args.date:
+            ap.error("--date est requis avec --pdf")
+        main_pdf(args.pdf, args.date)
+    else:
+        main()
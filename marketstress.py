@@ -0,0 +1,143 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from exactsum import fund_sums
+from maturitygrid import maturity_grids
+from sqltxt import load_tables, typed
+
+# ---------------------------------------------------------------------
+# Stress de marché ESMA sur un portefeuille (tables 5, 6, 8, 9, 10, 11)
+# ---------------------------------------------------------------------
+# Colonnes attendues des positions (une ligne par ligne de portefeuille) :
+#   ISIN, AssetType, Country, Rating, Maturity (maturité résiduelle en
+#   années), Currency, MarketValue (en EUR) et, en option, Fund.
+# AssetType : "Sovereign" (table 5), "Non-financial", "Financial covered",
+# "Financial", "ABS" (table 6) ; les autres types (dépôts, repos, parts
+# de MMF...) ne subissent pas de choc de spread.
+# Pertes positives, en EUR : valeur x choc (pb) / 10 000 x duration, la
+# duration étant approchée par la maturité résiduelle.
+HOLDING_COLUMNS = ["ISIN", "AssetType", "Country", "Rating", "Maturity", "Currency", "MarketValue"]
+
+CORPORATE_TYPES = ["Non-financial", "Financial covered", "Financial", "ABS"]
+
+EURO_AREA = [
+    "Austria", "Belgium", "Croatia", "Cyprus", "Estonia", "Finland", "France", "Germany",
+    "Greece", "Ireland", "Italy", "Latvia", "Lithuania", "Luxembourg", "Malta",
+    "Netherlands", "Portugal", "Slovakia", "Slovenia", "Spain",
+]
+
+# Zone de la table 5 -> valeur par défaut de la table 9
+DEFAULT_IR_AREA = {"EU": "EU", "Advanced economies": "Other advanced economies"}
+
+def fx_changes(df):
+    """
+    Variation relative du cours EURxxx par devise, à partir des paires
+    EURxxx, USDxxx et xxxUSD de la table 10 ou 11 (croisement via EURUSD).
+    """
+    shocks = dict(zip(df["ExchangeRateName"], df["Shock"] / 100.0))
+    usd = shocks.get("EURUSD", 0.0)
+    out = {"EUR": 0.0, "USD": usd}
+    for name, s in shocks.items():
+        if np.isnan(s):
+            continue
+        base, quote = name[:3], name[3:]
+        if base == "EUR":
+            out[quote] = s
+        elif base == "USD":
+            out[quote] = (1 + usd) * (1 + s) - 1
+        elif quote == "USD":
+            out[base] = (1 + usd) / (1 + s) - 1
+    return out
+
+def market_params(csv_dir, date_input, reload=False):
+    """Paramètres numériques des tables 5, 6, 8, 9, 10, 11 pour une date (reload=True : grilles de maturité relues)."""
+    prefix = date_input.replace("/", "")
+    t = {i: typed(i, df) for i, df in load_tables(csv_dir, prefix).items() if i in (5, 6, 10, 11)}
+    grids = maturity_grids(csv_dir, date_input, reload)
+    return {
+        "gov": grids[5],
+        "gov_area": dict(zip(t[5]["Country"], t[5]["Geographic Area"])),
+        "corp": (pd.Index(t[6]["Rating"]), t[6][CORPORATE_TYPES].to_numpy(dtype=float)),
+        "ir": grids["ir"],
+        "fx_up": fx_changes(t[10]),
+        "fx_down": fx_changes(t[11]),
+    }
+
+def normalize_rating(rating):
+    """AA+ -> AA, BBB- -> BBB ; CCC et en dessous (ou non noté) -> ≤CCC."""
+    r = rating.fillna("").astype(str).str.strip().str.upper().str.rstrip("+-")
+    return r.where(r.isin(["AAA", "AA", "A", "BBB", "BB", "B"]), "≤CCC")
+
+def lookup(index, keys, fallback):
+    """Indices de `keys` dans `index` ; clés inconnues -> ligne `fallback`."""
+    idx = index.get_indexer(keys)
+    return np.where(idx < 0, index.get_loc(fallback), idx)
+
+def stress_market(holdings, params):
+    """
+    Pertes par position pour chaque scénario de marché :
+    loss_spread (tables 5/6), loss_ir (tables 8/9), loss_fx_up / loss_fx_down
+    (appréciation / dépréciation de l'EUR, tables 10/11).
+    """
+    h = holdings
+    mv = h["MarketValue"].to_numpy(dtype=float)
+    mat = h["Maturity"].to_numpy(dtype=float)
+    atype = h["AssetType"].astype(str).to_numpy()
+    country = h["Country"].astype(str)
+
+    # Spread de crédit : souverains par pays et maturité, corporates par note
+    gov_bp = params["gov"](country, mat, fallback="Emerging markets")
+    corp_index, corp_grid = params["corp"]
+    corp_rows = lookup(corp_index, normalize_rating(h["Rating"]), "≤CCC")
+    cat = pd.Index(CORPORATE_TYPES).get_indexer(atype)
+    corp_bp = np.where(cat >= 0, corp_grid[corp_rows, np.maximum(cat, 0)], 0.0)
+    spread_bp = np.where(atype == "Sovereign", gov_bp, corp_bp)
+
+    # Taux : pays de la table 8 (zone euro -> "Euro area"), sinon défaut table 9
+    ir = params["ir"]
+    area = country.map(params["gov_area"]).map(DEFAULT_IR_AREA).fillna("Other emerging markets")
+    keys = country.where(~country.isin(EURO_AREA), "Euro area")
+    keys = keys.where(ir.rows(keys) >= 0, area)
+    ir_bp = ir(keys, mat, fallback="Other emerging markets")
+
+    # Change : perte = VM x r / (1 + r), r = variation du cours EURxxx
+    ccy = h["Currency"].astype(str)
+    out = pd.DataFrame({"ISIN": h["ISIN"].to_numpy(), "MarketValue": mv})
+    if "Fund" in h.columns:
+        out.insert(0, "Fund", h["Fund"].to_numpy())
+    out["loss_spread"] = mv * spread_bp / 1e4 * mat
+    out["loss_ir"] = mv * ir_bp / 1e4 * mat
+    for name in ("fx_up", "fx_down"):
+        r = ccy.map(params[name]).fillna(0.0).to_numpy(dtype=float)
+        out[f"loss_{name}"] = mv * r / (1.0 + r)
+    return out
+
+def loss_columns(losses):
+    return [c for c in losses.columns if c.startswith("loss_")]
+
+def fund_summary(losses):
+    """Pertes totales et en % de l'actif par fonds (ou pour le portefeuille)."""
+    cols = loss_columns(losses)
+    fund = losses["Fund"] if "Fund" in losses.columns else pd.Series("ALL", index=losses.index)
+    codes, names = pd.factorize(fund, sort=True)
+    total = pd.DataFrame({c: fund_sums(codes, losses[c].to_numpy(dtype=float), len(names))
+                          for c in ["MarketValue"] + cols}, index=pd.Index(names, name="Fund"))
+    return summary_pct(total)
+
+def summary_pct(total):
+    """Ajoute les pertes en % de l'actif aux totaux par fonds (MarketValue, loss_*)."""
+    for c in loss_columns(total):
+        total[c.replace("loss_", "pct_")] = total[c] / total["MarketValue"] * 100
+    return total
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Stress de marché ESMA sur un portefeuille")
+    ap.add_argument("holdings", help="CSV des positions (" + ", ".join(HOLDING_COLUMNS) + ")")
+    ap.add_argument("date", help="date des paramètres ESMA (MM/YYYY)")
+    ap.add_argument("--csv-dir", default=os.path.join("data", "output"))
+    args = ap.parse_args()
+    params = market_params(args.csv_dir, args.date)
+    print(fund_summary(stress_market(pd.read_csv(args.holdings), params)).to_string())
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from sqltxt import TABLES_META, load_tables, typed
+
+# ---------------------------------------------------------------------
+# Grilles de maturité précalculées (tables 1, 2, 3, 5, 8, 9)
+# ---------------------------------------------------------------------
+TENORS = {"1M": 1/12, "3M": 0.25, "6M": 0.5, "1Y": 1.0, "1.5Y": 1.5, "2Y": 2.0}
+GRID_TABLES = [1, 2, 3, 5, 8, 9]
+
+class MaturityGrid:
+    """
+    Grille dense (clés x maturités) d'une table, avec pentes précalculées :
+    une interpolation = searchsorted + un gather + une multiplication, pour
+    des millions de maturités par appel. Extrapolation plate aux bornes.
+    """
+    __slots__ = ("index", "tenors", "values", "slopes", "widths")
+
+    def __init__(self, keys, tenors, values):
+        self.index = pd.Index(keys)
+        self.tenors = np.asarray(tenors, dtype=float)
+        self.values = np.ascontiguousarray(values, dtype=float)
+        self.widths = np.diff(self.tenors)
+        self.slopes = np.diff(self.values, axis=1) / self.widths
+
+    @classmethod
+    def from_frame(cls, df, key, cols=None):
+        cols = cols or [c for c in TENORS if c in df.columns]
+        return cls(df[key].to_numpy(), [TENORS[c] for c in cols], df[cols].to_numpy(dtype=float))
+
+    def stack(self, other):
+        """Grille des clés des deux tables (mêmes maturités), `self` en premier."""
+        return MaturityGrid(np.concatenate([self.index.to_numpy(), other.index.to_numpy()]),
+                            self.tenors, np.vstack([self.values, other.values]))
+
+    def rows(self, keys, fallback=None):
+        """Indices de ligne des clés ; inconnues -> `fallback` (ou -1)."""
+        idx = self.index.get_indexer(keys)
+        if fallback is not None:
+            idx = np.where(idx < 0, self.index.get_loc(fallback), idx)
+        return idx
+
+    def interp(self, rows, maturities):
+        """Valeur interpolée par position (NaN pour une ligne -1)."""
+        mat = np.asarray(maturities, dtype=float)
+        j = np.clip(np.searchsorted(self.tenors, mat, side="right") - 1, 0, len(self.widths) - 1)
+        dt = np.clip(mat - self.tenors[j], 0.0, self.widths[j])
+        r = np.maximum(rows, 0)
+        out = self.values[r, j] + self.slopes[r, j] * dt
+        return np.where(rows >= 0, out, np.nan)
+
+    def __call__(self, keys, maturities, fallback=None):
+        return self.interp(self.rows(keys, fallback), maturities)
+
+# Mémo par date, rendu tel quel ; reload=True relit les CSV
+_GRIDS = {}
+
+def maturity_grids(csv_dir, date_input, reload=False):
+    """
+    {n° de table: MaturityGrid} pour les tables 1, 2, 3, 5, 8, 9 d'une date,
+    plus "ir" (table 8 puis table 9, clés pays puis zones). Construit une
+    seule fois par date et par processus (reload=True : reconstruit).
+    """
+    prefix = date_input.replace("/", "")
+    memo_key = (os.path.abspath(csv_dir), prefix)
+    if not reload and memo_key in _GRIDS:
+        return _GRIDS[memo_key]
+
+    tables = load_tables(csv_dir, prefix)
+    grids = {i: MaturityGrid.from_frame(typed(i, tables[i]), TABLES_META[i]["key"])
+             for i in GRID_TABLES if i in tables}
+    if 8 in grids and 9 in grids:
+        grids["ir"] = grids[8].stack(grids[9])
+    _GRIDS[memo_key] = grids
+    return grids
@@ -0,0 +1,238 @@
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ---------------------------------------------------------------------
+# Instrumentation optionnelle par étape (lignes JSON)
+# ---------------------------------------------------------------------
+# with metrics.stage("parse", group="parse_table_5") as m: ... m.add(rows=36)
+# Une ligne JSON par étape terminée : durée, lignes parsées, lignes
+# rejetées ("Format inattendu"), octets écrits, mémoire et étape
+# englobante (chaque étape ne compte que son propre travail ; durée et
+# mémoire incluent les étapes imbriquées). Désactivé par défaut : stage()
+# renvoie alors un objet inerte partagé et add() ne fait rien (un test de
+# variable globale).
+# Mémoire : "rss" (défaut) = pic RSS du processus à la fin de l'étape,
+# quasi gratuit ; "trace" = pic tracemalloc pendant l'étape, exact mais
+# plusieurs fois plus lent (décodage pypdf) ; "off".
+# Activation : metrics.enable(...) ou variables d'environnement
+#   MMF_METRICS=fichier.jsonl ("-" = stderr), MMF_METRICS_MEMORY=rss|trace|off,
+#   MMF_PROFILE=dossier [MMF_PROFILE_STAGES=parse,sql] : un dump cProfile
+# par étape (filtrée par nom), si aucune n'est déjà profilée dans le thread.
+# Les variables sont reprises par les processus de batch.py.
+COUNTERS = ("rows", "rejected", "bytes")
+MEMORY_MODES = ("rss", "trace", "off")
+
+_SINK = None
+_PROFILE_DIR = None
+_PROFILE_STAGES = None
+_MEMORY = "rss"
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+# étapes ouvertes (tous threads) : le pic tracemalloc est global au processus
+_OPEN = []
+_STATE = {"seq": 0}
+
+class _NullStage:
+    """Étape inerte (instrumentation désactivée)."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __bool__(self):
+        return False
+
+    def add(self, **counters):
+        pass
+
+    def set(self, **fields):
+        pass
+
+_NULL = _NullStage()
+
+def _fold_peak():
+    # reporte le pic courant sur toutes les étapes ouvertes, puis le remet à zéro
+    if _MEMORY != "trace" or not tracemalloc.is_tracing():
+        return
+    peak = tracemalloc.get_traced_memory()[1]
+    for s in _OPEN:
+        s.peak = max(s.peak, peak)
+    tracemalloc.reset_peak()
+
+class Stage:
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.peak = 0
+        self.profile = None
+
+    def __bool__(self):
+        return True
+
+    def add(self, **counters):
+        for k, v in counters.items():
+            self.counters[k] = self.counters.get(k, 0) + v
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        with _LOCK:
+            _fold_peak()
+            _OPEN.append(self)
+            _STATE["seq"] += 1
+            self.seq = _STATE["seq"]
+        # profileur par thread (sys.setprofile), un seul à la fois
+        if (_PROFILE_DIR and not getattr(_LOCAL, "profiling", False)
+                and (_PROFILE_STAGES is None or self.name in _PROFILE_STAGES)):
+            self.profile = cProfile.Profile()
+            try:
+                self.profile.enable()
+                _LOCAL.profiling = True
+            except ValueError:
+                # autre profileur actif dans le processus
+                self.profile = None
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.t0
+        record = {"stage": self.name, **self.fields, "wall_s": round(wall, 6), **self.counters}
+        if self.profile:
+            self.profile.disable()
+            _LOCAL.profiling = False
+            os.makedirs(_PROFILE_DIR, exist_ok=True)
+            tag = "_".join(str(v) for v in self.fields.values())
+            path = os.path.join(_PROFILE_DIR, f"{os.getpid()}_{self.seq:04d}_{self.name}{'_' + tag if tag else ''}.prof")
+            self.profile.dump_stats(path)
+            record["profile"] = path
+        with _LOCK:
+            _fold_peak()
+            _OPEN.remove(self)
+        _stack().pop()
+        if _MEMORY == "trace":
+            record["peak_mb"] = round(self.peak / 1e6, 3)
+        elif _MEMORY == "rss" and resource is not None:
+            # ru_maxrss en Ko sous Linux
+            record["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3, 3)
+        record.update(parent=self.parent, pid=os.getpid(), thread=threading.current_thread().name,
+                      ts=round(time.time(), 3))
+        if exc_type is not None:
+            record["error"] = repr(exc)
+        _emit(record)
+        return False
+
+def _stack():
+    stack = getattr(_LOCAL, "stack", None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    return stack
+
+def _emit(record):
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _LOCK:
+        if _SINK is not None:
+            _SINK.write(line)
+            _SINK.flush()
+
+def enabled():
+    return _SINK is not None
+
+def enable(path="-", profile_dir=None, memory="rss", profile_stages=None):
+    """
+    Active l'instrumentation : lignes JSON ajoutées à `path` ("-" = stderr),
+    mesure mémoire `memory` (MEMORY_MODES), dumps cProfile dans
+    `profile_dir` pour les étapes `profile_stages` (toutes si None). Les
+    variables d'environnement sont positionnées pour les processus fils.
+    """
+    global _SINK, _PROFILE_DIR, _PROFILE_STAGES, _MEMORY
+    if memory not in MEMORY_MODES:
+        raise ValueError(f"Mesure mémoire inconnue : {memory} (attendues : {', '.join(MEMORY_MODES)})")
+    disable()
+    _SINK = sys.stderr if path == "-" else open(path, "a", encoding="utf-8")
+    _PROFILE_DIR = profile_dir
+    _PROFILE_STAGES = set(profile_stages) if profile_stages else None
+    _MEMORY = memory
+    if memory == "trace" and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    os.environ["MMF_METRICS"] = path
+    os.environ["MMF_METRICS_MEMORY"] = memory
+    if profile_dir:
+        os.environ["MMF_PROFILE"] = profile_dir
+    if profile_stages:
+        os.environ["MMF_PROFILE_STAGES"] = ",".join(profile_stages)
+
+def disable():
+    global _SINK, _PROFILE_DIR, _PROFILE_STAGES
+    if _SINK is not None and _SINK is not sys.stderr:
+        _SINK.close()
+    _SINK = _PROFILE_DIR = _PROFILE_STAGES = None
+    if _MEMORY == "trace" and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    for var in ("MMF_METRICS", "MMF_METRICS_MEMORY", "MMF_PROFILE", "MMF_PROFILE_STAGES"):
+        os.environ.pop(var, None)
+
+def stage(name, **fields):
+    """Contexte d'une étape ; inerte si l'instrumentation est désactivée."""
+    if _SINK is None:
+        return _NULL
+    return Stage(name, fields)
+
+def current():
+    """Étape ouverte la plus interne du thread courant (inerte si aucune)."""
+    if _SINK is None:
+        return _NULL
+    stack = _stack()
+    return stack[-1] if stack else _NULL
+
+def add(**counters):
+    """Ajoute des compteurs à l'étape courante (rows, rejected, bytes...)."""
+    if _SINK is not None:
+        current().add(**counters)
+
+def timed(name, **fields):
+    """Décorateur : chaque appel est une étape `name`."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _SINK is None:
+                return fn(*args, **kwargs)
+            with Stage(name, dict(fields)):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def add_arguments(ap):
+    """Options --metrics / --memory / --profile communes aux CLI."""
+    ap.add_argument("--metrics", help='lignes JSON de mesures par étape ("-" = stderr)')
+    ap.add_argument("--memory", choices=MEMORY_MODES, default="rss", help="mesure mémoire (avec --metrics)")
+    ap.add_argument("--profile", help="dossier des dumps cProfile par étape (avec --metrics)")
+    ap.add_argument("--profile-stages", help="étapes profilées, ex. parse,sql (défaut : toutes)")
+
+def from_args(args):
+    if args.metrics:
+        stages = args.profile_stages.split(",") if args.profile_stages else None
+        enable(args.metrics, args.profile, args.memory, stages)
+
+if os.environ.get("MMF_METRICS"):
+    enable(os.environ["MMF_METRICS"], os.environ.get("MMF_PROFILE"),
+           os.environ.get("MMF_METRICS_MEMORY", "rss"),
+           os.environ["MMF_PROFILE_STAGES"].split(",") if os.environ.get("MMF_PROFILE_STAGES") else None)
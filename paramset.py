@@ -0,0 +1,106 @@
+import os
+from array import array
+
+from sqltxt import TABLES_META, load_tables, typed, value_columns
+
+# ---------------------------------------------------------------------
+# Jeu de paramètres d'une date, avec accès direct par clé
+# ---------------------------------------------------------------------
+FX_SCENARIOS = {"appreciation": 10, "depreciation": 11}
+
+class ParameterSet:
+    """
+    Les 14 tables d'une date, chacune stockée en un tableau plat de float
+    (array 'd', ligne par ligne) avec deux index dict : clé -> ligne et
+    colonne -> position. Une lecture = deux accès dict + un accès tableau.
+    ps.credit_spread("Austria", "1Y"), ps.fx_shock("EURPLN", "appreciation"),
+    ps.lgd("Senior exposure")...
+    """
+    __slots__ = ("vintage", "_rows", "_cols", "_values")
+
+    def __init__(self, vintage, tables):
+        self.vintage = vintage
+        self._rows, self._cols, self._values = {}, {}, {}
+        for i, df in tables.items():
+            cols = [c for c in value_columns(i) if c in df.columns]
+            df = typed(i, df)
+            self._rows[i] = {k: r for r, k in enumerate(df[TABLES_META[i]["key"]])}
+            self._cols[i] = {c: j for j, c in enumerate(cols)}
+            self._values[i] = array("d", df[cols].to_numpy(dtype=float).ravel())
+
+    def get(self, table, line, column=None):
+        """Valeur brute d'un tableau ; colonne par défaut : la colonne de valeur unique."""
+        if table not in self._cols:
+            raise KeyError(f"Table {table} absente du jeu de paramètres {self.vintage}")
+        cols = self._cols[table]
+        try:
+            r = self._rows[table][line]
+            j = cols[column] if column is not None else 0
+        except KeyError:
+            raise KeyError(f"Table {table} : pas de valeur pour ({line!r}, {column!r})") from None
+        return self._values[table][r * len(cols) + j]
+
+    def has(self, table, line):
+        return line in self._rows.get(table, ())
+
+    # Tables 1 à 3 : décotes de liquidité (%)
+    def ldf_country(self, country, maturity):
+        return self.get(1, country, maturity)
+
+    def ldf_sovereign(self, rating, maturity):
+        return self.get(2, rating, maturity)
+
+    def ldf_corporate(self, rating, maturity):
+        return self.get(3, rating, maturity)
+
+    # Table 4 : paramètre d'impact prix (%)
+    def price_impact(self, label):
+        return self.get(4, label)
+
+    # Tables 5 et 6 : chocs de spread (pb)
+    def credit_spread(self, country, maturity):
+        return self.get(5, country, maturity)
+
+    def corporate_spread(self, rating, category):
+        return self.get(6, rating, category)
+
+    # Table 7 : perte en cas de défaut (%)
+    def lgd(self, label):
+        return self.get(7, label)
+
+    # Tables 8 et 9 : chocs de taux (pb), pays de la table 8 sinon zone de la table 9
+    def ir_shock(self, country_or_area, maturity):
+        table = 8 if self.has(8, country_or_area) else 9
+        return self.get(table, country_or_area, maturity)
+
+    # Tables 10 et 11 : chocs de change (%)
+    def fx_shock(self, pair, scenario):
+        return self.get(FX_SCENARIOS[scenario], pair)
+
+    # Tables 12 à 14 : facteurs WLA et sorties (%)
+    def bucket_factor(self, bucket):
+        return self.get(12, f"Weekly liquid assets (bucket {bucket})" if isinstance(bucket, int) else bucket)
+
+    def net_outflow(self, investor):
+        return self.get(13, investor)
+
+    def macro_outflow(self, investor):
+        return self.get(14, investor)
+
+# Cache du processus : une instance par date, rendue telle quelle ;
+# reload=True relit les CSV (après une correction ou un nouveau parsing)
+_SETS = {}
+
+def parameter_set(date_input, csv_dir=os.path.join("data", "output"), reload=False):
+    prefix = date_input.replace("/", "")
+    memo_key = (os.path.abspath(csv_dir), prefix)
+    if not reload and memo_key in _SETS:
+        return _SETS[memo_key]
+    tables = load_tables(csv_dir, prefix)
+    if not tables:
+        # rien à mettre en cache : une date sans CSV est une erreur de saisie
+        _SETS.pop(memo_key, None)
+        raise FileNotFoundError(f"Aucun CSV de paramètres pour {date_input} dans {csv_dir}")
+    ps = ParameterSet(prefix[2:] + prefix[:2], tables)
+    _SETS[memo_key] = ps
+    return ps
@@ -0,0 +1,74 @@
+import os
+import re
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from parsecache import yyyymm
+from sqltxt import load_tables, typed
+
+# ---------------------------------------------------------------------
+# Stockage colonnaire typé de toutes les dates (Parquet)
+# ---------------------------------------------------------------------
+# data/store/table={i}/vintage={YYYYMM}/part-0.parquet
+# Un schéma par tableau (colonnes de valeurs en float64, "-" = null) ;
+# les filtres sur la date élaguent les répertoires, ceux sur les colonnes
+# utilisent les statistiques Parquet.
+STORE_DIR = os.path.join("data", "store")
+
+def write_vintage(csv_dir, date_input, store_dir=STORE_DIR):
+    """Écrit (ou remplace) toutes les tables d'une date dans le stockage."""
+    prefix = date_input.replace("/", "")
+    vintage = yyyymm(prefix)
+    tables = load_tables(csv_dir, prefix)
+    for i, df in tables.items():
+        part_dir = os.path.join(store_dir, f"table={i}", f"vintage={vintage}")
+        os.makedirs(part_dir, exist_ok=True)
+        table = pa.Table.from_pandas(typed(i, df), preserve_index=False)
+        pq.write_table(table, os.path.join(part_dir, "part-0.parquet"))
+    print(f"=> {len(tables)} tables de {vintage} écrites dans {store_dir}")
+    return len(tables)
+
+def vintages_in(csv_dir):
+    """Dates MM/YYYY présentes dans csv_dir (CSV MMYYYYtable{N}.csv ou manifestes)."""
+    prefixes = {m.group(1) for f in os.listdir(csv_dir)
+                if (m := re.match(r'^(\d{6})table\d+\.csv$', f))}
+    mdir = os.path.join(csv_dir, "manifest")
+    if os.path.isdir(mdir):
+        prefixes |= {f[:6] for f in os.listdir(mdir) if re.match(r'^\d{6}\.json$', f)}
+    return [f"{p[:2]}/{p[2:]}" for p in sorted(prefixes, key=yyyymm)]
+
+def load(table, vintages=None, where=None, columns=None, store_dir=STORE_DIR):
+    """
+    Lit un tableau sur toutes les dates (ou `vintages`, liste d'entiers
+    YYYYMM), avec filtres poussés vers Parquet.
+    - where : {colonne: valeur ou liste de valeurs}
+    Ex. load(8, where={"Country": "Euro area"})
+    """
+    path = os.path.join(store_dir, f"table={table}")
+    if not os.path.isdir(path):
+        return pd.DataFrame()
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    expr = None
+    conds = dict(where or {})
+    if vintages is not None:
+        conds["vintage"] = list(vintages)
+    for col, val in conds.items():
+        vals = val if isinstance(val, (list, tuple, set)) else [val]
+        e = ds.field(col).isin(list(vals))
+        expr = e if expr is None else expr & e
+    if columns is not None and "vintage" not in columns:
+        columns = ["vintage"] + list(columns)
+    return dataset.to_table(filter=expr, columns=columns).to_pandas()
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Stockage Parquet des paramètres ESMA")
+    ap.add_argument("date", nargs="?", help="date MM/YYYY (toutes les dates si absente)")
+    ap.add_argument("--csv-dir", default=os.path.join("data", "output"))
+    ap.add_argument("--store-dir", default=STORE_DIR)
+    args = ap.parse_args()
+    for d in ([args.date] if args.date else vintages_in(args.csv_dir)):
+        write_vintage(args.csv_dir, d, args.store_dir)
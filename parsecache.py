@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+
+# ---------------------------------------------------------------------
+# Cache des tableaux parsés (clé = hash du texte nettoyé + version)
+# ---------------------------------------------------------------------
+CACHE_DIR = os.path.join("data", "cache")
+CACHE_MAX_ENTRIES = 512
+
+def cache_key(func_name, cleaned_text, version):
+    h = hashlib.sha256()
+    h.update(f"{func_name}\0{version}\0".encode("utf-8"))
+    h.update(cleaned_text.encode("utf-8"))
+    return h.hexdigest()
+
+def cache_get(key):
+    """Résultat du parseur en cache, ou None. Un accès rafraîchit l'entrée (LRU)."""
+    path = os.path.join(CACHE_DIR, key + ".pkl")
+    try:
+        with open(path, "rb") as f:
+            result = pickle.load(f)
+        os.utime(path)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+    return result
+
+def cache_put(key, result):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, key + ".pkl")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    evict()
+
+def evict():
+    """Supprime les entrées les moins récemment utilisées au-delà de CACHE_MAX_ENTRIES."""
+    entries = [e for e in os.scandir(CACHE_DIR) if e.name.endswith(".pkl")]
+    if len(entries) <= CACHE_MAX_ENTRIES:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for e in entries[:len(entries) - CACHE_MAX_ENTRIES]:
+        try:
+            os.remove(e.path)
+        except FileNotFoundError:
+            pass
+
+# ---------------------------------------------------------------------
+# Manifeste par date : tableau -> fichier CSV (propre ou réutilisé)
+# ---------------------------------------------------------------------
+# data/output/manifest/MMYYYY.json : {"1": {"file": "022025table1.csv", "key": "..."}}
+# Un fichier par date : les traitements parallèles (batch.py) n'écrivent
+# jamais le même manifeste.
+def manifest_path(csv_dir, prefix):
+    return os.path.join(csv_dir, "manifest", f"{prefix}.json")
+
+def read_manifest(csv_dir, prefix):
+    try:
+        with open(manifest_path(csv_dir, prefix), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def record(csv_dir, prefix, table_num, fname, key, **extra):
+    manifest = read_manifest(csv_dir, prefix)
+    manifest[str(table_num)] = {"file": fname, "key": key, **extra}
+    path = manifest_path(csv_dir, prefix)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def resolve_csv(csv_dir, prefix, table_num):
+    """Chemin du CSV d'un tableau, en suivant un éventuel pointeur REUSE."""
+    entry = read_manifest(csv_dir, prefix).get(str(table_num))
+    fname = entry["file"] if entry else f"{prefix}table{table_num}.csv"
+    return os.path.join(csv_dir, fname)
+
+def csv_stamp(csv_dir, prefix, table_nums):
+    """Empreinte (mtime) des CSV d'une date, manifeste lu une fois : sert de clé de cache."""
+    manifest = read_manifest(csv_dir, prefix)
+    stamp = []
+    for i in table_nums:
+        entry = manifest.get(str(i))
+        try:
+            stamp.append(os.stat(os.path.join(csv_dir, entry["file"] if entry else f"{prefix}table{i}.csv")).st_mtime_ns)
+        except FileNotFoundError:
+            stamp.append(0)
+    return tuple(stamp)
+
+def yyyymm(prefix):
+    return prefix[2:] + prefix[:2]
+
+def latest_entry(csv_dir, table_num, before_prefix):
+    """
+    (date, entrée) la plus récente pour le tableau parmi les dates
+    antérieures à `before_prefix` (MMYYYY), ou None. Candidats : entrées
+    des manifestes et CSV MMYYYYtable{n}.csv produits avant les manifestes
+    (entrée sans clé) ; à date égale, l'entrée du manifeste. Les dates
+    postérieures (ou en cours d'écriture par un lot parallèle) sont
+    ignorées : le résultat ne dépend que des dates précédentes.
+    """
+    limit = yyyymm(before_prefix)
+    candidates = []
+    mdir = os.path.join(csv_dir, "manifest")
+    if os.path.isdir(mdir):
+        for f in os.listdir(mdir):
+            if re.match(r'^\d{6}\.json$', f) and yyyymm(f[:6]) < limit:
+                entry = read_manifest(csv_dir, f[:6]).get(str(table_num))
+                if entry and os.path.exists(os.path.join(csv_dir, entry["file"])):
+                    candidates.append((yyyymm(f[:6]), 1, f[:6], entry))
+    pattern = re.compile(r'^(\d{6})table' + str(table_num) + r'\.csv$')
+    for fname in os.listdir(csv_dir):
+        m = pattern.match(fname)
+        if m and yyyymm(m.group(1)) < limit and int(m.group(1)[:2]) in range(1, 13):
+            candidates.append((yyyymm(m.group(1)), 0, m.group(1), {"file": fname, "key": None}))
+    if not candidates:
+        return None
+    _, _, prefix, entry = max(candidates, key=lambda c: c[:2])
+    return prefix, entry
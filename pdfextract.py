@@ -0,0 +1,212 @@
+import re
+
+import metrics
+import pdfindex
+
+# ---------------------------------------------------------------------
+# Repérage des tableaux dans le PDF ESMA
+# ---------------------------------------------------------------------
+# Titre d'un tableau en début de ligne : "Table 1", "Table Option 4: ...",
+# "Table 12         Table 13". Les renvois du type "Table 3, 4" ou
+# "Table 6 Yes Table 7" (grilles "Scope of the scenario") sont exclus.
+TITLE_REGEX = re.compile(r"^Table (?:Option )?(\d+)(?![\d,])(?!\s+(?:Yes|No)\b)")
+# Titre de section ("5.3 Common reference ...", "6 Appendix") : fin d'un tableau
+SECTION_REGEX = re.compile(r"^\d+(?:\.\d+)*\s+[A-Z]")
+# Bandeau de bas de page, extrait en tête de page par pypdf (numéro imprimé)
+PAGE_HEADER_REGEX = re.compile(r"ESMA - 201-203.*?www\.esma\.europa\.eu\s+(\d+)")
+CALIBRATION_REGEX = re.compile(r"Calibration", re.IGNORECASE)
+
+# Pour chaque parseur : n° du titre, dernière ligne d'en-tête et nombre
+# de lignes d'en-tête que le parseur saute (copier/coller manuel)
+PDF_TABLES = [
+    {"func": "parse_table_1_and_2",   "table": 1,  "header": r"^3M 6M 1Y",                            "skip": 2},
+    {"func": "parse_table_3",         "table": 3,  "header": r"^3M 6M 1Y",                            "skip": 2},
+    {"func": "parse_table_4",         "table": 4,  "header": r"^Price impact parameter",              "skip": 1},
+    {"func": "parse_table_5",         "table": 5,  "header": r"^Geographic Area Country",             "skip": 2},
+    {"func": "parse_table_6",         "table": 6,  "header": r"^Rating ",                             "skip": 2},
+    {"func": "parse_table_7",         "table": 7,  "header": r"^Loss given default",                  "skip": 1},
+    {"func": "parse_table_8",         "table": 8,  "header": r"^Geographic Area Country Description", "skip": 3},
+    {"func": "parse_table_9",         "table": 9,  "header": r"^Geographic Area Description",         "skip": 3},
+    {"func": "parse_table_10",        "table": 10, "header": r"^Geographic Area Description",         "skip": 3},
+    {"func": "parse_table_11",        "table": 11, "header": r"^Geographic Area Description",         "skip": 3},
+    {"func": "parse_table_12_and_13", "table": 12, "header": None,                                    "skip": 0},
+    {"func": "parse_table_14",        "table": 14, "header": r"^Net outflows",                        "skip": 1},
+]
+
+def page_lines(reader, page_num, labels=None):
+    """
+    Décode une page et retire l'en-tête courant (date, référence ESMA,
+    bandeau "ESMA - 201-203 ... www.esma.europa.eu N") ; N est noté dans
+    `labels` {n° de page: numéro imprimé}.
+    """
+    with metrics.stage("decode", page=page_num + 1) as st:
+        text = reader.pages[page_num].extract_text() or ""
+        m = PAGE_HEADER_REGEX.search(text)
+        if m:
+            text = text[m.end():]
+            if labels is not None:
+                labels[page_num] = int(m.group(1))
+        lines = [l.strip() for l in text.splitlines() if l.strip()]
+        st.add(rows=len(lines))
+    return lines
+
+def title_of(line):
+    m = TITLE_REGEX.match(line)
+    return int(m.group(1)) if m else None
+
+def calibration_range(reader):
+    """
+    Pages de la section "Calibration" d'après les signets du PDF,
+    ou None si le document n'en a pas.
+    """
+    flat = []
+    def walk(items):
+        for it in items:
+            if isinstance(it, list):
+                walk(it)
+            else:
+                flat.append((reader.get_destination_page_number(it), it.title))
+    try:
+        walk(reader.outline)
+    except Exception:
+        return None
+    for k, (page, title) in enumerate(flat):
+        if CALIBRATION_REGEX.search(title):
+            top = [p for p, t in flat[k+1:] if re.match(r"^\d+ ", t) and p > page]
+            end = top[0] if top else len(reader.pages) - 1
+            return page, end
+    return None
+
+def locate_pages(reader, labels=None):
+    """
+    Ne décode que les pages utiles : la section "Calibration" si les signets
+    existent, sinon lecture à rebours jusqu'au titre du tableau 1.
+    Retourne {n° de page: lignes}.
+    """
+    pages = {}
+    rng = calibration_range(reader)
+    if rng:
+        for p in range(rng[0], rng[1] + 1):
+            pages[p] = page_lines(reader, p, labels)
+        return pages
+    for p in range(len(reader.pages) - 1, -1, -1):
+        pages[p] = page_lines(reader, p, labels)
+        if any(title_of(l) == 1 for l in pages[p]):
+            break
+    return pages
+
+def region_text(lines, start, stop, spec):
+    """
+    Reconstitue le texte tel que le copier/coller manuel le produit :
+    `skip` lignes d'en-tête (description regroupée + ligne de colonnes)
+    puis les lignes de données.
+    """
+    body = []
+    for line in lines[start:stop]:
+        if SECTION_REGEX.match(line):
+            break
+        body.append(line)
+    if spec["header"] is None:
+        return "\n".join(body)
+    h = next((k for k, l in enumerate(body) if re.match(spec["header"], l)), None)
+    if h is None:
+        return ""
+    n = spec["skip"]
+    desc = body[:h]
+    if n <= 1:
+        desc = []
+    elif len(desc) > n - 1:
+        desc = desc[:n-2] + [" ".join(desc[n-2:])]
+    return "\n".join(desc + [body[h]] + body[h+1:])
+
+def iter_pages(reader, labels=None):
+    """(n° de page, lignes) des pages utiles, dans l'ordre du document, décodées à la demande."""
+    rng = calibration_range(reader)
+    if rng:
+        for p in range(rng[0], rng[1] + 1):
+            yield p, page_lines(reader, p, labels)
+        return
+    pages = locate_pages(reader, labels)
+    for p in sorted(pages):
+        yield p, pages[p]
+
+def table_texts(pages, source, spans=None, report=True):
+    """
+    Produit (nom du parseur, texte brut) à partir de (n° de page, lignes),
+    dès qu'un tableau est complet (au titre suivant). `spans` reçoit
+    {n° du titre: [parseur, première page, dernière page]}.
+    """
+    specs = {spec["table"]: spec for spec in PDF_TABLES}
+    current, region, ended = None, [], False
+    for p, lines in pages:
+        if current and spans is not None and not ended:
+            spans[current["table"]][2] = p
+        for line in lines:
+            num = title_of(line)
+            if num is None:
+                region.append(line)
+                # titre de section : fin du tableau (region_text s'y arrête)
+                ended = ended or bool(current and SECTION_REGEX.match(line))
+                continue
+            if current:
+                yield current["func"], region_text(region, 0, len(region), current)
+            # seule la première occurrence d'un titre ouvre un tableau
+            current, region, ended = specs.pop(num, None), [], False
+            if current and spans is not None:
+                spans[num] = [current["func"], p, p]
+    if current:
+        yield current["func"], region_text(region, 0, len(region), current)
+    if report:
+        for spec in specs.values():
+            print(f"⚠️ Titre du tableau {spec['table']} introuvable dans {source}")
+
+def iter_table_texts(pdf_path):
+    """
+    Produit (nom du parseur, texte brut) dès qu'un tableau est complet :
+    les premiers tableaux sont disponibles avant le décodage des dernières
+    pages. Document déjà indexé (même hash) : lignes lues dans l'index,
+    sans décodage ; sinon l'index est écrit en fin d'extraction.
+    """
+    key = pdfindex.file_hash(pdf_path)
+    index = pdfindex.load(key)
+    if index is not None:
+        yield from table_texts(pdfindex.indexed_pages(index), pdf_path)
+        return
+    from pypdf import PdfReader
+    reader = PdfReader(pdf_path)
+    pages, labels, spans = {}, {}, {}
+
+    def decoded():
+        for p, lines in iter_pages(reader, labels):
+            pages[p] = lines
+            yield p, lines
+
+    yield from table_texts(decoded(), pdf_path, spans)
+    # pages conservées : à partir du premier titre de tableau
+    first = min((s[1] for s in spans.values()), default=None)
+    kept = {p: lines for p, lines in pages.items() if first is not None and p >= first}
+    pdfindex.build(key, pdf_path, reader, kept, labels,
+                   {num: tuple(s) for num, s in spans.items()})
+
+def extract_table_texts(pdf_path):
+    """
+    Retourne {nom du parseur: texte brut} pour les 12 groupes de tableaux.
+    """
+    return dict(iter_table_texts(pdf_path))
+
+def extract_table(pdf_path, func):
+    """
+    Texte brut d'un seul groupe (nom du parseur), lu sur ses seules pages
+    d'après l'index (construit au besoin), ou None si introuvable.
+    """
+    key = pdfindex.file_hash(pdf_path)
+    index = pdfindex.load(key)
+    if index is None:
+        extract_table_texts(pdf_path)
+        index = pdfindex.load(key)
+    for t in index["tables"].values():
+        if t["func"] == func:
+            first, last = t["pages"]
+            texts = dict(table_texts(pdfindex.indexed_pages(index, first, last), pdf_path, report=False))
+            return texts.get(func)
+    return None
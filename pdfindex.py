@@ -0,0 +1,119 @@
+import hashlib
+import json
+import mmap
+import os
+
+# ---------------------------------------------------------------------
+# Index persistant des pages d'un PDF ESMA (clé = hash du fichier)
+# ---------------------------------------------------------------------
+# data/cache/pdfindex/<sha256>.json, construit à la première extraction :
+#   pages  : {n° de page: numéro imprimé (bandeau "www.esma.europa.eu N"),
+#             plage d'octets des flux de contenu, lignes décodées}
+#   tables : {n° du titre: parseur, pages [première, dernière], plage d'octets}
+# Le hash et les plages d'octets sont lus par mmap. Une extraction suivante
+# du même document repart des lignes de l'index : aucune page décodée,
+# pypdf n'est même pas importé.
+INDEX_DIR = os.path.join("data", "cache", "pdfindex")
+INDEX_VERSION = 1
+
+def file_hash(path):
+    """SHA-256 du fichier, lu par mmap."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+    return h.hexdigest()
+
+def index_path(key):
+    return os.path.join(INDEX_DIR, f"{key}.json")
+
+def load(key):
+    """Index d'un hash de fichier, ou None (absent, illisible ou d'une autre version)."""
+    try:
+        with open(index_path(key), encoding="utf-8") as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return index if index.get("version") == INDEX_VERSION else None
+
+def _object_refs(page):
+    # références indirectes de la page et de ses flux de contenu
+    refs = [page.indirect_reference]
+    contents = page.get("/Contents")
+    if contents is not None:
+        raw = getattr(contents, "indirect_reference", None) or contents
+        items = raw if isinstance(raw, list) else [raw]
+        refs += [getattr(c, "indirect_reference", None) or c for c in items]
+    return [r for r in refs if hasattr(r, "idnum")]
+
+def byte_ranges(reader, path, page_nums):
+    """
+    {n° de page: [début, fin]} des objets de la page dans le fichier (table
+    xref de pypdf, fin "endobj" cherchée par mmap) ; objets compressés
+    dans un flux d'objets : page absente.
+    """
+    out = {}
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for p in page_nums:
+            spans = []
+            for ref in _object_refs(reader.pages[p]):
+                start = reader.xref.get(ref.generation, {}).get(ref.idnum)
+                if start is None:
+                    continue
+                stop = mm.find(b"endobj", start)
+                spans.append((start, stop + 6 if stop >= 0 else len(mm)))
+            if spans:
+                out[p] = [min(s for s, _ in spans), max(e for _, e in spans)]
+    return out
+
+def build(key, path, reader, pages, labels, tables):
+    """
+    Écrit l'index : `pages` {n°: lignes}, `labels` {n°: numéro imprimé},
+    `tables` {n° du titre: (parseur, première page, dernière page)}.
+    """
+    ranges = byte_ranges(reader, path, pages)
+    index = {
+        "version": INDEX_VERSION,
+        "hash": key,
+        "source": os.path.basename(path),
+        "n_pages": len(reader.pages),
+        "pages": {str(p): {"label": labels.get(p), "range": ranges.get(p), "lines": lines}
+                  for p, lines in sorted(pages.items())},
+        "tables": {},
+    }
+    for num, (func, first, last) in sorted(tables.items()):
+        spans = [ranges[p] for p in range(first, last + 1) if p in ranges]
+        index["tables"][str(num)] = {
+            "func": func,
+            "pages": [first, last],
+            "labels": [labels.get(first), labels.get(last)],
+            "range": [min(s for s, _ in spans), max(e for _, e in spans)] if spans else None,
+        }
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    tmp = f"{index_path(key)}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp, index_path(key))
+    return index
+
+def indexed_pages(index, first=None, last=None):
+    """(n° de page, lignes) de l'index, dans l'ordre, éventuellement bornés."""
+    for p in sorted(map(int, index["pages"])):
+        if (first is None or p >= first) and (last is None or p <= last):
+            yield p, index["pages"][str(p)]["lines"]
+
+if __name__ == "__main__":
+    import argparse
+    from pdfextract import extract_table_texts
+    ap = argparse.ArgumentParser(description="Construit / affiche l'index des pages de PDF ESMA")
+    ap.add_argument("pdfs", nargs="+")
+    args = ap.parse_args()
+    for path in args.pdfs:
+        extract_table_texts(path)
+        index = load(file_hash(path))
+        print(f"=== {path} ({index['hash'][:12]}, {len(index['pages'])} pages indexées sur {index['n_pages']})")
+        for num, t in index["tables"].items():
+            first, last = t["pages"]
+            print(f"    Table {num:>2} : pages {first + 1}-{last + 1} (imprimées {t['labels'][0]}-{t['labels'][1]}), "
+                  f"octets {t['range']}")
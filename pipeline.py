@@ -0,0 +1,130 @@
+import queue
+import threading
+
+import mainfinal
+import metrics
+import sqltxt
+
+# ---------------------------------------------------------------------
+# Chaîne extraction -> parsing/CSV -> SQL en flux
+# ---------------------------------------------------------------------
+# Trois étapes dans trois threads, reliées par des files bornées : un
+# tableau extrait est parsé et écrit en CSV pendant que le PDF continue
+# d'être décodé, et son bloc SQL est écrit dès que les tableaux précédents
+# le sont. En mémoire à tout instant : quelques textes de tableaux et un
+# seul DataFrame côté SQL, quelle que soit la taille du document.
+QUEUE_SIZE = 2
+_DONE = object()
+
+def drain(q):
+    while q.get() is not _DONE:
+        pass
+
+def extract_stage(texts, out, errors):
+    """Pousse (nom du parseur, texte brut) au fil de l'extraction."""
+    try:
+        items = iter(texts)
+        while True:
+            # une étape par tableau : décodage des pages jusqu'au titre suivant
+            with metrics.stage("extract") as st:
+                item = next(items, _DONE)
+                if st and item is not _DONE:
+                    st.set(group=item[0])
+                    st.add(bytes=len((item[1] or "").encode("utf-8")))
+            if item is _DONE:
+                break
+            out.put(item)
+    except Exception as e:
+        print(f"⚠️ Extraction : erreur {e!r}")
+        errors.append(f"Extraction : {e!r}")
+    finally:
+        out.put(_DONE)
+
+def parse_stage(inq, out, prefix, source, errors):
+    """Parse et sauvegarde chaque groupe reçu, puis annonce ses n° de tableaux."""
+    starts = mainfinal.group_starts()
+    seen = set()
+    try:
+        while (item := inq.get()) is not _DONE:
+            func, raw = item
+            group, table_num = starts[func]
+            seen.add(func)
+            if raw == "":
+                mainfinal.missing_group(group, source, errors)
+            else:
+                mainfinal.run_group(group, table_num, raw, prefix, errors)
+            out.put(range(table_num, table_num + group["count"]))
+        for func, (group, _) in starts.items():
+            if func not in seen:
+                mainfinal.missing_group(group, source, errors)
+    except Exception as e:
+        print(f"⚠️ Parsing : erreur {e!r}")
+        errors.append(f"Parsing : {e!r}")
+        drain(inq)
+    finally:
+        out.put(_DONE)
+
+def sql_stage(inq, csv_dir, date_doc):
+    """
+    Écrit MMYYYYsqltxt.txt dans l'ordre des tableaux : un bloc dès que les
+    tableaux précédents sont traités ; tableaux non reçus (SKIP, REUSE
+    antérieur, absents) en fin de flux, depuis leur CSV.
+    """
+    prefix = date_doc.replace("/", "")
+    ready, nxt = set(), 1
+
+    def write(i):
+        table = sqltxt.read_rows(csv_dir, prefix, i)
+        if table is not None:
+            sqltxt.write_table(f, i, *table)
+
+    with sqltxt.open_sqltxt(csv_dir, prefix) as f:
+        sqltxt.write_header(f, date_doc[3:] + date_doc[:2])
+        while (nums := inq.get()) is not _DONE:
+            ready.update(nums)
+            while nxt in ready:
+                write(nxt)
+                nxt += 1
+        for i in range(nxt, 15):
+            write(i)
+        sqltxt.write_footer(f)
+    print(f"Fichier généré : {prefix}sqltxt.txt")
+
+@metrics.timed("pipeline")
+def run_pipeline(texts, date_doc, source):
+    """
+    Traite un flux (nom du parseur, texte brut, None si SKIP ou "REUSE") : CSV et
+    manifeste dans mainfinal.OUTPUT_DIR, puis MMYYYYsqltxt.txt.
+    Retourne la liste des erreurs.
+    """
+    sqltxt.check_date(date_doc)
+    prefix = date_doc.replace("/", "")
+    errors = []
+    texts_q = queue.Queue(maxsize=QUEUE_SIZE)
+    done_q = queue.Queue(maxsize=QUEUE_SIZE)
+    threads = [
+        threading.Thread(target=extract_stage, args=(texts, texts_q, errors), daemon=True),
+        threading.Thread(target=parse_stage, args=(texts_q, done_q, prefix, source, errors), daemon=True),
+    ]
+    for t in threads:
+        t.start()
+    try:
+        sql_stage(done_q, mainfinal.OUTPUT_DIR, date_doc)
+    except Exception as e:
+        print(f"⚠️ SQL : erreur {e!r}")
+        errors.append(f"SQL : {e!r}")
+        drain(done_q)
+    for t in threads:
+        t.join()
+    return errors
+
+if __name__ == "__main__":
+    import argparse
+    from batch import iter_source
+    ap = argparse.ArgumentParser(description="Extraction, parsing et génération SQL en flux d'un document ESMA")
+    ap.add_argument("source", help="PDF ESMA ou texte collé (.txt)")
+    ap.add_argument("date", help="date du document (MM/YYYY)")
+    metrics.add_arguments(ap)
+    args = ap.parse_args()
+    metrics.from_args(args)
+    run_pipeline(iter_source(args.source), args.date, args.source)
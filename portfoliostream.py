@@ -0,0 +1,181 @@
+import io
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import exactsum
+import metrics
+from liquiditystress import discount_factors, fund_liquidity, liquidity_params, weighted_wla, wla_values
+from marketstress import market_params, stress_market, summary_pct
+
+# ---------------------------------------------------------------------
+# Stress de marché et de liquidité sur des fichiers de positions hors mémoire
+# ---------------------------------------------------------------------
+# Le CSV des positions (colonnes de marketstress + Fund, WLABucket ; une
+# ligne par position, sans retour à la ligne dans les champs) est découpé
+# en blocs de CHUNK_ROWS lignes : seuls les décalages en octets des blocs
+# sont repérés (par fenêtres mmap), chaque processus relit et parse son
+# bloc, le joint aux paramètres ESMA de la date (transmis une fois, à
+# l'initialisation) et renvoie des sommes partielles exactes par fonds
+# (exactsum) : valeur de marché, pertes des scénarios de marché, valeur x
+# décote de liquidité, valeurs par bucket WLA. Le processus principal ne
+# garde que ces agrégats (au plus WINDOW blocs en cours par processus),
+# cumulés dans l'ordre des blocs : fonds dans l'ordre de première
+# apparition, comme en mémoire. Résultats identiques, au bit près, à
+# fund_summary(stress_market(...)) et stress_liquidity(...) sur le fichier
+# entier lu en mémoire.
+CHUNK_ROWS = 200_000
+WINDOW = 2
+SCAN_BYTES = 64 << 20
+LOSS_COLUMNS = ["loss_spread", "loss_ir", "loss_fx_up", "loss_fx_down"]
+# colonnes lues en texte dans chaque bloc comme dans un fichier entier
+TEXT_COLUMNS = {"Fund": str}
+
+def chunk_ranges(path, rows=CHUNK_ROWS):
+    """Plages d'octets [début, fin) de blocs de `rows` lignes, en-tête exclu."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            body = mm.find(b"\n") + 1 or size
+            cuts = [body]
+            seen = 0
+            for off in range(body, size, SCAN_BYTES):
+                window = np.frombuffer(mm[off:off + SCAN_BYTES], dtype=np.uint8)
+                ends = np.flatnonzero(window == 10) + off + 1
+                # fins de ligne de rang rows, 2 x rows, ... (comptées depuis l'en-tête)
+                first = (rows - seen % rows) % rows or rows
+                cuts += ends[first - 1::rows].tolist()
+                seen += len(ends)
+    if cuts[-1] != size:
+        cuts.append(size)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+def read_chunk(path, columns, start, stop):
+    """DataFrame des lignes de `path` entre les octets `start` et `stop`."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    try:
+        return pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=TEXT_COLUMNS)
+    except pd.errors.EmptyDataError:
+        # bloc de lignes vides (fin de fichier)
+        return pd.DataFrame(columns=columns)
+
+def chunk_sums(holdings, market, liquidity):
+    """
+    Sommes partielles par fonds d'un bloc : (fonds dans l'ordre d'apparition,
+    {agrégat: sommes partielles exactes}).
+    """
+    fund = holdings["Fund"] if "Fund" in holdings.columns else pd.Series("ALL", index=holdings.index)
+    codes, names = pd.factorize(fund)
+    n = len(names)
+    losses = stress_market(holdings, market)
+    mv = losses["MarketValue"].to_numpy(dtype=float)
+    values = {c: losses[c].to_numpy(dtype=float) for c in ["MarketValue"] + LOSS_COLUMNS}
+    values["ldf_value"] = mv * discount_factors(holdings, liquidity)
+    for k, v in enumerate(wla_values(holdings, liquidity), start=1):
+        values[f"wla_{k}"] = v
+    return list(names), {c: exactsum.partial_sums(codes, v, n) for c, v in values.items()}
+
+# Processus : paramètres de la date transmis une fois, à l'initialisation
+_PARAMS = None
+
+def _init_worker(path, columns, market, liquidity):
+    global _PARAMS
+    _PARAMS = (path, columns, market, liquidity)
+
+def _run_chunk(job):
+    k, start, stop = job
+    path, columns, market, liquidity = _PARAMS
+    with metrics.stage("chunk", chunk=k) as m:
+        h = read_chunk(path, columns, start, stop)
+        m.add(rows=len(h), bytes=stop - start)
+        return len(h), chunk_sums(h, market, liquidity)
+
+def _results(jobs, workers, initargs):
+    """Résultats des blocs, dans l'ordre, au plus WINDOW x workers blocs en cours."""
+    if workers == 1:
+        _init_worker(*initargs)
+        yield from map(_run_chunk, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        pending = []
+        for job in jobs:
+            pending.append(pool.submit(_run_chunk, job))
+            if len(pending) >= WINDOW * workers:
+                yield pending.pop(0).result()
+        for fut in pending:
+            yield fut.result()
+
+def stream_portfolio(path, market, liquidity, chunk_rows=CHUNK_ROWS, workers=1):
+    """
+    Agrégats par fonds d'un fichier de positions lu par blocs :
+    (fonds dans l'ordre d'apparition, {agrégat: tableau par fonds}, lignes lues).
+    """
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    jobs = [(k, start, stop) for k, (start, stop) in enumerate(chunk_ranges(path, chunk_rows))]
+    funds, index, acc, rows = [], {}, {}, 0
+    for n_rows, (names, parts) in _results(jobs, workers, (path, columns, market, liquidity)):
+        rows += n_rows
+        for name in names:
+            if name not in index:
+                index[name] = len(funds)
+                funds.append(name)
+        pos = [index[name] for name in names]
+        for c, (totals, special) in parts.items():
+            # sommes du bloc replacées aux codes globaux des fonds
+            totals_g, special_g = acc.setdefault(c, ([], []))
+            totals_g.extend([0] * (len(funds) - len(totals_g)))
+            special_g.extend([0.0] * (len(funds) - len(special_g)))
+            for p, t, x in zip(pos, totals, special.tolist()):
+                totals_g[p] += t
+                special_g[p] += x
+    sums = {c: exactsum.to_float((totals, np.array(special))) for c, (totals, special) in acc.items()}
+    return funds, sums, rows
+
+def market_summary(funds, sums):
+    """Équivalent de marketstress.fund_summary : fonds triés, pertes et % de l'actif."""
+    total = pd.DataFrame({c: sums.get(c, np.zeros(len(funds))) for c in ["MarketValue"] + LOSS_COLUMNS},
+                         index=pd.Index(funds, name="Fund"))
+    return summary_pct(total.sort_index())
+
+def liquidity_summary(funds, sums, fund_table, liquidity):
+    """Équivalent de liquiditystress.stress_liquidity, à partir des agrégats."""
+    n = len(funds)
+    buckets = [sums[f"wla_{k}"] for k in range(1, len(liquidity["wla_factors"]) + 1) if f"wla_{k}" in sums]
+    return fund_liquidity(pd.Index(funds), sums.get("MarketValue", np.zeros(n)), sums.get("ldf_value", np.zeros(n)),
+                          weighted_wla(buckets, n, liquidity), fund_table, liquidity)
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Stress de marché et de liquidité ESMA sur des positions lues par blocs")
+    ap.add_argument("holdings", help="CSV des positions (colonnes de marketstress + Fund, WLABucket)")
+    ap.add_argument("date", help="date des paramètres ESMA (MM/YYYY)")
+    ap.add_argument("--funds", help="CSV des fonds (Fund, ProfessionalShare, RetailShare[, NAV]) : stress de liquidité")
+    ap.add_argument("--csv-dir", default=os.path.join("data", "output"))
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="lignes par bloc")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--out-market", help="CSV des pertes de marché par fonds")
+    ap.add_argument("--out-liquidity", help="CSV des résultats de liquidité par fonds (avec --funds)")
+    metrics.add_arguments(ap)
+    args = ap.parse_args()
+    metrics.from_args(args)
+
+    market = market_params(args.csv_dir, args.date)
+    liquidity = liquidity_params(args.csv_dir, args.date)
+    funds, sums, rows = stream_portfolio(args.holdings, market, liquidity, args.chunk_rows, args.workers)
+    print(f"=> {rows} positions, {len(funds)} fonds")
+    summary = market_summary(funds, sums)
+    print(summary.to_string())
+    if args.out_market:
+        summary.to_csv(args.out_market, encoding="utf-8")
+    if args.funds:
+        result = liquidity_summary(funds, sums, pd.read_csv(args.funds, dtype=TEXT_COLUMNS), liquidity)
+        print(result.to_string())
+        if args.out_liquidity:
+            result.to_csv(args.out_liquidity, encoding="utf-8")
@@ -0,0 +1,165 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from liquiditystress import liquidity_params, sale_fraction
+from marketstress import market_params
+from sweep import build_book
+
+# ---------------------------------------------------------------------
+# Stress test inversé : multiplicateur de rupture par fonds
+# ---------------------------------------------------------------------
+# Pour chaque fonds, plus petit multiplicateur k appliqué aux chocs ESMA
+# des tableaux choisis (les autres ne sont pas appliqués) tel que :
+#   loss : perte (marché + coût de liquidité) >= seuil, en % de la NAV ;
+#   wla  : couverture des sorties par les WLA pondérés <= seuil, en %.
+# Tableaux : 5 (spreads souverains), 6 (spreads entreprises), 8 (taux),
+# 10 / 11 (change, appréciation / dépréciation de l'euro ; si les deux
+# sont choisis, le pire des deux), 13 (sorties nettes).
+# Tous les fonds sont traités ensemble sur des tableaux NumPy : balayage
+# de k sur une grille régulière de SCAN_STEPS points de ]0, MAX_MULTIPLIER]
+# jusqu'au premier point en rupture, puis dichotomie entre ce point et le
+# précédent. Un fonds convergé sort de l'ensemble actif ; les paquets de
+# change ne sont refiltrés que lorsque cet ensemble rétrécit.
+# Les métriques ne sont pas monotones en k : un taux de change négatif
+# donne un gain x / (1 + x) croissant avec k (jusqu'à 99 fois la valeur de
+# marché au plancher FX_FLOOR), la perte peut donc monter puis redescendre
+# (ex. tableaux 5 + 10). Un simple doublement de k sauterait l'intervalle
+# de rupture ; la grille trouve la première rupture à un pas près, la
+# dichotomie l'affine à `tol` près.
+REVERSE_TABLES = {5: "spread_gov", 6: "spread_corp", 8: "ir", 10: "fx_up", 11: "fx_down", 13: "outflow"}
+RESULT_METRICS = ["loss", "wla"]
+MAX_MULTIPLIER = 64.0
+# pas de la grille : MAX_MULTIPLIER / SCAN_STEPS (0,25 par défaut, k = 1 inclus)
+SCAN_STEPS = 256
+TOLERANCE = 1e-4
+# k x taux de change borné : une devise ne peut pas perdre toute sa valeur
+FX_FLOOR = -0.99
+
+def breach_model(book, tables, metric, threshold):
+    """
+    Fonction (indices de fonds triés, multiplicateurs) -> (métrique, rupture ?)
+    pour les tableaux `tables`, la métrique `metric` et le seuil `threshold`.
+    """
+    unknown = set(tables) - set(REVERSE_TABLES)
+    if unknown:
+        raise ValueError(f"Tableaux non pris en charge : {sorted(unknown)} (attendus : {sorted(REVERSE_TABLES)})")
+    if metric not in RESULT_METRICS:
+        raise ValueError(f"Métrique inconnue : {metric} (attendues : {', '.join(RESULT_METRICS)})")
+    n = len(book["funds"])
+    nav = book["nav"]
+    # spreads / taux : perte linéaire en k, une base par fonds
+    linear = np.zeros(n)
+    for t in (5, 6, 8):
+        if t in tables:
+            g = book[REVERSE_TABLES[t]]
+            linear += np.bincount(g["fund"], weights=g["value"], minlength=n)
+    fx_legs = [REVERSE_TABLES[t] for t in (10, 11) if t in tables]
+    outflow = book["outflow"] if 13 in tables else np.zeros(n)
+    cache = {"idx": None}
+
+    def fx_buckets(idx):
+        # paquets de change des seuls fonds actifs, position dans `idx`
+        if cache["idx"] is None or len(cache["idx"]) != len(idx) or not np.array_equal(cache["idx"], idx):
+            keep = np.isin(book["fx"]["fund"], idx)
+            fund = book["fx"]["fund"][keep]
+            cache.update(idx=idx, pos=np.searchsorted(idx, fund), value=book["fx"]["value"][keep],
+                         rates={leg: book[leg][keep] for leg in fx_legs})
+        return cache
+
+    def model(idx, k):
+        loss = linear[idx] * k
+        if fx_legs:
+            b = fx_buckets(idx)
+            kb = k[b["pos"]]
+            legs = []
+            for leg in fx_legs:
+                x = np.maximum(b["rates"][leg] * kb, FX_FLOOR)
+                legs.append(np.bincount(b["pos"], weights=b["value"] * x / (1.0 + x), minlength=len(idx)))
+            loss = loss + np.maximum.reduce(legs)
+        out = outflow[idx] * k
+        v = nav[idx]
+        if metric == "wla":
+            cover = np.divide(book["wla"][idx], out, out=np.full_like(out, np.inf), where=out > 0) * 100
+            return cover, cover <= threshold
+        pct = np.divide(loss + book["ldf_value"][idx] * sale_fraction(out, v), v, out=np.zeros_like(out), where=v > 0) * 100
+        return pct, pct >= threshold
+
+    return model
+
+def solve(book, tables, metric, threshold, tol=TOLERANCE, max_multiplier=MAX_MULTIPLIER, steps=SCAN_STEPS):
+    """
+    Multiplicateur de rupture de chaque fonds (NaN si aucune rupture sur la
+    grille jusqu'à `max_multiplier`), métrique à ce multiplicateur et nombre
+    d'évaluations.
+    """
+    model = breach_model(book, tables, metric, threshold)
+    n = len(book["funds"])
+    lo, hi = np.zeros(n), np.zeros(n)
+    value = np.full(n, np.nan)
+    iterations = np.zeros(n, dtype=int)
+    found = np.zeros(n, dtype=bool)
+
+    # balayage : premier point de la grille en rupture, le précédent ne rompt pas
+    grid = np.linspace(0.0, max_multiplier, steps + 1)
+    active = np.arange(n)
+    for prev, k in zip(grid[:-1], grid[1:]):
+        if not active.size:
+            break
+        v, br = model(active, np.full(active.size, k))
+        iterations[active] += 1
+        hit = active[br]
+        found[hit] = True
+        value[hit] = v[br]
+        lo[hit], hi[hit] = prev, k
+        active = active[~br]
+
+    # dichotomie sur [lo, hi] : hi rompt, lo ne rompt pas (ou vaut 0)
+    active = np.flatnonzero(found & (hi - lo > tol))
+    while active.size:
+        mid = (lo[active] + hi[active]) / 2
+        v, br = model(active, mid)
+        iterations[active] += 1
+        hi[active[br]] = mid[br]
+        value[active[br]] = v[br]
+        lo[active[~br]] = mid[~br]
+        active = active[hi[active] - lo[active] > tol]
+
+    return pd.DataFrame({
+        "Fund": book["funds"],
+        "multiplier": np.where(found, hi, np.nan),
+        f"{metric}_pct": value,
+        "breach_at_esma": found & (hi <= 1.0),
+        "iterations": iterations,
+    })
+
+def parse_tables(text):
+    """"5,6,8" -> [5, 6, 8]"""
+    return sorted({int(t) for t in text.split(",") if t.strip()})
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Stress test inversé : multiplicateur des chocs ESMA provoquant la rupture")
+    ap.add_argument("holdings", help="CSV des positions (colonnes de marketstress + Fund, WLABucket)")
+    ap.add_argument("funds", help="CSV des fonds (Fund, ProfessionalShare, RetailShare[, NAV])")
+    ap.add_argument("date", help="date des paramètres ESMA (MM/YYYY)")
+    ap.add_argument("--csv-dir", default=os.path.join("data", "output"))
+    ap.add_argument("--tables", default="5,6,8,10,11,13", help="tableaux dont les chocs sont multipliés")
+    ap.add_argument("--metric", choices=RESULT_METRICS, default="loss",
+                    help="loss : perte en %% de la NAV >= seuil ; wla : couverture WLA en %% <= seuil")
+    ap.add_argument("--threshold", type=float, required=True, help="seuil, en %%")
+    ap.add_argument("--tol", type=float, default=TOLERANCE, help="précision sur le multiplicateur")
+    ap.add_argument("--max-multiplier", type=float, default=MAX_MULTIPLIER)
+    ap.add_argument("--steps", type=int, default=SCAN_STEPS, help="points de la grille de balayage")
+    ap.add_argument("--out", help="CSV du résultat par fonds")
+    args = ap.parse_args()
+
+    book = build_book(pd.read_csv(args.holdings), pd.read_csv(args.funds),
+                      market_params(args.csv_dir, args.date), liquidity_params(args.csv_dir, args.date))
+    result = solve(book, parse_tables(args.tables), args.metric, args.threshold, args.tol, args.max_multiplier, args.steps)
+    print(result.to_string(index=False))
+    print(f"=> {int(result['multiplier'].notna().sum())} fonds en rupture sur {len(result)}, "
+          f"{int(result['iterations'].sum())} évaluations")
+    if args.out:
+        result.to_csv(args.out, index=False, encoding="utf-8")
@@ -1,142 +1,209 @@
+import csv
 import os
-import pandas as pd
 import re
 
-def intotxt(csv_dir):
-    # 1) Demande de la date au format MM/YYYY
-    date_input = input("Entrez la date du document (MM/YYYY) : ").strip()
+import metrics
+from parsecache import resolve_csv
+
+# ---------------------------------------------------------------------
+# Métadonnées et mapping de SELECT
+# ---------------------------------------------------------------------
+# - "mats"/"cats" : colonnes dépliées en une ligne SQL chacune ;
+# - "val"/"col"   : une seule valeur par ligne, libellé de colonne fixe ;
+# - "sci"         : "-" ignoré, notation 1E-13 convertie en POWER(...) ;
+# - "numeric"     : lignes dont la valeur n'est pas numérique ignorées.
+TABLES_META = {
+    1:  {"select_num": 1,  "desc": "Liquidity discount factor - Sovereign bonds by residual maturity - Reference countries (in %)", "key": "Country",         "mats": ["3M","6M","1Y","1.5Y","2Y"]},
+    2:  {"select_num": 2,  "desc": "Liquidity discount factor - Sovereign bonds by rating and residual maturity (in %)",   "key": "Rating",          "mats": ["3M","6M","1Y","1.5Y","2Y"]},
+    3:  {"select_num": 3,  "desc": "Liquidity discount factor - Corporate bonds by rating and residual maturity (in %)",   "key": "Rating",          "mats": ["3M","6M","1Y","1.5Y","2Y"]},
+    4:  {"select_num": 4,  "desc": "Price impact parameter (in %)",                                                       "key": "Label",           "val": "Value",          "col": "All", "sci": True},
+    5:  {"select_num": 5,  "desc": "Credit Spread by residual maturity - Government bonds (basis points)",              "key": "Country",         "mats": ["3M","6M","1Y","2Y"]},
+    6:  {"select_num": 6,  "desc": "Corporate credit spreads (basis points)",                                         "key": "Rating",          "cats": ["Non-financial","Financial covered","Financial","ABS"]},
+    7:  {"select_num": 7,  "desc": "Loss given default",                                                                  "key": "Label",           "val": "Value",          "col": "Loss given default (%)"},
+    8:  {"select_num": 8,  "desc": "Interest rate yield shocks absolute changes (basis points)",                     "key": "Country",         "mats": ["1M","3M","6M","1Y","2Y"]},
+    9:  {"select_num": 8,  "desc": "Interest rate yield shocks absolute changes (basis points)",                     "key": "Geographic Area", "mats": ["1M","3M","6M","1Y","2Y"]},
+   10:  {"select_num": 9,  "desc": "FX shocks (appreciation of the EUR against the USD) relative changes (%)",           "key": "ExchangeRateName","val": "Shock",          "col": "Shock", "numeric": True},
+   11:  {"select_num": 10, "desc": "FX shocks (depreciation of the EUR against the USD) relative changes (%)",           "key": "ExchangeRateName","val": "Shock",          "col": "Shock", "numeric": True},
+   12:  {"select_num": 12, "desc": "Bucket factor",                                                                      "key": "BucketInfo",      "val": "Pourcentage",    "col": "Bucket factor (%)"},
+   13:  {"select_num": 11, "desc": "Net outflows (level of redemption)",                                                   "key": "Investor",        "val": "NetOutflows(%)", "col": "Net outflows (%)"},
+   14:  {"select_num": 14, "desc": "Net outflows (macro systematic shocks)",                                               "key": "Label",           "val": "Value",          "col": "Net outflows (%)"},
+}
+
+SCI_REGEX = r"^(-?\d+(?:\.\d+)?)[Ee]-(\d+)$"
+_SCI = re.compile(SCI_REGEX)
+# valeurs lues comme vides par pandas.read_csv (na_values par défaut)
+NA_VALUES = frozenset(["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+                       "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+                       "nan", "null"])
+
+def to_long(i, df):
+    """
+    Forme longue d'un tableau : une ligne par paramètre
+    (line, column, value), dans l'ordre ligne puis colonne du CSV ; mêmes
+    lignes que le texte SQL (param_rows).
+    """
+    import pandas as pd
+    return pd.DataFrame(list(param_rows(i, list(df.columns), df.to_numpy(dtype=object).tolist())),
+                        columns=["line", "column", "value"])
+
+def value_columns(i):
+    meta = TABLES_META[i]
+    return meta.get("mats") or meta.get("cats") or [meta["val"]]
+
+def typed(i, df):
+    """Colonnes de valeurs converties en float64 ("-" et non-numériques = null)."""
+    import pandas as pd
+    df = df.copy()
+    for c in value_columns(i):
+        if c in df.columns:
+            v = df[c].astype(str).str.strip()
+            df[c] = pd.to_numeric(v.mask(v == "-"), errors="coerce").astype("float64")
+    for c in df.columns.difference(value_columns(i)):
+        df[c] = df[c].astype(object)
+    return df
+
+# nombre décimal fini, espaces autour tolérés : ce que pd.to_numeric lit
+# comme un nombre, hors inf/Infinity (sans équivalent SQL) ; ni "1_000",
+# ni chiffres non ASCII, que float() accepterait
+_NUMBER = re.compile(r"[ \t\n\r\f\v]*[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?[ \t\n\r\f\v]*")
+
+def is_number(v):
+    return _NUMBER.fullmatch(v) is not None
+
+def param_rows(i, columns, rows):
+    """
+    (ligne, colonne, valeur texte) de chaque paramètre d'un tableau donné en
+    listes (en-tête, lignes de texte), dans l'ordre ligne puis colonne du
+    CSV. Règles de TABLES_META : colonne absente = valeur vide, "sci" :
+    valeur nettoyée et "-" ignoré, "numeric" : valeurs non numériques
+    ignorées. Source unique du texte SQL (rows_sql) et de to_long.
+    """
+    meta = TABLES_META[i]
+    pos = {c: k for k, c in enumerate(columns)}
+    key = pos[meta["key"]]
+    cols = meta.get("mats") or meta.get("cats")
+    if cols:
+        idx = [(c, pos.get(c)) for c in cols]
+        for r in rows:
+            for c, k in idx:
+                yield r[key], c, (r[k] if k is not None else "")
+        return
+    val, col = pos[meta["val"]], meta["col"]
+    sci, numeric = meta.get("sci"), meta.get("numeric")
+    for r in rows:
+        v = r[val]
+        if sci:
+            v = v.strip()
+            if v == "-":
+                continue
+        if numeric and not is_number(v):
+            continue
+        yield r[key], col, v
+
+def rows_sql(i, columns, rows):
+    """
+    Lignes '--UNION SELECT' d'un tableau donné en listes (en-tête, lignes de
+    texte) : paramètres de param_rows, notation 1E-13 convertie en POWER(...).
+    """
+    meta = TABLES_META[i]
+    head = f"--UNION SELECT {meta['select_num']},'{meta['desc']}','"
+    params = param_rows(i, columns, rows)
+    if meta.get("sci"):
+        params = ((line, c, _SCI.sub(r"\1 * POWER(CAST(0.1 AS FLOAT), \2.0)", v)) for line, c, v in params)
+    return "".join([head + line + "','" + c + "'," + v + "\n" for line, c, v in params])
+
+def read_rows(csv_dir, prefix, i):
+    """
+    (en-tête, lignes) du tableau i sans pandas, valeurs vides comme
+    read_csv(dtype=str).fillna("") ; None si absent.
+    """
+    path = resolve_csv(csv_dir, prefix, i)
+    if not os.path.exists(path):
+        print(f"Avertissement : fichier manquant {prefix}table{i}.csv (table {i} ignorée)")
+        return None
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        columns = next(reader, [])
+        n = len(columns)
+        rows = [[("" if v in NA_VALUES else v) for v in r] + [""] * (n - len(r)) for r in reader if r]
+    return columns, rows
+
+def read_table(csv_dir, prefix, i):
+    """DataFrame du tableau i (CSV propre ou réutilisé), ou None si absent."""
+    import pandas as pd
+    path = resolve_csv(csv_dir, prefix, i)
+    if not os.path.exists(path):
+        print(f"Avertissement : fichier manquant {prefix}table{i}.csv (table {i} ignorée)")
+        return None
+    return pd.read_csv(path, dtype=str).fillna("")
+
+def iter_tables(csv_dir, prefix):
+    """(i, DataFrame) des CSV existants, un tableau en mémoire à la fois."""
+    for i in range(1, 15):
+        df = read_table(csv_dir, prefix, i)
+        if df is not None:
+            yield i, df
+
+def load_tables(csv_dir, prefix):
+    """
+    Charge les CSV MMYYYYtable{i}.csv existants (ou le CSV pointé par le
+    manifeste pour un tableau réutilisé) : {i: DataFrame}.
+    """
+    return dict(iter_tables(csv_dir, prefix))
+
+def check_date(date_input):
     if not re.match(r'^(0[1-9]|1[0-2])/[0-9]{4}$', date_input):
         raise ValueError("Format invalide, utilisez MM/YYYY")
+
+def write_header(f, yyyymm):
+    f.write("--ELSE IF @DateEtalonnage >= '01/01/2025' and @DateEtalonnage <= '31/12/2025'\n")
+    f.write("--INSERT INTO [MarketDate].[dbo].[ST_MMF_Parameters]\n")
+    f.write("--SELECT\n")
+    f.write("--  0 as 'Table_ID'\n")
+    f.write("--  'Etalonnages' as 'Table_Description'\n")
+    f.write("--  'YYYY/MM étalonnages' as 'Line_Description'\n")
+    f.write("--  'YYYY/MM étalonnages' as 'Column_Description'\n")
+    f.write(f"--  {yyyymm} as 'Value'\n\n")
+
+def write_table(f, i, columns, rows):
+    with metrics.stage("sql", table=i) as st:
+        head = f"----TABLE {i}" + "-"*100 + "\n\n"
+        sql = rows_sql(i, columns, rows)
+        f.write(head)
+        f.write(sql)
+        f.write("\n")
+        if st:
+            st.add(rows=len(rows), bytes=len(head) + len(sql.encode("utf-8")) + 1)
+
+def write_footer(f):
+    f.write("--UNION SELECT 13,'Choc de marché','Choc de marché','Choc de marché (%)',95\n")
+
+def open_sqltxt(csv_dir, prefix):
+    os.makedirs(csv_dir, exist_ok=True)
+    return open(os.path.join(csv_dir, f"{prefix}sqltxt.txt"), "w", encoding="utf-8", buffering=1 << 16)
+
+
+@metrics.timed("intotxt")
+def intotxt(csv_dir, date_input=None):
+    # 1) Demande de la date au format MM/YYYY (sauf si fournie)
+    if date_input is None:
+        date_input = input("Entrez la date du document (MM/YYYY) : ").strip()
+    check_date(date_input)
     # prefix = MMYYYY pour les noms de fichiers
     prefix = date_input.replace("/", "")
     # yyyymm = YYYYMM pour la valeur SQL
     yyyymm = date_input[3:] + date_input[:2]
 
-    # 2) Charger les CSV nommés MMYYYYtable{i}.csv
-    tables = {}
-    for i in range(1, 15):
-        fn = f"{prefix}table{i}.csv"
-        path = os.path.join(csv_dir, fn)
-        if os.path.exists(path):
-            tables[i] = pd.read_csv(path, dtype=str).fillna("")
-        else:
-            print(f"Avertissement : fichier manquant {fn} (table {i} ignorée)")
-
-    # 3) Métadonnées et mapping de SELECT
-    tables_meta = {
-        1:  {"select_num": 1,  "desc": "Liquidity discount factor - Sovereign bonds by residual maturity - Reference countries (in %)", "key": "Country",         "mats": ["3M","6M","1Y","1.5Y","2Y"]},
-        2:  {"select_num": 2,  "desc": "Liquidity discount factor - Sovereign bonds by rating and residual maturity (in %)",   "key": "Rating",          "mats": ["3M","6M","1Y","1.5Y","2Y"]},
-        3:  {"select_num": 3,  "desc": "Liquidity discount factor - Corporate bonds by rating and residual maturity (in %)",   "key": "Rating",          "mats": ["3M","6M","1Y","1.5Y","2Y"]},
-        4:  {"select_num": 4,  "desc": "Price impact parameter (in %)",                                                       "key": "Label",           "val": "Value"},
-        5:  {"select_num": 5,  "desc": "Credit Spread by residual maturity - Government bonds (basis points)",              "key": "Country",         "mats": ["3M","6M","1Y","2Y"]},
-        6:  {"select_num": 6,  "desc": "Corporate credit spreads (basis points)",                                         "key": "Rating",          "cats": ["Non-financial","Financial covered","Financial","ABS"]},
-        7:  {"select_num": 7,  "desc": "Loss given default",                                                                  "key": "Label",           "val": "Value"},
-        8:  {"select_num": 8,  "desc": "Interest rate yield shocks absolute changes (basis points)",                     "key": "Country",         "mats": ["1M","3M","6M","1Y","2Y"]},
-        9:  {"select_num": 8,  "desc": "Interest rate yield shocks absolute changes (basis points)",                     "key": "Geographic Area", "mats": ["1M","3M","6M","1Y","2Y"]},
-       10:  {"select_num": 9,  "desc": "FX shocks (appreciation of the EUR against the USD) relative changes (%)",           "key": "ExchangeRateName","val": "Shock"},
-       11:  {"select_num": 10, "desc": "FX shocks (depreciation of the EUR against the USD) relative changes (%)",           "key": "ExchangeRateName","val": "Shock"},
-       12:  {"select_num": 12, "desc": "Bucket factor",                                                                      "key": "BucketInfo",      "val": "Pourcentage"},
-       13:  {"select_num": 11, "desc": "Net outflows (level of redemption)",                                                   "key": "Investor",        "val": "NetOutflows(%)"},
-       14:  {"select_num": 14, "desc": "Net outflows (macro systematic shocks)",                                               "key": "Label",           "val": "Value"},
-    }
-
-    # 4) Construction des lignes SQL en commentaires
-    lines = []
-    lines.append("--ELSE IF @DateEtalonnage >= '01/01/2025' and @DateEtalonnage <= '31/12/2025'\n")
-    lines.append("--INSERT INTO [MarketDate].[dbo].[ST_MMF_Parameters]\n")
-    lines.append("--SELECT\n")
-    lines.append("--  0 as 'Table_ID'\n")
-    lines.append("--  'Etalonnages' as 'Table_Description'\n")
-    lines.append("--  'YYYY/MM étalonnages' as 'Line_Description'\n")
-    lines.append("--  'YYYY/MM étalonnages' as 'Column_Description'\n")
-    lines.append(f"--  {yyyymm} as 'Value'\n\n")
-
-    for i, df in tables.items():
-        meta = tables_meta[i]
-        sel  = meta["select_num"]
-        lines.append(f"----TABLE {i}" + "-"*100 + "\n\n")
-
-        if i in (1,2,3):
-            for _, r in df.iterrows():
-                key = r[meta["key"]]
-                for mat in meta["mats"]:
-                    val = r.get(mat, "")
-                    lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{key}','{mat}',{val}\n")
-
-        elif i == 4:
-            for _, r in df.iterrows():
-                lab, val = r["Label"], r["Value"].strip()
-                if val == "-":
-                    continue
-                m_ = re.match(r"^(-?\d+(?:\.\d+)?)[Ee]-(\d+)$", val)
-                if m_:
-                    coef, exp = m_.group(1), m_.group(2)
-                    expr = f"{coef} * POWER(CAST(0.1 AS FLOAT), {exp}.0)"
-                else:
-                    expr = val
-                lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{lab}','All',{expr}\n")
-
-        elif i == 5:
-            for _, r in df.iterrows():
-                c = r["Country"]
-                for m in meta["mats"]:
-                    v = r.get(m, "")
-                    lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{c}','{m}',{v}\n")
-
-        elif i == 6:
-            for _, r in df.iterrows():
-                rat = r["Rating"]
-                for cat in meta["cats"]:
-                    v = r.get(cat, "")
-                    lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{rat}','{cat}',{v}\n")
-
-        elif i == 7:
-            for _, r in df.iterrows():
-                lab, v = r["Label"], r["Value"]
-                lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{lab}','Loss given default (%)',{v}\n")
-
-        elif i in (8,9):
-            for _, r in df.iterrows():
-                area = r[meta["key"]]
-                for m in meta["mats"]:
-                    v = r.get(m, "")
-                    lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{area}','{m}',{v}\n")
-
-        elif i in (10,11):
-            for _, r in df.iterrows():
-                ex, sh = r["ExchangeRateName"], r["Shock"]
-                try:
-                    float(sh)
-                except:
-                    continue
-                lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{ex}','Shock',{sh}\n")
-
-        elif i == 12:
-            for _, r in df.iterrows():
-                b, p = r["BucketInfo"], r["Pourcentage"]
-                lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{b}','Bucket factor (%)',{p}\n")
-
-        elif i == 13:
-            for _, r in df.iterrows():
-                inv, no = r["Investor"], r["NetOutflows(%)"]
-                lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{inv}','Net outflows (%)',{no}\n")
-
-        elif i == 14:
-            for _, r in df.iterrows():
-                lab, v = r["Label"], r["Value"]
-                lines.append(f"--UNION SELECT {sel},'{meta['desc']}','{lab}','Net outflows (%)',{v}\n")
-
-        lines.append("\n")
-
-    lines.append("--UNION SELECT 13,'Choc de marché','Choc de marché','Choc de marché (%)',95\n")
-
-    # 5) Enregistrement sous "MMYYYYsqltxt.txt"
-    os.makedirs(csv_dir, exist_ok=True) 
-    name = f"{prefix}sqltxt.txt"
-    with open(os.path.join(csv_dir, name), "w", encoding="utf-8") as f:
-        f.writelines(lines)
-
-    print(f"Fichier généré : {name}")
+    # 2) Écriture en flux sous "MMYYYYsqltxt.txt" : un CSV chargé, un bloc écrit
+    with open_sqltxt(csv_dir, prefix) as f:
+        write_header(f, yyyymm)
+        for i in range(1, 15):
+            table = read_rows(csv_dir, prefix, i)
+            if table is not None:
+                write_table(f, i, *table)
+        write_footer(f)
+
+    print(f"Fichier généré : {prefix}sqltxt.txt")
 
 if __name__ == "__main__":
     intotxt(csv_dir="data/output")
@@ -0,0 +1,239 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from exactsum import fund_sums
+from liquiditystress import discount_factors, fund_liquidity, liquidity_params, sale_fraction, wla_amounts
+from marketstress import market_params, normalize_rating, stress_market
+
+# ---------------------------------------------------------------------
+# Balayage de sensibilité / Monte Carlo sur l'échelle des chocs ESMA
+# ---------------------------------------------------------------------
+# Un scénario = un multiplicateur par groupe de chocs (1 = chocs ESMA) :
+#   spread_gov (table 5), spread_corp (table 6), ir (tables 8/9),
+#   fx (tables 10/11), outflow (tables 13/14),
+# plus, en Monte Carlo, une perturbation propre à chaque clé (pays, note x
+# catégorie, devise). Les positions sont regroupées en paquets (fonds x
+# clé) : la perte de spread/taux est linéaire dans le multiplicateur de la
+# clé et le choc de change ne dépend que de la devise, le résultat est donc
+# exact. Pertes calculées sur une matrice (scénarios x paquets) par blocs
+# de scénarios, puis sommées par fonds (np.add.reduceat sur les paquets
+# triés par fonds, sans matrice paquets x fonds). Les blocs sont répartis sur des
+# processus, chacun avec sa propre graine (SeedSequence) : mêmes tirages
+# quel que soit le nombre de processus.
+FACTORS = ["spread_gov", "spread_corp", "ir", "fx", "outflow"]
+METRICS = ["loss_spread", "loss_ir", "loss_fx_up", "loss_fx_down",
+           "outflow", "outflow_macro", "liquidity_cost"]
+CHUNK_SCENARIOS = 256
+CHUNK_BYTES = 64 << 20
+
+def buckets(codes, keys, values):
+    """
+    Somme de `values` par (fonds, clé) : la perte est linéaire dans le
+    multiplicateur de la clé, on évalue donc des paquets au lieu des lignes.
+    Paquets triés par fonds : "starts" = premier paquet de chaque fonds de
+    "present", pour la réduction par fonds (per_fund).
+    """
+    keep = values != 0
+    s = pd.Series(values[keep]).groupby([codes[keep], keys[keep]]).sum()
+    if len(s):
+        fund = s.index.get_level_values(0).to_numpy().astype(np.int64)
+        key = s.index.get_level_values(1).to_numpy().astype(np.int64)
+    else:
+        fund = key = np.zeros(0, dtype=np.int64)
+    present, starts = np.unique(fund, return_index=True)
+    return {"value": s.to_numpy(dtype=float), "key": key, "fund": fund, "present": present, "starts": starts}
+
+def per_fund(g, m, n_funds):
+    """Somme par fonds des colonnes de `m` (scénarios x paquets de `g`) : scénarios x fonds."""
+    out = np.zeros((m.shape[0], n_funds))
+    if len(g["starts"]):
+        out[:, g["present"]] = np.add.reduceat(m, g["starts"], axis=1)
+    return out
+
+def build_book(holdings, funds, market, liquidity):
+    """
+    Paquets (fonds x clé de choc) à l'échelle 1 des chocs ESMA pour chaque
+    groupe de facteurs, et tableaux par fonds (NAV, sorties, coût de
+    liquidité de la vente totale, WLA pondérés) issus de fund_liquidity.
+    """
+    h = holdings.reset_index(drop=True)
+    codes, names = pd.factorize(h["Fund"])
+    n = len(names)
+
+    base = stress_market(h, market)
+    mv = base["MarketValue"].to_numpy(dtype=float)
+    sov = h["AssetType"].astype(str).to_numpy() == "Sovereign"
+    spread = base["loss_spread"].to_numpy(dtype=float)
+    country = pd.factorize(h["Country"].astype(str))[0]
+    corp_key = pd.factorize(normalize_rating(h["Rating"]) + "|" + h["AssetType"].astype(str))[0]
+    ccy_code, ccys = pd.factorize(h["Currency"].astype(str))
+
+    ldf_value = fund_sums(codes, mv * discount_factors(h, liquidity), n)
+    liq = fund_liquidity(names, fund_sums(codes, mv, n), ldf_value, wla_amounts(h, codes, n, liquidity),
+                         funds, liquidity)
+
+    fx = buckets(codes, ccy_code, mv)
+    rates = {name: pd.Series(ccys).map(market[name]).fillna(0.0).to_numpy(dtype=float)
+             for name in ("fx_up", "fx_down")}
+    return {
+        "funds": np.asarray(names, dtype=object),
+        "n_keys": {"spread_gov": country.max() + 1, "spread_corp": corp_key.max() + 1,
+                   "ir": country.max() + 1, "fx": len(ccys)},
+        "spread_gov": buckets(codes, country, np.where(sov, spread, 0.0)),
+        "spread_corp": buckets(codes, corp_key, np.where(sov, 0.0, spread)),
+        "ir": buckets(codes, country, base["loss_ir"].to_numpy(dtype=float)),
+        "fx": fx,
+        "fx_up": rates["fx_up"][fx["key"]],
+        "fx_down": rates["fx_down"][fx["key"]],
+        "nav": liq["NAV"].to_numpy(dtype=float),
+        "outflow": liq["outflow"].to_numpy(dtype=float),
+        "outflow_macro": liq["outflow_macro"].to_numpy(dtype=float),
+        "ldf_value": ldf_value,
+        "wla": liq["wla"].to_numpy(dtype=float),
+    }
+
+def grid_scenarios(grid):
+    """Produit cartésien {facteur: [multiplicateurs]} -> tableau (scénarios x FACTORS)."""
+    axes = [grid.get(name, [1.0]) for name in FACTORS]
+    return np.array(list(product(*axes)), dtype=float)
+
+def draw_scenarios(rng, n, sigma):
+    """Multiplicateurs log-normaux de moyenne 1 par groupe : (n x FACTORS)."""
+    s = np.array([sigma.get(name, 0.0) for name in FACTORS])
+    return np.exp(rng.standard_normal((n, len(FACTORS))) * s - s * s / 2)
+
+def chunk_size(n_buckets, requested=CHUNK_SCENARIOS):
+    """Scénarios par bloc : une dizaine de matrices (bloc x paquets) en float64 tiennent dans CHUNK_BYTES."""
+    return max(1, min(requested, CHUNK_BYTES // (10 * 8 * max(n_buckets, 1))))
+
+def n_buckets(book):
+    return max(len(book[g]["value"]) for g in ("spread_gov", "spread_corp", "ir", "fx"))
+
+def evaluate(book, scales, rng=None, idio=0.0):
+    """
+    Résultats par (scénario, fonds) d'un bloc de scénarios : {métrique: tableau S x F}.
+    `idio` > 0 : perturbation log-normale propre à chaque clé, tirée avec `rng`.
+    """
+    col = {name: scales[:, [k]] for k, name in enumerate(FACTORS)}
+
+    def mult(factor):
+        # multiplicateurs (scénarios x paquets) du groupe
+        m = col[factor]
+        if idio and rng is not None:
+            z = rng.standard_normal((len(scales), book["n_keys"][factor]))
+            m = m * np.exp(z * idio - idio * idio / 2)[:, book[factor]["key"]]
+        return m
+
+    n = len(book["funds"])
+
+    def linear(factor):
+        g = book[factor]
+        return per_fund(g, g["value"] * mult(factor), n)
+
+    res = {
+        "loss_spread": linear("spread_gov") + linear("spread_corp"),
+        "loss_ir": linear("ir"),
+    }
+    fx = book["fx"]
+    m = mult("fx")
+    for name in ("fx_up", "fx_down"):
+        r = book[name] * m
+        res[f"loss_{name}"] = per_fund(fx, fx["value"] * r / (1.0 + r), n)
+
+    k_out = col["outflow"]
+    res["outflow"] = book["outflow"] * k_out
+    res["outflow_macro"] = book["outflow_macro"] * k_out
+    res["liquidity_cost"] = book["ldf_value"] * sale_fraction(res["outflow"], book["nav"])
+    return res
+
+# Processus : le portefeuille est transmis une fois, à l'initialisation
+_BOOK = None
+
+def _init_worker(book):
+    global _BOOK
+    _BOOK = book
+
+def _run_chunk(job):
+    scales, seed, n, idio, sigma = job
+    rng = np.random.default_rng(seed) if seed is not None else None
+    if scales is None:
+        scales = draw_scenarios(rng, n, sigma)
+    return scales, evaluate(_BOOK, scales, rng, idio)
+
+def run_sweep(book, scenarios=None, draws=0, sigma=None, idio=0.0, seed=0, workers=1):
+    """
+    Évalue une grille (`scenarios`, tableau S x FACTORS) ou `draws` tirages
+    Monte Carlo. Retourne (multiplicateurs S x FACTORS, {métrique: S x F}).
+    """
+    size = chunk_size(n_buckets(book))
+    if scenarios is not None:
+        jobs = [(scenarios[k:k+size], None, 0, 0.0, None) for k in range(0, len(scenarios), size)]
+    else:
+        counts = [min(size, draws - k) for k in range(0, draws, size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(counts))
+        jobs = [(None, s, n, idio, sigma or {}) for s, n in zip(seeds, counts)]
+
+    if workers == 1:
+        _init_worker(book)
+        parts = [_run_chunk(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(book,)) as pool:
+            parts = list(pool.map(_run_chunk, jobs))
+    if not parts:
+        return np.empty((0, len(FACTORS))), {m: np.empty((0, len(book["funds"]))) for m in METRICS}
+    scales = np.vstack([p[0] for p in parts])
+    return scales, {m: np.vstack([p[1][m] for p in parts]) for m in METRICS}
+
+def quantiles(book, results, qs=(0.05, 0.5, 0.95, 0.99)):
+    """Quantiles par fonds et par métrique, en % de la NAV."""
+    nav = book["nav"]
+    rows = []
+    for m in METRICS:
+        pct = np.divide(results[m], nav, out=np.full_like(results[m], np.nan), where=nav > 0) * 100
+        q = np.quantile(pct, qs, axis=0)
+        for f, fund in enumerate(book["funds"]):
+            rows.append([fund, m] + q[:, f].tolist())
+    return pd.DataFrame(rows, columns=["Fund", "metric"] + [f"q{int(x * 100)}_pct" for x in qs])
+
+def parse_grid(items):
+    """["spread_gov=0.5,1,2", "fx=1,1.5"] -> {"spread_gov": [0.5, 1, 2], "fx": [1, 1.5]}"""
+    grid = {}
+    for item in items or []:
+        name, _, values = item.partition("=")
+        if name not in FACTORS:
+            raise ValueError(f"Facteur inconnu : {name} (attendus : {', '.join(FACTORS)})")
+        grid[name] = [float(v) for v in values.split(",")]
+    return grid
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Balayage / Monte Carlo des chocs ESMA sur des portefeuilles")
+    ap.add_argument("holdings", help="CSV des positions (colonnes de marketstress + Fund, WLABucket)")
+    ap.add_argument("funds", help="CSV des fonds (Fund, ProfessionalShare, RetailShare[, NAV])")
+    ap.add_argument("date", help="date des paramètres ESMA (MM/YYYY)")
+    ap.add_argument("--csv-dir", default=os.path.join("data", "output"))
+    ap.add_argument("--grid", action="append", help="facteur=v1,v2,... (" + ", ".join(FACTORS) + ")")
+    ap.add_argument("--draws", type=int, default=1000, help="tirages Monte Carlo (sans --grid)")
+    ap.add_argument("--sigma", type=float, default=0.25, help="volatilité log-normale des multiplicateurs de groupe")
+    ap.add_argument("--idio", type=float, default=0.0, help="volatilité de la perturbation par clé")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--out", help="CSV des quantiles par fonds")
+    args = ap.parse_args()
+
+    book = build_book(pd.read_csv(args.holdings), pd.read_csv(args.funds),
+                      market_params(args.csv_dir, args.date), liquidity_params(args.csv_dir, args.date))
+    if args.grid:
+        scales, results = run_sweep(book, scenarios=grid_scenarios(parse_grid(args.grid)), workers=args.workers)
+    else:
+        scales, results = run_sweep(book, draws=args.draws, sigma={f: args.sigma for f in FACTORS},
+                                    idio=args.idio, seed=args.seed, workers=args.workers)
+    table = quantiles(book, results)
+    print(f"=> {len(scales)} scénarios")
+    print(table.to_string(index=False))
+    if args.out:
+        table.to_csv(args.out, index=False, encoding="utf-8")
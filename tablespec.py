@@ -0,0 +1,257 @@
+import functools
+import re
+
+import metrics
+import sqltxt
+
+# ---------------------------------------------------------------------
+# Moteur de parsing piloté par spécification (tableaux 1 à 14)
+# ---------------------------------------------------------------------
+# Chaque groupe de tableaux est décrit par une spec : lignes d'en-tête à
+# sauter, règle de ligne, expressions multi-mots, préfixes connus, nombre
+# de colonnes numériques. La spec est compilée une fois (regex, tuples)
+# puis appliquée en une passe sur les lignes du texte. Le moteur produit
+# des listes (en-tête, lignes) ; pandas n'est importé que pour les API qui
+# renvoient des DataFrames.
+UNWANTED_REGEX = r"ESMA - 201-203.*?www\.esma\.europa\.eu \d+"
+_UNWANTED = re.compile(UNWANTED_REGEX)
+
+def clean_pdf_text(raw_text):
+    return _UNWANTED.sub("", raw_text)
+
+BELOW_BBB = "Below BBB or unrated"
+TENORS_3M = ["3M", "6M", "1Y", "1.5Y", "2Y"]
+TENORS_1M = ["1M", "3M", "6M", "1Y", "2Y"]
+NUMBER = r'-?\d+(?:\.\d+)?(?:E-?\d+)?'
+_DIGITS = re.compile(r'\d+')
+
+PARSER_SPECS = {
+    "parse_table_1_and_2": {
+        "desc": "Tableaux 1&2", "skip": 2, "rule": "tokens", "phrases": [BELOW_BBB], "width": 12,
+        "columns": [["Country"] + TENORS_3M, ["Rating"] + TENORS_3M],
+    },
+    "parse_table_3": {
+        # colonnes de maturité lues sur la ligne d'en-tête
+        "desc": "Table 3", "skip": 2, "rule": "tokens", "phrases": [BELOW_BBB], "width": 6,
+        "header_line": 1, "columns": [["Rating"]],
+    },
+    "parse_table_4": {"desc": "Table 4", "skip": 1, "rule": "label_value", "columns": [["Label", "Value"]]},
+    "parse_table_5": {
+        "desc": "Table 5", "skip": 2, "rule": "tail", "numbers": 4, "number": NUMBER,
+        # note en fin de ligne retirée (ex: "... 20 30 35 40  non EU and non US")
+        "note": r'[A-Za-z][A-Za-z ]*',
+        "label": "geo_country",
+        "prefixes": ["Advanced economies", "Emerging markets", "EA (weighted averages)", "EU (weighted averages)"],
+        "columns": [["Geographic Area", "Country", "3M", "6M", "1Y", "2Y"]],
+    },
+    "parse_table_6": {
+        "desc": "Table 6", "skip": 2, "rule": "tokens", "width": 5,
+        "columns": [["Rating", "Non-financial", "Financial covered", "Financial", "ABS"]],
+    },
+    "parse_table_7": {"desc": "Table 7", "skip": 1, "rule": "label_value", "columns": [["Label", "Value"]]},
+    "parse_table_8": {
+        "desc": "Table 8", "skip": 3, "rule": "tail", "numbers": 5, "join_lowercase": True,
+        "label": "country",
+        "prefixes": ["EU", "Rest of Europe", "North America", "Australia and Pacific",
+                     "South and Central America", "Asia", "Africa"],
+        "cut": r"Interest rate swap",
+        "columns": [["Country"] + TENORS_1M],
+    },
+    "parse_table_9": {
+        "desc": "Table 9", "skip": 3, "rule": "numbers_any", "numbers": 5, "cut": r'\s+Default value',
+        "columns": [["Geographic Area"] + TENORS_1M],
+    },
+    "parse_table_10": {
+        "desc": "Table 10", "skip": 3, "rule": "tail", "numbers": 1, "number": r'-?\d+(?:\.\d+)?',
+        "join_lowercase": True, "label": "last_word",
+        "columns": [["ExchangeRateName", "Shock"]],
+    },
+    "parse_table_12_and_13": {
+        "desc": "Tableaux 12&13", "skip": 0, "rule": "keywords",
+        "markers": [["x100%", "Weekly liquid assets (bucket 1)", 100],
+                    ["x85%", "Weekly liquid assets (bucket 2)", 85]],
+        "pattern": r'(Professional investor|Retail investor)\s+(\d+)',
+        "columns": [["BucketInfo", "Pourcentage"], ["Investor", "NetOutflows(%)"]],
+    },
+    "parse_table_14": {"desc": "Table 14", "skip": 1, "rule": "label_value", "columns": [["Label", "Value"]]},
+}
+PARSER_SPECS["parse_table_11"] = dict(PARSER_SPECS["parse_table_10"], desc="Table 11")
+
+# ---------------------------------------------------------------------
+# Compilation des specs
+# ---------------------------------------------------------------------
+# Règle "tail" : libellé + N jetons en fin de ligne (rsplit). Les jetons
+# numériques se répètent d'une ligne et d'une date à l'autre : leur
+# validation est mémorisée (une regex par valeur distincte).
+def _number_check(pattern):
+    return functools.lru_cache(maxsize=4096)(lambda tok: pattern.fullmatch(tok) is not None)
+
+def compile_spec(spec):
+    """Précompile les regex et tuples d'une spec (une seule fois par processus)."""
+    c = dict(spec)
+    phrases = spec.get("phrases", [])
+    words = [r'\s+'.join(map(re.escape, p.split())) + r'(?!\S)' for p in phrases]
+    c["tokenize"] = re.compile("|".join(words + [r'\S+'])).findall if phrases else None
+    c["first_words"] = tuple(p.split()[0] for p in phrases)
+    if spec.get("prefixes"):
+        # table 8 : zone suivie d'un espace (retirée) ; table 5 : zone en tête de libellé
+        follow = r'(?= )' if spec.get("label") == "country" else ""
+        c["prefixes"] = re.compile("(?:" + "|".join(map(re.escape, spec["prefixes"])) + ")" + follow)
+    for k in ("cut", "pattern"):
+        c[k] = re.compile(spec[k]) if spec.get(k) else None
+    c["is_number"] = _number_check(re.compile(spec["number"])) if spec.get("number") else None
+    c["note"] = re.compile(r'(\d)\s+' + spec["note"] + '$') if spec.get("note") else None
+    return c
+
+_COMPILED = {}
+
+def compiled(func_name):
+    c = _COMPILED.get(func_name)
+    if c is None:
+        c = _COMPILED[func_name] = compile_spec(PARSER_SPECS[func_name])
+    return c
+
+# ---------------------------------------------------------------------
+# Règles de ligne
+# ---------------------------------------------------------------------
+def _rows_tokens(c, lines):
+    # nombre fixe de jetons ; expressions multi-mots ("Below BBB or unrated") = un jeton
+    tokenize, first, width, rows = c["tokenize"], c["first_words"], c["width"], []
+    for line in lines:
+        if tokenize and any(w in line for w in first):
+            tokens = [" ".join(t.split()) for t in tokenize(line)]
+        else:
+            tokens = line.split()
+        if len(tokens) != width:
+            print(f"Format inattendu dans {c['desc']} : {line}")
+            continue
+        rows.append(tokens)
+    return rows
+
+def _rows_label_value(c, lines):
+    rows = []
+    for line in lines:
+        tokens = line.split()
+        if len(tokens) >= 2:
+            rows.append([" ".join(tokens[:-1]), tokens[-1]])
+    return rows
+
+def _geo_country(c, text):
+    m = c["prefixes"].match(text)
+    if m:
+        geo, country = m.group(), text[m.end():].strip()
+    else:
+        toks = text.split()
+        geo, country = toks[0], " ".join(toks[1:])
+    return (geo, country or geo)
+
+def _country(c, text):
+    m = c["prefixes"].match(text)
+    if m:
+        text = text[m.end():].strip()
+    m = c["cut"].search(text)
+    return (text[:m.start()].strip() if m else text,)
+
+def _rows_tail(c, lines):
+    n, note, is_number = c["numbers"], c["note"], c["is_number"]
+    if note:
+        lines = [note.sub(r'\1', l) if l[-1].isalpha() else l for l in lines]
+    # last_word : libellé = dernier mot avant les nombres (au moins un mot avant)
+    width = n + 2 if c["label"] == "last_word" else n + 1
+    parts = [p for p in (l.rsplit(maxsplit=width - 1) for l in lines) if len(p) == width]
+    if is_number:
+        parts = [p for p in parts if all(map(is_number, p[width - n:]))]
+    if c["label"] == "last_word":
+        return [p[1:] for p in parts]
+    label = _geo_country if c["label"] == "geo_country" else _country
+    return [label(c, p[0]) + tuple(p[1:]) for p in parts]
+
+def _rows_numbers_any(c, lines):
+    # Table 9 : libellé et valeurs sur la même ligne ou sur la suivante
+    digits, n, cut = _DIGITS.findall, c["numbers"], c["cut"]
+    rows, i = [], 0
+    while i < len(lines):
+        nums = digits(lines[i])
+        if len(nums) >= n:
+            rows.append([cut.split(lines[i])[0].strip()] + nums[-n:])
+        elif i + 1 < len(lines) and len(nxt := digits(lines[i + 1])) == n:
+            rows.append([cut.split(lines[i])[0].strip()] + nxt)
+            i += 1
+        i += 1
+    return rows
+
+def _rows_keywords(c, lines):
+    buckets, investors = [], []
+    for line in lines:
+        if m := c["pattern"].search(line):
+            investors.append(m.groups())
+        for marker, label, pct in c["markers"]:
+            if marker in line:
+                buckets.append((label, pct))
+    return buckets, investors
+
+RULES = {"tokens": _rows_tokens, "label_value": _rows_label_value, "tail": _rows_tail,
+         "numbers_any": _rows_numbers_any, "keywords": _rows_keywords}
+# règles à une ligne de texte par enregistrement : lignes non retenues = rejetées
+LINE_RULES = ("tokens", "label_value", "tail")
+
+def _join_lowercase(lines):
+    # ligne de suite (commence par une minuscule) rattachée à la précédente
+    fixed = []
+    for line in lines:
+        if fixed and line[0].islower():
+            fixed[-1] += " " + line
+        else:
+            fixed.append(line)
+    return fixed
+
+def _split_tables(c, rows):
+    """Lignes du ou des tableaux du groupe (côte à côte : découpage par largeur d'en-tête)."""
+    if c["rule"] == "keywords":
+        return rows
+    if len(c["columns"]) == 1:
+        return [rows]
+    out, start = [], 0
+    for cols in c["columns"]:
+        out.append([r[start:start + len(cols)] for r in rows])
+        start += len(cols)
+    return out
+
+def parse_rows(func_name, raw_text):
+    """
+    Parse le texte d'un groupe de tableaux sans pandas : liste de
+    (colonnes, lignes) par tableau, valeurs en texte telles que dans le PDF
+    (lignes en listes ou tuples, telles que produites par la règle).
+    En-tête inattendu (table 3) : [([], [])].
+    """
+    c = compiled(func_name)
+    lines = [s for s in map(str.strip, clean_pdf_text(raw_text).splitlines()) if s]
+    columns = c["columns"]
+    if "header_line" in c:
+        header = lines[c["header_line"]].split() if len(lines) > c["header_line"] else []
+        if len(header) != c["width"] - 1:
+            print(f"Attention ({c['desc']}) : ligne d'en-tête inattendue.")
+            return [([], [])]
+        columns = [columns[0] + header]
+    lines = lines[c["skip"]:]
+    if c.get("join_lowercase"):
+        lines = _join_lowercase(lines)
+    tables = _split_tables(c, RULES[c["rule"]](c, lines))
+    if metrics.enabled():
+        n_rows = len(tables[0]) if c["rule"] != "keywords" else sum(map(len, tables))
+        metrics.add(rows=n_rows, rejected=len(lines) - n_rows if c["rule"] in LINE_RULES else 0)
+    return [(cols, rows) for rows, cols in zip(tables, columns)]
+
+def parse(func_name, raw_text, typed=False):
+    """
+    Parse le texte d'un groupe de tableaux : un DataFrame par tableau (tuple
+    si le groupe en contient deux). Valeurs en texte, telles que dans le
+    PDF (pour les CSV), ou en float64 avec `typed=True`.
+    """
+    import pandas as pd
+    frames = [pd.DataFrame(rows, columns=cols) if cols else pd.DataFrame()
+              for cols, rows in parse_rows(func_name, raw_text)]
+    if typed:
+        # n° des tableaux du groupe : parse_table_12_and_13 -> 12, 13
+        frames = [sqltxt.typed(i, df) for i, df in zip(map(int, _DIGITS.findall(func_name)), frames)]
+    return tuple(frames) if len(frames) > 1 else frames[0]
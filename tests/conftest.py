@@ -0,0 +1,7 @@
+import os
+import sys
+
+# modules du dépôt à plat : importables depuis tests/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# banc de mesure : test_bench_suite seulement (jeux d'essai communs : tests/fixtures.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
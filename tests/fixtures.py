@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import mainfinal
+from tablespec import PARSER_SPECS
+
+# ---------------------------------------------------------------------
+# Jeux d'essai communs aux tests et au banc de mesure (benchmarks/)
+# ---------------------------------------------------------------------
+# Textes "collés" reconstruits depuis les CSV de data/output, positions et
+# fonds synthétiques à graine fixe. Sans dépendance aux modules de stress.
+FOOTER = "ESMA - 201-203 rue de Bercy - CS 80910 - 75589 Paris Cedex 12 - France - www.esma.europa.eu {}"
+FOOTER_EVERY = 40
+POSITIONS_PER_FUND = 100
+
+def read_csv(csv_dir, prefix, i):
+    return pd.read_csv(os.path.join(csv_dir, f"{prefix}table{i}.csv"), dtype=str, keep_default_na=False)
+
+def data_lines(func, t):
+    """Lignes de données d'un groupe, au format du PDF, à partir des CSV `t` (n° -> DataFrame)."""
+    join = lambda row: " ".join(row)
+    if func == "parse_table_1_and_2":
+        return [join(a) + " " + join(b) for a, b in zip(t[1].values, t[2].values)]
+    if func == "parse_table_5":
+        # zone seule quand le pays répète la zone
+        return [join(r[1:]) if r[0] == r[1] else join(r) for r in t[5].values]
+    if func in ("parse_table_10", "parse_table_11"):
+        # last_word : un mot avant le nom du taux de change
+        return ["Currency " + join(r) for r in t[int(func.rsplit("_", 1)[1])].values]
+    if func == "parse_table_9":
+        # libellé puis valeurs sur la ligne suivante
+        return [line for r in t[9].values for line in (r[0], join(r[1:]))]
+    if func == "parse_table_12_and_13":
+        return ([f"{label} x{pct}%" for label, pct in t[12].values]
+                + [join(r) for r in t[13].values])
+    num = int(func.rsplit("_", 1)[1])
+    return [join(r) for r in t[num].values]
+
+def fixture_text(func, tables, scale):
+    """Texte brut d'un groupe : en-têtes (spec `skip`) puis données répétées `scale` fois."""
+    spec = PARSER_SPECS[func]
+    header = [f"{spec['desc']} : en-tête {k}" for k in range(spec["skip"])]
+    if "header_line" in spec:
+        header[spec["header_line"]] = " ".join(tables[3].columns[1:])
+    return "\n".join(header + data_lines(func, tables) * scale)
+
+def document_text(tables, scale):
+    """Tous les groupes bout à bout, avec un pied de page ESMA toutes les FOOTER_EVERY lignes."""
+    lines = []
+    for func in mainfinal.group_starts():
+        lines += fixture_text(func, tables, scale).splitlines()
+    for k in range(len(lines) // FOOTER_EVERY, 0, -1):
+        lines.insert(k * FOOTER_EVERY, FOOTER.format(k))
+    return "\n".join(lines)
+
+def portfolio(rows, seed=0):
+    """Positions (colonnes de marketstress + Fund, WLABucket) et fonds synthétiques, tirés à graine fixe."""
+    rng = np.random.default_rng(seed)
+    n_funds = max(1, rows // POSITIONS_PER_FUND)
+    pick = lambda values: np.asarray(values, dtype=object)[rng.integers(0, len(values), rows)]
+    holdings = pd.DataFrame({
+        "Fund": pd.Series(rng.integers(0, n_funds, rows)).map("F{}".format),
+        "ISIN": np.arange(rows).astype(str),
+        "AssetType": pick(["Sovereign", "Non-financial", "Financial covered", "Financial", "ABS", "Deposit"]),
+        "Country": pick(["France", "Germany", "Italy", "Spain", "Netherlands", "Poland", "United States", "Japan"]),
+        "Rating": pick(["AAA", "AA+", "AA", "A-", "BBB", "BB+", "B", None]),
+        "Maturity": rng.uniform(0.0, 2.5, rows).round(4),
+        "Currency": pick(["EUR", "EUR", "USD", "GBP", "JPY", "CHF"]),
+        "MarketValue": rng.lognormal(12.0, 1.0, rows).round(2),
+        "WLABucket": pick([1.0, 2.0, np.nan, np.nan]).astype(float),
+    })
+    pro = rng.uniform(0.0, 1.0, n_funds)
+    funds = pd.DataFrame({"Fund": [f"F{k}" for k in range(n_funds)],
+                          "ProfessionalShare": pro, "RetailShare": 1.0 - pro})
+    return holdings, funds
@@ -0,0 +1,58 @@
+import json
+import os
+
+import pytest
+
+import batch
+import mainfinal
+import parsecache
+from fixtures import fixture_text, read_csv
+
+CSV_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "output")
+FUNCS = list(mainfinal.group_starts())
+# groupes collés en REUSE dans le document de 02/2025
+REUSED = {"parse_table_5", "parse_table_10", "parse_table_12_and_13"}
+
+def dump(tables, reuse=()):
+    """Texte collé des 12 groupes : bloc + END, ou REUSE."""
+    blocks = ["REUSE" if func in reuse else fixture_text(func, tables, 1) + "\nEND" for func in FUNCS]
+    return "\n".join(blocks) + "\n"
+
+@pytest.fixture
+def src(tmp_path):
+    # 01/2025 et 03/2025 diffèrent : un REUSE de 02/2025 doit prendre 01/2025
+    legacy = {i: read_csv(CSV_DIR, "", i) for i in range(1, 15)}
+    current = {i: read_csv(CSV_DIR, "022025", i) for i in range(1, 15)}
+    d = tmp_path / "src"
+    d.mkdir()
+    (d / "032025.txt").write_text(dump(current), encoding="utf-8")
+    (d / "022025.txt").write_text(dump(current, REUSED), encoding="utf-8")
+    (d / "012025.txt").write_text(dump(legacy), encoding="utf-8")
+    return str(d)
+
+def run(src, out, workers, monkeypatch):
+    monkeypatch.setattr(mainfinal, "OUTPUT_DIR", str(out))
+    monkeypatch.setattr(parsecache, "CACHE_DIR", str(out.parent / f"cache{workers}"))
+    os.makedirs(out)
+    results = batch.run_batch(src, workers)
+    assert [r["errors"] for r in results] == [[], [], []]
+    return {os.path.relpath(os.path.join(root, f), out): open(os.path.join(root, f), "rb").read()
+            for root, _, files in os.walk(out) for f in files}
+
+def test_reuse_parallel_matches_serial(src, tmp_path, monkeypatch):
+    serial = run(src, tmp_path / "serial", 1, monkeypatch)
+    parallel = run(src, tmp_path / "parallel", 3, monkeypatch)
+    assert serial == parallel
+    manifest = json.loads(serial[os.path.join("manifest", "022025.json")])
+    reused = {n: e for n, e in manifest.items() if e.get("reused")}
+    starts = mainfinal.group_starts()
+    nums = {str(n) for f in REUSED for n in range(starts[f][1], starts[f][1] + starts[f][0]["count"])}
+    assert set(reused) == nums
+    assert all(e["file"].startswith("012025") for e in reused.values())
+
+def test_latest_entry_ignores_later_vintages(tmp_path):
+    for prefix in ("012025", "032025", "122024"):
+        (tmp_path / f"{prefix}table5.csv").write_text("x\n", encoding="utf-8")
+    assert parsecache.latest_entry(str(tmp_path), 5, "022025")[0] == "012025"
+    assert parsecache.latest_entry(str(tmp_path), 5, "012025")[0] == "122024"
+    assert parsecache.latest_entry(str(tmp_path), 5, "122024") is None
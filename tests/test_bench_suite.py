@@ -0,0 +1,19 @@
+import pytest
+
+import bench_suite
+
+def results(**medians):
+    return {"cases": {name: {"best_s": m / 2, "median_s": m, "runs": 3} for name, m in medians.items()}}
+
+def test_regressions_compare_medians_above_floor():
+    base = results(**{"a@1x": 0.001, "b@1x": 0.100, "c@10x": 0.100})
+    new = results(**{"a@1x": 0.002, "b@1x": 0.120, "c@10x": 0.200, "d@1x": 9.0})
+    # a : x2 mais 1 ms (bruit) ; b : +20 % ; d : absent de la référence
+    assert [s[0] for s in bench_suite.regressions(new, base)] == ["c@10x"]
+
+def test_confirm_keeps_repeated_slowdowns():
+    base = results(**{"a@1x": 0.100, "b@10x": 0.100})
+    first = bench_suite.regressions(results(**{"a@1x": 0.200, "b@10x": 0.200}), base)
+    rerun = results(**{"a@1x": 0.101, "b@10x": 0.150})
+    assert bench_suite.confirm(first, rerun, base) == [("b@10x", 0.100, 0.150, pytest.approx(1.5))]
+    assert bench_suite.case_scale("b@10x") == 10
@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pytest
+
+import exactsum
+
+def fsums(codes, values, n):
+    return np.array([math.fsum(values[codes == k]) for k in range(n)])
+
+def chunked(codes, values, n, cuts):
+    acc = ([0] * n, np.zeros(n))
+    for part in np.split(np.arange(len(values)), cuts):
+        exactsum.merge(acc, exactsum.partial_sums(codes[part], values[part], n))
+    return exactsum.to_float(acc)
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(7)
+    n, rows = 5, 4000
+    codes = rng.integers(0, n, rows)
+    # exposants très dispersés et compensations : une somme flottante naïve dépend de l'ordre
+    values = rng.standard_normal(rows) * 10.0 ** rng.integers(-300, 300, rows)
+    values[:200] = 1e300
+    values[200:400] = -1e300
+    return codes, values, n
+
+def test_exact_and_independent_of_order_and_chunks(data):
+    codes, values, n = data
+    expected = fsums(codes, values, n)
+    assert np.array_equal(exactsum.fund_sums(codes, values, n), expected)
+    rng = np.random.default_rng(1)
+    for cuts in ([], [1], [17, 1000, 1001, 3999], sorted(rng.choice(len(values), 50, replace=False))):
+        order = rng.permutation(len(values))
+        assert np.array_equal(chunked(codes[order], values[order], n, cuts), expected)
+
+def test_merge_is_commutative(data):
+    codes, values, n = data
+    parts = [exactsum.partial_sums(codes[s], values[s], n) for s in np.array_split(np.arange(len(values)), 4)]
+    forward, backward = ([0] * n, np.zeros(n)), ([0] * n, np.zeros(n))
+    for p in parts:
+        exactsum.merge(forward, p)
+    for p in reversed(parts):
+        exactsum.merge(backward, p)
+    assert forward[0] == backward[0]
+    assert np.array_equal(exactsum.to_float(forward), exactsum.to_float(backward))
+
+def test_many_funds_sorted_path():
+    # beaucoup plus de cases (fonds x exposants) que de lignes : cumul par tri
+    rng = np.random.default_rng(3)
+    n = 50_000
+    codes = rng.integers(0, n, 3000)
+    values = rng.standard_normal(3000) * 10.0 ** rng.integers(-20, 20, 3000)
+    assert np.array_equal(exactsum.fund_sums(codes, values, n), fsums(codes, values, n))
+
+def test_subnormal_values():
+    tiny = 5e-324
+    codes = np.array([0, 0, 0, 1, 1])
+    values = np.array([tiny, 3 * tiny, -tiny, 2.0 ** -1022, -tiny])
+    got = exactsum.fund_sums(codes, values, 2)
+    assert got[0] == 3 * tiny
+    assert got[1] == 2.0 ** -1022 - tiny
+    # le plus petit sous-normal ne disparaît pas derrière une grande valeur compensée
+    assert exactsum.fund_sums(np.zeros(3, dtype=int), np.array([1e308, tiny, -1e308]), 1)[0] == tiny
+
+@pytest.mark.filterwarnings("ignore:invalid value:RuntimeWarning")
+def test_non_finite_values():
+    codes = np.array([0, 0, 1, 1, 2, 2, 3, 3])
+    values = np.array([np.nan, 1.0, np.inf, 1.0, np.inf, -np.inf, -np.inf, 1e308])
+    got = exactsum.fund_sums(codes, values, 4)
+    assert np.isnan(got[0]) and got[1] == np.inf and np.isnan(got[2]) and got[3] == -np.inf
+    # même résultat par blocs
+    for cuts in ([1], [3, 5], [7]):
+        assert np.array_equal(chunked(codes, values, 4, cuts), got, equal_nan=True)
+
+def test_no_intermediate_overflow():
+    # en flottant, 1,7e308 + 1,7e308 déborde (inf) ; la somme exacte est représentable
+    codes = np.zeros(3, dtype=int)
+    values = np.array([1.7e308, 1.7e308, -1.7e308])
+    assert exactsum.fund_sums(codes, values, 1)[0] == 1.7e308
+
+def test_negative_codes_and_empty():
+    got = exactsum.fund_sums(np.array([-1, 0, 2]), np.array([5.0, 1.5, 2.5]), 3)
+    assert got.tolist() == [1.5, 0.0, 2.5]
+    assert exactsum.fund_sums(np.zeros(0, dtype=int), np.zeros(0), 2).tolist() == [0.0, 0.0]
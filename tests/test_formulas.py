@@ -0,0 +1,73 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import formulas
+import parsecache
+
+CSV_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "output")
+
+@pytest.fixture
+def csv_dir(tmp_path, monkeypatch):
+    # 01/2025 (anciens table{i}.csv), 02/2025, et 03/2025 = 02/2025 avec une
+    # valeur modifiée et un pays retiré de la table 5
+    d = tmp_path / "output"
+    d.mkdir()
+    for i in range(1, 15):
+        shutil.copy(os.path.join(CSV_DIR, f"table{i}.csv"), d / f"012025table{i}.csv")
+        shutil.copy(os.path.join(CSV_DIR, f"022025table{i}.csv"), d / f"022025table{i}.csv")
+        shutil.copy(os.path.join(CSV_DIR, f"022025table{i}.csv"), d / f"032025table{i}.csv")
+    t5 = pd.read_csv(d / "032025table5.csv", dtype=str)
+    t5.loc[t5["Country"] == "Austria", "1Y"] = "99"
+    t5[t5["Country"] != "Belgium"].to_csv(d / "032025table5.csv", index=False)
+    monkeypatch.setattr(parsecache, "CACHE_DIR", str(tmp_path / "cache"))
+    return str(d)
+
+def pair(comparison, a, b):
+    part = comparison[(comparison["From"] == a) & (comparison["To"] == b)]
+    return part.reset_index(drop=True)
+
+def test_pair_result_does_not_depend_on_other_dates(csv_dir, tmp_path, monkeypatch):
+    three = formulas.compare_vintages(csv_dir, ["03/2025", "01/2025", "02/2025"])
+    assert list(dict.fromkeys(zip(three["From"], three["To"]))) == [
+        ("01/2025", "02/2025"), ("01/2025", "03/2025"), ("02/2025", "03/2025")]
+    monkeypatch.setattr(parsecache, "CACHE_DIR", str(tmp_path / "other_cache"))
+    alone = formulas.compare_vintages(csv_dir, ["02/2025", "03/2025"])
+    pd.testing.assert_frame_equal(pair(three, "02/2025", "03/2025"), alone)
+    changed = alone[alone["Delta"].fillna(0) != 0]
+    austria = changed[(changed["Table_ID"] == 5) & (changed["Line_Description"] == "Austria")]
+    assert austria["Value_to"].tolist() == [99.0]
+    belgium = alone[(alone["Table_ID"] == 5) & (alone["Line_Description"] == "Belgium")]
+    assert belgium["Value_to"].isna().all() and belgium["Value_from"].notna().all()
+
+def test_only_missing_pairs_are_computed(csv_dir, monkeypatch):
+    first = formulas.compare_vintages(csv_dir, ["01/2025", "02/2025"])
+    loaded = []
+    param_matrix = formulas.param_matrix
+    def spy(csv_dir, dates, prefixes=None):
+        loaded.append(list(dates))
+        return param_matrix(csv_dir, dates, prefixes)
+    monkeypatch.setattr(formulas, "param_matrix", spy)
+    again = formulas.compare_vintages(csv_dir, ["01/2025", "02/2025"])
+    assert loaded == []
+    pd.testing.assert_frame_equal(first, again)
+    formulas.compare_vintages(csv_dir, ["01/2025", "02/2025", "03/2025"])
+    # (01, 02) en cache : seules (01, 03) et (02, 03) sont calculées
+    assert loaded == [["01/2025", "02/2025", "03/2025"]]
+    formulas.compare_vintages(csv_dir, ["02/2025", "03/2025"])
+    assert len(loaded) == 1
+
+def test_cache_follows_csv_changes(csv_dir):
+    before = formulas.compare_vintages(csv_dir, ["02/2025", "03/2025"])
+    path = os.path.join(csv_dir, "032025table5.csv")
+    t5 = pd.read_csv(path, dtype=str)
+    t5.loc[t5["Country"] == "Austria", "1Y"] = "77"
+    t5.to_csv(path, index=False)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    after = formulas.compare_vintages(csv_dir, ["02/2025", "03/2025"])
+    row = lambda c: c[(c["Table_ID"] == 5) & (c["Line_Description"] == "Austria") & (c["Column_Description"] == "1Y")]
+    assert row(before)["Value_to"].tolist() == [99.0]
+    assert row(after)["Value_to"].tolist() == [77.0]
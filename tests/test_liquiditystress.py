@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from liquiditystress import BELOW_BBB, discount_factors, sale_fraction, stress_liquidity
+from maturitygrid import MaturityGrid
+
+# Paramètres réduits, résultats attendus calculés à la main :
+#   sorties : NAV x (part pro x taux pro + part retail x taux retail)
+#   coût    : somme(VM x décote) x min(sorties / NAV, 1)
+#   WLA     : bucket 1 x 100 % + bucket 2 x 85 %, couverture = WLA / sorties
+RATINGS = ["AAA", "AA", "A", "BBB", BELOW_BBB]
+
+def params():
+    return {
+        # table 1 : pays de référence (codes), table 2 / 3 : notes
+        "ldf_country": MaturityGrid(["DE", "FR"], [0.25, 1.0], [[1, 2], [3, 5]]),
+        "ldf_sov": MaturityGrid(RATINGS, [0.25, 1.0], [[1, 1], [2, 4], [3, 3], [4, 4], [10, 20]]),
+        "ldf_corp": MaturityGrid(RATINGS, [0.25, 1.0], [[5, 5], [6, 6], [7, 9], [8, 8], [15, 25]]),
+        "wla_factors": np.array([1.0, 0.85]),
+        "outflow": {"Professional investor": 0.25, "Retail investor": 0.10},
+        "outflow_macro": {"Professional investor": 0.50, "Retail investor": 0.20},
+    }
+
+HOLDINGS = pd.DataFrame({
+    "Fund": ["A", "A", "A", "A", "B", "B", "B", "B", "C"],
+    "AssetType": ["Sovereign", "Sovereign", "Financial", "Deposit",
+                  "Sovereign", "ABS", "Sovereign", "Non-financial", "Sovereign"],
+    "Country": ["France", "Italy", "France", "France", "Germany", "France", "Narnia", "Spain", "France"],
+    "Rating": ["AA+", "A-", "BBB+", "AAA", "AAA", "NR", None, "A", "AAA"],
+    "Maturity": [1.0, 0.25, 0.625, 0.5, 0.625, 1.0, 0.25, 0.625, 2.0],
+    "MarketValue": [1e6, 2e6, 1e6, 1e6, 4e6, 1e6, 1e6, 1e6, 1e6],
+    "WLABucket": [1, 2, None, 1, None, None, 2, None, 1],
+})
+
+FUNDS = pd.DataFrame({"Fund": ["A", "B"], "ProfessionalShare": [0.6, 0.2], "RetailShare": [0.4, 0.8],
+                      "NAV": [np.nan, 8e6]})
+
+def test_discount_factors():
+    expected = [
+        5.0,    # France -> FR (table 1), 1 an
+        3.0,    # Italie hors table 1 -> table 2, A- -> A
+        8.0,    # Financial BBB+ -> BBB (table 3)
+        0.0,    # dépôt : pas de décote
+        1.5,    # Germany -> DE, 1 + (2 - 1) x 0,375 / 0,75
+        25.0,   # ABS NR -> sous BBB, 1 an
+        10.0,   # pays inconnu, sans note -> table 2 sous BBB, 3 mois
+        8.0,    # Non-financial A, 7 + (9 - 7) x 0,375 / 0,75
+        5.0,    # FR au-delà de 1 an : extrapolation plate
+    ]
+    np.testing.assert_allclose(discount_factors(HOLDINGS, params()) * 100, expected)
+
+def test_fund_results():
+    out = stress_liquidity(HOLDINGS, FUNDS, params())
+    assert list(out.index) == ["A", "B", "C"]
+    # A : NAV = somme des VM ; B : NAV du tableau des fonds ; C : absent du tableau -> sans sorties
+    np.testing.assert_allclose(out["NAV"], [5e6, 8e6, 1e6])
+    np.testing.assert_allclose(out["outflow"], [5e6 * (0.6 * 0.25 + 0.4 * 0.10), 8e6 * (0.2 * 0.25 + 0.8 * 0.10), 0.0])
+    np.testing.assert_allclose(out["outflow_macro"], [5e6 * (0.6 * 0.5 + 0.4 * 0.2), 8e6 * (0.2 * 0.5 + 0.8 * 0.2), 0.0])
+    # vente au prorata : 19 % de A (décotes 50 000 + 60 000 + 80 000), 13 % de B (60 000 + 250 000 + 100 000 + 80 000)
+    np.testing.assert_allclose(out["liquidity_cost"], [190_000 * 0.19, 490_000 * 0.13, 0.0])
+    np.testing.assert_allclose(out["liquidity_cost_pct"], [36_100 / 5e6 * 100, 63_700 / 8e6 * 100, 0.0])
+    np.testing.assert_allclose(out["wla"], [1e6 + 2e6 * 0.85 + 1e6, 1e6 * 0.85, 1e6])
+    assert out["wla_coverage_pct"]["A"] == pytest.approx(3.7e6 / 950_000 * 100)
+    assert out["wla_coverage_pct"]["B"] == pytest.approx(850_000 / 1.04e6 * 100)
+    assert out["wla_coverage_pct"]["C"] == np.inf
+
+def test_sale_fraction_capped():
+    np.testing.assert_allclose(sale_fraction(np.array([50.0, 150.0, 10.0]), np.array([100.0, 100.0, 0.0])),
+                               [0.5, 1.0, 0.0])
+    # scénarios x fonds
+    np.testing.assert_allclose(sale_fraction(np.array([[50.0, 300.0], [250.0, 20.0]]), np.array([100.0, 200.0])),
+                               [[0.5, 1.0], [1.0, 0.1]])
+
+def test_cost_capped_at_full_sale():
+    p = params()
+    p["outflow"] = {"Professional investor": 1.5, "Retail investor": 1.5}
+    out = stress_liquidity(HOLDINGS, FUNDS, p)
+    np.testing.assert_allclose(out["liquidity_cost"][:2], [190_000, 490_000])
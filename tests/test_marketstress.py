@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketstress import fund_summary, fx_changes, stress_market
+from maturitygrid import MaturityGrid
+
+# Paramètres réduits, pertes attendues calculées à la main :
+#   spread / taux : VM x choc (pb) / 10 000 x maturité ; change : VM x r / (1 + r)
+RATINGS = ["AAA", "AA", "A", "BBB", "BB", "B", "≤CCC"]
+
+def params():
+    corp = np.arange(len(RATINGS) * 4, dtype=float).reshape(len(RATINGS), 4) * 10 + 100
+    return {
+        # table 5 : pays puis lignes de zone (pays = zone)
+        "gov": MaturityGrid(["France", "Poland", "Emerging markets"], [0.25, 1.0],
+                            [[10, 30], [40, 80], [300, 500]]),
+        "gov_area": {"France": "EU", "Poland": "EU", "Emerging markets": "Emerging markets"},
+        # table 6 : BBB x Financial = 100 + (3 x 4 + 2) x 10 = 240 ; ≤CCC x ABS = 100 + (6 x 4 + 3) x 10 = 370
+        "corp": (pd.Index(RATINGS), corp),
+        # tables 8 puis 9
+        "ir": MaturityGrid(["Euro area", "United States", "EU", "Other advanced economies", "Other emerging markets"],
+                           [0.25, 1.0], [[50, 100], [20, 20], [60, 120], [30, 30], [100, 300]]),
+        "fx_up": fx_changes(pd.DataFrame({"ExchangeRateName": ["EURUSD", "USDPLN", "GBPUSD", "EURJPY"],
+                                          "Shock": [10.0, 5.0, 20.0, np.nan]})),
+        "fx_down": {"EUR": 0.0, "USD": -0.2},
+    }
+
+HOLDINGS = pd.DataFrame({
+    "Fund": ["A", "A", "B", "B", "B", "B"],
+    "ISIN": ["FR", "PL", "XS1", "XS2", "DEP", "ATL"],
+    "AssetType": ["Sovereign", "Sovereign", "Financial", "ABS", "Deposit", "Sovereign"],
+    "Country": ["France", "Poland", "Narnia", "United States", "Atlantis", "Atlantis"],
+    "Rating": ["AA+", "A", "BBB-", "NR", None, "B"],
+    "Maturity": [1.0, 0.25, 0.625, 2.0, 0.5, 0.25],
+    "Currency": ["EUR", "PLN", "USD", "GBP", "JPY", "EUR"],
+    "MarketValue": [1e6, 2e6, 1e6, 1e6, 5e5, 1e6],
+})
+
+def test_fx_changes_cross_via_eurusd():
+    fx = params()["fx_up"]
+    assert fx["EUR"] == 0.0
+    assert fx["USD"] == pytest.approx(0.10)
+    # USDxxx : (1 + EURUSD) x (1 + USDxxx) - 1
+    assert fx["PLN"] == pytest.approx(1.10 * 1.05 - 1)
+    # xxxUSD : (1 + EURUSD) / (1 + xxxUSD) - 1
+    assert fx["GBP"] == pytest.approx(1.10 / 1.20 - 1)
+    # choc manquant : devise absente (pas de perte)
+    assert "JPY" not in fx
+
+def test_spread_losses():
+    out = stress_market(HOLDINGS, params())
+    expected = [
+        1e6 * 30 / 1e4 * 1.0,      # France, 1 an
+        2e6 * 40 / 1e4 * 0.25,     # Pologne, 3 mois
+        1e6 * 240 / 1e4 * 0.625,   # BBB- -> BBB, Financial
+        1e6 * 370 / 1e4 * 2.0,     # NR -> ≤CCC, ABS (extrapolation plate au-delà de 1 an)
+        0.0,                       # dépôt : pas de choc de spread
+        1e6 * 300 / 1e4 * 0.25,    # pays inconnu -> "Emerging markets"
+    ]
+    assert out["loss_spread"].tolist() == pytest.approx(expected)
+
+def test_ir_losses():
+    out = stress_market(HOLDINGS, params())
+    expected = [
+        1e6 * 100 / 1e4 * 1.0,     # zone euro -> "Euro area"
+        2e6 * 60 / 1e4 * 0.25,     # Pologne : absente de la table 8, zone EU (table 9)
+        1e6 * 200 / 1e4 * 0.625,   # hors table 5 -> "Other emerging markets", 100 + 200 x 0.375 / 0.75
+        1e6 * 20 / 1e4 * 2.0,      # pays de la table 8
+        5e5 * (100 + 200 * 0.25 / 0.75) / 1e4 * 0.5,  # pays inconnu -> "Other emerging markets"
+        1e6 * 100 / 1e4 * 0.25,
+    ]
+    assert out["loss_ir"].tolist() == pytest.approx(expected)
+
+def test_fx_losses():
+    out = stress_market(HOLDINGS, params())
+    r = {"EUR": 0.0, "PLN": 1.10 * 1.05 - 1, "USD": 0.10, "GBP": 1.10 / 1.20 - 1, "JPY": 0.0}
+    expected = [mv * r[c] / (1 + r[c]) for mv, c in zip(HOLDINGS["MarketValue"], HOLDINGS["Currency"])]
+    assert out["loss_fx_up"].tolist() == pytest.approx(expected)
+    # appréciation du dollar seulement
+    assert out["loss_fx_down"].tolist() == pytest.approx([0, 0, 1e6 * -0.2 / 0.8, 0, 0, 0])
+
+def test_fund_summary():
+    total = fund_summary(stress_market(HOLDINGS, params()))
+    assert total.index.tolist() == ["A", "B"]
+    assert total.loc["A", "MarketValue"] == 3e6
+    assert total.loc["A", "loss_spread"] == pytest.approx(3000 + 2000)
+    assert total.loc["A", "pct_spread"] == pytest.approx(5000 / 3e6 * 100)
@@ -0,0 +1,46 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import maturitygrid
+import paramset
+
+CSV_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "output")
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    for i in range(1, 15):
+        shutil.copy(os.path.join(CSV_DIR, f"022025table{i}.csv"), tmp_path)
+    return str(tmp_path)
+
+def set_austria_1y(csv_dir, value):
+    path = os.path.join(csv_dir, "022025table5.csv")
+    t5 = pd.read_csv(path, dtype=str)
+    t5.loc[t5["Country"] == "Austria", "1Y"] = value
+    t5.to_csv(path, index=False)
+
+def test_cached_instance_until_reload(csv_dir):
+    ps = paramset.parameter_set("02/2025", csv_dir)
+    assert paramset.parameter_set("02/2025", csv_dir) is ps
+    before = ps.credit_spread("Austria", "1Y")
+    set_austria_1y(csv_dir, "123")
+    # pas de relecture implicite des CSV
+    assert paramset.parameter_set("02/2025", csv_dir) is ps
+    fresh = paramset.parameter_set("02/2025", csv_dir, reload=True)
+    assert fresh is not ps and fresh.credit_spread("Austria", "1Y") == 123.0 != before
+    assert paramset.parameter_set("02/2025", csv_dir) is fresh
+
+def test_grids_cached_until_reload(csv_dir):
+    grids = maturitygrid.maturity_grids(csv_dir, "02/2025")
+    assert maturitygrid.maturity_grids(csv_dir, "02/2025") is grids
+    set_austria_1y(csv_dir, "321")
+    assert maturitygrid.maturity_grids(csv_dir, "02/2025") is grids
+    fresh = maturitygrid.maturity_grids(csv_dir, "02/2025", reload=True)
+    assert fresh[5](["Austria"], [1.0])[0] == 321.0
+
+def test_missing_vintage_is_not_cached(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        paramset.parameter_set("03/2025", str(tmp_path))
+    assert (os.path.abspath(str(tmp_path)), "032025") not in paramset._SETS
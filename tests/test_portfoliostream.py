@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+import pytest
+
+import portfoliostream
+from fixtures import portfolio
+from liquiditystress import liquidity_params, stress_liquidity
+from marketstress import fund_summary, market_params, stress_market
+
+CSV_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "output")
+DATE = "02/2025"
+
+@pytest.fixture(scope="module")
+def params():
+    return market_params(CSV_DIR, DATE), liquidity_params(CSV_DIR, DATE)
+
+@pytest.fixture(scope="module")
+def positions(tmp_path_factory):
+    holdings, funds = portfolio(300, seed=5)
+    path = tmp_path_factory.mktemp("stream") / "positions.csv"
+    holdings.to_csv(path, index=False, encoding="utf-8")
+    # référence en mémoire sur le fichier relu, mêmes types que les blocs
+    return str(path), pd.read_csv(path, dtype=portfoliostream.TEXT_COLUMNS), funds
+
+@pytest.mark.parametrize("chunk_rows,workers", [(1, 1), (7, 1), (64, 2), (10_000, 1)])
+def test_stream_matches_in_memory(positions, params, chunk_rows, workers):
+    path, holdings, funds = positions
+    market, liquidity = params
+    names, sums, rows = portfoliostream.stream_portfolio(path, market, liquidity, chunk_rows, workers)
+    assert rows == len(holdings)
+    assert names == list(pd.unique(holdings["Fund"]))
+    pd.testing.assert_frame_equal(portfoliostream.market_summary(names, sums),
+                                  fund_summary(stress_market(holdings, market)), check_exact=True)
+    pd.testing.assert_frame_equal(portfoliostream.liquidity_summary(names, sums, funds, liquidity),
+                                  stress_liquidity(holdings, funds, liquidity), check_exact=True)
+
+def test_chunk_ranges_cover_file(positions):
+    path = positions[0]
+    size = os.path.getsize(path)
+    for rows in (1, 7, 299, 300, 301):
+        ranges = portfoliostream.chunk_ranges(path, rows)
+        assert ranges[-1][1] == size
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        assert len(ranges) == -(-300 // rows)
@@ -0,0 +1,44 @@
+import numpy as np
+
+import reversestress
+
+def bucket(value):
+    return {"value": np.array([value]), "key": np.array([0]), "fund": np.array([0]),
+            "present": np.array([0]), "starts": np.array([0])}
+
+def book(fx_rate):
+    # un fonds de NAV 100 : spread souverain 1 par unité de k, 50 en devise
+    return {
+        "funds": np.array(["F1"], dtype=object),
+        "spread_gov": bucket(1.0),
+        "fx": bucket(50.0),
+        "fx_up": np.array([fx_rate]),
+        "fx_down": np.array([0.0]),
+        "nav": np.array([100.0]),
+        "outflow": np.zeros(1),
+        "ldf_value": np.zeros(1),
+        "wla": np.zeros(1),
+    }
+
+def loss(k, rate=-0.01):
+    x = rate * k
+    return k + 50.0 * x / (1.0 + x)
+
+def test_linear_breach():
+    r = reversestress.solve(book(0.0), [5, 10], "loss", 2.0)
+    assert abs(r["multiplier"][0] - 2.0) <= reversestress.TOLERANCE
+    assert not r["breach_at_esma"][0]
+
+def test_negative_fx_rate_breach_between_doublings():
+    # perte k - 0,5 k / (1 - 0,01 k) : monte jusqu'à ~8,58 % vers k = 29,3 puis
+    # redescend ; >= 8,5 % seulement sur ~[27, 31,6], entre deux doublements (16, 32)
+    assert loss(16) < 8.5 and loss(32) < 8.5
+    r = reversestress.solve(book(-0.01), [5, 10], "loss", 8.5)
+    k = r["multiplier"][0]
+    assert 26 < k < 28
+    assert loss(k) >= 8.5 > loss(k - 2 * reversestress.TOLERANCE)
+    assert r["loss_pct"][0] >= 8.5
+
+def test_no_breach_is_nan():
+    r = reversestress.solve(book(-0.01), [5, 10], "loss", 9.0)
+    assert np.isnan(r["multiplier"][0])
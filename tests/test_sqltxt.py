@@ -0,0 +1,33 @@
+import os
+
+import pandas as pd
+import pytest
+
+import sqltxt
+
+CSV_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "output")
+TEXTS = ["1", "-1", "+1", " 1", "1 ", "\t1\n", "1.", ".5", "-.5", "+.5e-3", "1e5", "1E-5", "1e+5", "1.e5",
+         ".e5", "e5", "1e", "1e5.0", "1_000", "١٢", "1,5", "0x10", "--1", "1.2.3", "5%", "", " ", "-",
+         "nan", "NaN"]
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_is_number_matches_to_numeric(text):
+    assert sqltxt.is_number(text) == bool(pd.to_numeric(pd.Series([text], dtype=object), errors="coerce").notna()[0])
+
+@pytest.mark.parametrize("text", ["inf", "-Infinity", "INF"])
+def test_infinite_values_are_not_parameters(text):
+    assert not sqltxt.is_number(text)
+
+@pytest.mark.parametrize("prefix", ["022025", ""])
+def test_sql_text_and_long_form_keep_the_same_rows(prefix):
+    tables = sqltxt.load_tables(CSV_DIR, prefix)
+    fx = tables[10].copy()
+    fx.loc[len(fx)] = ["EURXXX", "1_000"]
+    fx.loc[len(fx)] = ["EURYYY", "١٢"]
+    tables[10] = fx
+    for i, df in tables.items():
+        sql = sqltxt.rows_sql(i, list(df.columns), df.to_numpy(dtype=object).tolist()).splitlines()
+        long = sqltxt.to_long(i, df)
+        assert len(sql) == len(long)
+        assert all(f"','{line}','{column}'," in s for s, line, column in zip(sql, long["line"], long["column"]))
+    assert "EURXXX" not in set(sqltxt.to_long(10, tables[10])["line"])
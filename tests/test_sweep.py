@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pytest
+
+import sweep
+from fixtures import portfolio
+from liquiditystress import liquidity_params, stress_liquidity
+from marketstress import fund_summary, market_params, stress_market
+
+CSV_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "output")
+DATE = "02/2025"
+
+@pytest.fixture(scope="module")
+def setup():
+    holdings, funds = portfolio(300, seed=7)
+    market, liquidity = market_params(CSV_DIR, DATE), liquidity_params(CSV_DIR, DATE)
+    book = sweep.build_book(holdings, funds, market, liquidity)
+    return holdings, funds, market, liquidity, book
+
+def one(book, **grid):
+    """Résultats (par fonds) d'un seul scénario de la grille."""
+    scales, results = sweep.run_sweep(book, scenarios=sweep.grid_scenarios({k: [v] for k, v in grid.items()}))
+    assert len(scales) == 1
+    return {m: r[0] for m, r in results.items()}
+
+def test_unit_scale_matches_esma_stress(setup):
+    holdings, funds, market, liquidity, book = setup
+    res = one(book)
+    names = list(book["funds"])
+    summary = fund_summary(stress_market(holdings, market)).reindex(names)
+    for m in ("loss_spread", "loss_ir", "loss_fx_up", "loss_fx_down"):
+        np.testing.assert_allclose(res[m], summary[m], rtol=1e-12)
+    liq = stress_liquidity(holdings, funds, liquidity).reindex(names)
+    for m in ("outflow", "outflow_macro", "liquidity_cost"):
+        np.testing.assert_allclose(res[m], liq[m], rtol=1e-12)
+
+def test_factor_scales_only_its_metric(setup):
+    book = setup[-1]
+    base = one(book)
+    expected = {
+        "spread_gov": ["loss_spread"],
+        "spread_corp": ["loss_spread"],
+        "ir": ["loss_ir"],
+        "fx": ["loss_fx_up", "loss_fx_down"],
+        "outflow": ["outflow", "outflow_macro", "liquidity_cost"],
+    }
+    scaled = {}
+    for factor, moved in expected.items():
+        scaled[factor] = res = one(book, **{factor: 2.0})
+        for m in sweep.METRICS:
+            if m in moved:
+                assert not np.allclose(res[m], base[m]), (factor, m)
+            else:
+                np.testing.assert_array_equal(res[m], base[m], err_msg=f"{factor} -> {m}")
+    # linéaires : x2 sur le groupe
+    np.testing.assert_allclose(scaled["spread_gov"]["loss_spread"] + scaled["spread_corp"]["loss_spread"],
+                               3 * base["loss_spread"], rtol=1e-12)
+    np.testing.assert_allclose(scaled["ir"]["loss_ir"], 2 * base["loss_ir"], rtol=1e-12)
+    for m in ("outflow", "outflow_macro"):
+        np.testing.assert_allclose(scaled["outflow"][m], 2 * base[m], rtol=1e-12)
+    # coût de liquidité : vente au prorata plafonnée à la NAV
+    frac = np.minimum(2 * base["outflow"] / book["nav"], 1.0)
+    np.testing.assert_allclose(scaled["outflow"]["liquidity_cost"], book["ldf_value"] * frac, rtol=1e-12)
+
+def test_monte_carlo_independent_of_workers(setup, monkeypatch):
+    book = setup[-1]
+    sigma = {f: 0.3 for f in sweep.FACTORS}
+    # blocs de 16 scénarios : plusieurs blocs, donc plusieurs graines
+    monkeypatch.setattr(sweep, "CHUNK_BYTES", 16 * 10 * 8 * sweep.n_buckets(book))
+    assert sweep.chunk_size(sweep.n_buckets(book)) == 16
+    runs = [sweep.run_sweep(book, draws=100, sigma=sigma, idio=0.1, seed=3, workers=w) for w in (1, 3)]
+    (s1, r1), (s3, r3) = runs
+    assert s1.shape == (100, len(sweep.FACTORS))
+    np.testing.assert_array_equal(s1, s3)
+    for m in sweep.METRICS:
+        np.testing.assert_array_equal(r1[m], r3[m])
+    other = sweep.run_sweep(book, draws=100, sigma=sigma, idio=0.1, seed=4)[0]
+    assert not np.array_equal(s1, other)
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pytest
+
+import mainfinal
+import tablespec
+from fixtures import FOOTER, fixture_text, read_csv
+from sqltxt import typed
+
+# Textes "collés" reconstruits depuis les CSV produits par les anciens
+# parseurs (data/output, 02/2025 et anciens table{i}.csv de 01/2025) : le
+# moteur de specs doit redonner ces CSV à l'identique.
+CSV_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "output")
+PREFIXES = ["022025", ""]
+GROUPS = list(mainfinal.group_starts().items())
+
+@pytest.fixture(scope="module", params=PREFIXES, ids=["022025", "legacy"])
+def tables(request):
+    return {i: read_csv(CSV_DIR, request.param, i) for i in range(1, 15)}
+
+def expected(tables, start, count):
+    return [tables[i] for i in range(start, start + count)]
+
+def as_frames(result):
+    return result if isinstance(result, tuple) else (result,)
+
+def check(func, text, frames):
+    got = tablespec.parse_rows(func, text)
+    assert len(got) == len(frames)
+    for (cols, rows), df in zip(got, frames):
+        assert cols == list(df.columns)
+        assert [list(map(str, r)) for r in rows] == df.values.tolist()
+
+@pytest.mark.parametrize("func,group", GROUPS, ids=[f for f, _ in GROUPS])
+def test_fixture_round_trip(tables, func, group):
+    group, start = group
+    check(func, fixture_text(func, tables, 1), expected(tables, start, group["count"]))
+
+@pytest.mark.parametrize("func,group", GROUPS, ids=[f for f, _ in GROUPS])
+def test_shuffled_rows_with_footers(tables, func, group):
+    group, start = group
+    rng = np.random.default_rng(start)
+    # mêmes lignes, ordre tiré au hasard, dupliquées ; tables côte à côte : même ordre
+    order = rng.permutation(np.repeat(np.arange(len(tables[start])), 2))
+    shuffled = dict(tables)
+    for i in range(start, start + group["count"]):
+        if func == "parse_table_12_and_13":
+            o = rng.permutation(np.repeat(np.arange(len(tables[i])), 2))
+        else:
+            o = order
+        shuffled[i] = tables[i].iloc[o].reset_index(drop=True)
+    lines = fixture_text(func, shuffled, 1).splitlines()
+    # pied de page ESMA au milieu du texte : retiré par clean_pdf_text
+    spec = tablespec.PARSER_SPECS[func]
+    lines[spec["skip"]] += " " + FOOTER.format(7)
+    check(func, "\n".join(lines), expected(shuffled, start, group["count"]))
+
+@pytest.mark.parametrize("func,group", GROUPS, ids=[f for f, _ in GROUPS])
+def test_typed_matches_sqltxt(tables, func, group):
+    group, start = group
+    frames = as_frames(tablespec.parse(func, fixture_text(func, tables, 1), typed=True))
+    for i, df in zip(range(start, start + group["count"]), frames):
+        assert df.equals(typed(i, tables[i]))
+
+def test_unexpected_table3_header():
+    assert tablespec.parse_rows("parse_table_3", "titre\nRating A B\nAAA 1 2") == [([], [])]
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+import vintagediff
+from dbload import BATCH_SIZE
+
+def frame(n, value):
+    return pd.DataFrame({"Table_ID": 5, "Table_Description": "Spreads", "Line_Description": [f"C{k}" for k in range(n)],
+                         "Column_Description": "1Y", "Value": value})
+
+def test_delta_sql_batches_and_checks_old_values():
+    n = 2 * BATCH_SIZE + 500
+    old = frame(n, np.arange(n, dtype=float))
+    new = frame(n, np.arange(n, dtype=float) + 1.0).iloc[1:]
+    new.loc[new.index[:2], "Value"] = np.nan
+    old.loc[old.index[5], "Line_Description"] = "O'Hare"
+    diff = vintagediff.diff_params(old, new)
+    sql = vintagediff.delta_sql(diff, "202501", "202502")
+    # une instruction par lot de BATCH_SIZE lignes au plus
+    assert sql.count("INSERT INTO @old VALUES") == 3
+    assert sql.count("MERGE dbo.ST_MMF_Parameters") == 3
+    assert sql.count("DELETE t FROM") == 1
+    # valeurs attendues de l'ancienne date, y compris celles que le diff ne touche pas
+    assert "(5, N'C1', N'1Y', 1.0)" in sql and "(5, N'O''Hare', N'1Y', 5.0)" in sql
+    assert f"WHERE Vintage = 202501) <> {n}" in sql
+    assert "N'C1', N'1Y', NULL)" in sql
+    assert sql.index("THROW") < sql.index("BEGIN TRANSACTION") < sql.index("MERGE")
+    assert sql.rstrip().endswith("COMMIT;")
@@ -0,0 +1,166 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from dbload import ALL_COLS, BATCH_SIZE, TABLE_NAME, parameter_rows
+from sqltxt import check_date, load_tables
+
+# ---------------------------------------------------------------------
+# Différentiel entre deux dates : seules les lignes modifiées sont émises
+# ---------------------------------------------------------------------
+# Comparaison des paramètres (forme longue de dbload) sur la clé
+# (Table_ID, Line_Description, Column_Description), par une jointure
+# externe vectorisée. Statuts : inserted, updated, deleted, unchanged.
+# Le script SQL vérifie que l'ancienne date est chargée à l'identique de
+# ses CSV (même nombre de lignes, mêmes clés et valeurs que la liste
+# attendue, sinon erreur : chargement complet requis), reconstruit côté
+# serveur la nouvelle date depuis l'ancienne, puis n'envoie que les lignes
+# insérées/modifiées (MERGE) et disparues (DELETE), par lots de BATCH_SIZE
+# lignes dans une seule instruction VALUES multi-lignes.
+DIFF_KEY = ["Table_ID", "Line_Description", "Column_Description"]
+STATUSES = ["inserted", "updated", "deleted", "unchanged"]
+
+def param_frame(tables, yyyymm):
+    rows = parameter_rows(tables, yyyymm)
+    return pd.DataFrame(rows, columns=ALL_COLS).drop(columns="Vintage")
+
+def diff_params(old, new):
+    """
+    Jointure externe sur DIFF_KEY : colonnes old_Value, new_Value, status.
+    Deux valeurs vides (NULL) sont égales.
+    """
+    m = new.merge(old, on=DIFF_KEY, how="outer", suffixes=("", "_old"), indicator=True, sort=False)
+    m["Table_Description"] = m["Table_Description"].fillna(m["Table_Description_old"])
+    o = m["Value_old"].to_numpy(dtype=float)
+    n = m["Value"].to_numpy(dtype=float)
+    same = (o == n) | (np.isnan(o) & np.isnan(n))
+    side = m["_merge"].to_numpy()
+    m["status"] = np.select([side == "right_only", side == "left_only", same],
+                            ["deleted", "inserted", "unchanged"], "updated")
+    return pd.DataFrame({
+        "Table_ID": m["Table_ID"].astype(int),
+        "Table_Description": m["Table_Description"],
+        "Line_Description": m["Line_Description"],
+        "Column_Description": m["Column_Description"],
+        "old_Value": o,
+        "new_Value": n,
+        "status": m["status"],
+    })
+
+def sql_literal(values):
+    """Littéraux SQL (chaînes entre quotes, NULL pour NaN) d'un tableau."""
+    v = pd.Series(values)
+    if v.dtype.kind == "f":
+        return np.where(v.isna(), "NULL", v.map(repr)).astype(object)
+    return ("N'" + v.astype(str).str.replace("'", "''", regex=False) + "'").to_numpy(dtype=object)
+
+def values_batches(frame, columns):
+    """Lignes "(v1, v2, ...)" des colonnes de `frame` (littéraux SQL), par lots de BATCH_SIZE."""
+    if not len(frame):
+        return []
+    cells = [frame[c].astype(int).astype(str).to_numpy(dtype=object) if c == "Table_ID" else sql_literal(frame[c])
+             for c in columns]
+    rows = cells[0]
+    for c in cells[1:]:
+        rows = rows + ", " + c
+    rows = ("(" + rows + ")").tolist()
+    return [",\n        ".join(rows[k:k + BATCH_SIZE]) for k in range(0, len(rows), BATCH_SIZE)]
+
+def delta_sql(diff, old_yyyymm, new_yyyymm):
+    """
+    Script SQL Server : contrôle de l'ancienne date (clés et valeurs),
+    recopie serveur, MERGE des lignes changées et DELETE des disparues par
+    lots de BATCH_SIZE lignes.
+    """
+    t = f"dbo.{TABLE_NAME}"
+    cols = ", ".join(ALL_COLS)
+    key = ("t.Table_ID = s.Table_ID AND t.Line_Description = s.Line_Description"
+           " AND t.Column_Description = s.Column_Description")
+    old = diff[diff["status"] != "inserted"].rename(columns={"old_Value": "Value"})
+    out = [
+        f"-- Différentiel {old_yyyymm} -> {new_yyyymm}\n",
+        "SET XACT_ABORT ON;\n",
+        "DECLARE @old TABLE (Table_ID INT NOT NULL, Line_Description NVARCHAR(255) NOT NULL,"
+        " Column_Description NVARCHAR(100) NOT NULL, Value FLOAT NULL);\n",
+    ]
+    for batch in values_batches(old, ["Table_ID", "Line_Description", "Column_Description", "Value"]):
+        out.append(f"INSERT INTO @old VALUES\n        {batch};\n")
+    out += [
+        f"IF (SELECT COUNT(*) FROM {t} WHERE Vintage = {old_yyyymm}) <> {len(old)}\n",
+        f"    OR EXISTS (SELECT 1 FROM @old AS s LEFT JOIN {t} AS t ON t.Vintage = {old_yyyymm} AND {key}\n",
+        "               WHERE t.Vintage IS NULL OR t.Value <> s.Value\n",
+        "                  OR (t.Value IS NULL AND s.Value IS NOT NULL) OR (t.Value IS NOT NULL AND s.Value IS NULL))\n",
+        f"    THROW 50000, N'Vintage {old_yyyymm} absente ou différente de ses CSV ({len(old)} lignes attendues) :"
+        f" chargement complet de {new_yyyymm} requis', 1;\n",
+        "BEGIN TRANSACTION;\n",
+        f"DELETE FROM {t} WHERE Vintage = {new_yyyymm};\n",
+        f"INSERT INTO {t} ({cols})\n",
+        f"    SELECT {new_yyyymm}, {', '.join(ALL_COLS[1:])} FROM {t} WHERE Vintage = {old_yyyymm};\n",
+    ]
+    up = diff[diff["status"].isin(["inserted", "updated"])].rename(columns={"new_Value": "Value"})
+    for batch in values_batches(up, ALL_COLS[1:]):
+        out.append(f"MERGE {t} AS t USING (VALUES\n        {batch})\n"
+                   f"    AS s ({', '.join(ALL_COLS[1:])})\n"
+                   f"    ON t.Vintage = {new_yyyymm} AND {key}\n"
+                   "    WHEN MATCHED THEN UPDATE SET Table_Description = s.Table_Description, Value = s.Value\n"
+                   f"    WHEN NOT MATCHED THEN INSERT ({cols}) VALUES ({new_yyyymm}, "
+                   + ", ".join(f"s.{c}" for c in ALL_COLS[1:]) + ");\n")
+    gone = diff[diff["status"] == "deleted"]
+    for batch in values_batches(gone, ["Table_ID", "Line_Description", "Column_Description"]):
+        out.append(f"DELETE t FROM {t} AS t JOIN (VALUES\n        {batch})\n"
+                   "    AS s (Table_ID, Line_Description, Column_Description)\n"
+                   f"    ON t.Vintage = {new_yyyymm} AND {key};\n")
+    out.append("COMMIT;\n")
+    return "".join(out)
+
+def change_report(diff, old_yyyymm, new_yyyymm):
+    """Rapport JSON : décompte par tableau et par statut, détail des lignes changées."""
+    counts = pd.crosstab(diff["Table_ID"], diff["status"]).reindex(columns=STATUSES, fill_value=0)
+    changed = diff[diff["status"] != "unchanged"].copy()
+    changed["delta"] = changed["new_Value"] - changed["old_Value"]
+    changed = changed.astype(object).where(changed.notna(), None)
+    return {
+        "old": old_yyyymm,
+        "new": new_yyyymm,
+        "summary": {str(k): {s: int(v) for s, v in row.items()} for k, row in counts.iterrows()},
+        "total": {s: int((diff["status"] == s).sum()) for s in STATUSES},
+        "changes": changed.drop(columns="Table_Description").to_dict(orient="records"),
+    }
+
+def diff_vintages(csv_dir, old_date, new_date, old_prefix=None):
+    """
+    Compare deux dates et écrit MMYYYYdelta_MMYYYY.sql et .json (nouvelle
+    date en premier). `old_prefix` : préfixe des CSV de l'ancienne date si
+    différent de MMYYYY ("" pour les anciens table{i}.csv).
+    """
+    check_date(old_date)
+    check_date(new_date)
+    old_yyyymm = old_date[3:] + old_date[:2]
+    new_yyyymm = new_date[3:] + new_date[:2]
+    old_p = old_date.replace("/", "") if old_prefix is None else old_prefix
+    new_p = new_date.replace("/", "")
+
+    diff = diff_params(param_frame(load_tables(csv_dir, old_p), old_yyyymm),
+                       param_frame(load_tables(csv_dir, new_p), new_yyyymm))
+    report = change_report(diff, old_yyyymm, new_yyyymm)
+    base = os.path.join(csv_dir, f"{new_p}delta_{old_date.replace('/', '')}")
+    with open(base + ".sql", "w", encoding="utf-8") as f:
+        f.write(delta_sql(diff, old_yyyymm, new_yyyymm))
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    t = report["total"]
+    print(f"=> {os.path.basename(base)} : {t['inserted']} insérés, {t['updated']} modifiés, "
+          f"{t['deleted']} supprimés, {t['unchanged']} inchangés")
+    return diff
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Différentiel des paramètres ESMA entre deux dates")
+    ap.add_argument("old", help="date de référence (MM/YYYY)")
+    ap.add_argument("new", help="nouvelle date (MM/YYYY)")
+    ap.add_argument("--csv-dir", default=os.path.join("data", "output"))
+    ap.add_argument("--old-prefix", help='préfixe des CSV de référence ("" pour table{i}.csv)')
+    args = ap.parse_args()
+    diff_vintages(args.csv_dir, args.old, args.new, args.old_prefix)